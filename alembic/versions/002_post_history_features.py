@@ -0,0 +1,69 @@
+"""Post history feature columns (word/line/hashtag counts, hook flags and style) with backfill.
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.post_features import extract_post_features
+
+revision: str = "002"
+down_revision: Union[str, None] = "001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_FEATURE_COLUMNS = (
+    "word_count",
+    "line_count",
+    "hashtag_count",
+    "hook_has_question",
+    "hook_has_number",
+    "hook_has_emoji",
+    "hook_style",
+)
+
+
+def upgrade() -> None:
+    op.add_column("post_history", sa.Column("word_count", sa.Integer(), nullable=True))
+    op.add_column("post_history", sa.Column("line_count", sa.Integer(), nullable=True))
+    op.add_column("post_history", sa.Column("hashtag_count", sa.Integer(), nullable=True))
+    op.add_column("post_history", sa.Column("hook_has_question", sa.Boolean(), nullable=True))
+    op.add_column("post_history", sa.Column("hook_has_number", sa.Boolean(), nullable=True))
+    op.add_column("post_history", sa.Column("hook_has_emoji", sa.Boolean(), nullable=True))
+    op.add_column("post_history", sa.Column("hook_style", sa.String(20), nullable=True))
+
+    # Backfill existing rows in batches
+    conn = op.get_bind()
+    post_history = sa.table(
+        "post_history",
+        sa.column("id", sa.Integer),
+        sa.column("content_text", sa.Text),
+        *(sa.column(c) for c in _FEATURE_COLUMNS),
+    )
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(post_history.c.id, post_history.c.content_text)
+            .where(post_history.c.id > last_id)
+            .order_by(post_history.c.id)
+            .limit(1000)
+        ).fetchall()
+        if not rows:
+            break
+        conn.execute(
+            post_history.update()
+            .where(post_history.c.id == sa.bindparam("_id"))
+            .values({c: sa.bindparam(c) for c in _FEATURE_COLUMNS}),
+            [{"_id": row.id, **extract_post_features(row.content_text)} for row in rows],
+        )
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    for col in reversed(_FEATURE_COLUMNS):
+        op.drop_column("post_history", col)
@@ -0,0 +1,26 @@
+"""MinHash signature columns on post_drafts and post_history for near-duplicate detection.
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "003"
+down_revision: Union[str, None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("post_drafts", sa.Column("minhash", sa.LargeBinary(), nullable=True))
+    op.add_column("post_history", sa.Column("minhash", sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("post_history", "minhash")
+    op.drop_column("post_drafts", "minhash")
@@ -0,0 +1,30 @@
+"""Per-account brand voice overrides on linkedin_accounts.
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("linkedin_accounts", sa.Column("brand_name", sa.String(255), nullable=True))
+    op.add_column("linkedin_accounts", sa.Column("brand_description", sa.Text(), nullable=True))
+    op.add_column("linkedin_accounts", sa.Column("brand_hashtags", sa.String(255), nullable=True))
+    op.add_column("linkedin_accounts", sa.Column("brand_image_style", sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("linkedin_accounts", "brand_image_style")
+    op.drop_column("linkedin_accounts", "brand_hashtags")
+    op.drop_column("linkedin_accounts", "brand_description")
+    op.drop_column("linkedin_accounts", "brand_name")
@@ -0,0 +1,28 @@
+"""Sibling drafts from one multi-variant generation: batch id and local rank score.
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("post_drafts", sa.Column("batch_id", sa.String(32), nullable=True))
+    op.add_column("post_drafts", sa.Column("rank_score", sa.Float(), nullable=True))
+    op.create_index("ix_post_drafts_batch_id", "post_drafts", ["batch_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_post_drafts_batch_id", table_name="post_drafts")
+    op.drop_column("post_drafts", "rank_score")
+    op.drop_column("post_drafts", "batch_id")
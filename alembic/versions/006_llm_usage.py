@@ -0,0 +1,45 @@
+"""Append-only Gemini usage log and per-account daily budgets.
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "llm_usage",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("account_id", sa.Integer(), nullable=True),
+        sa.Column("model", sa.String(128), nullable=False),
+        sa.Column("operation", sa.String(32), nullable=False),
+        sa.Column("input_tokens", sa.Integer(), nullable=False),
+        sa.Column("cached_tokens", sa.Integer(), nullable=False),
+        sa.Column("output_tokens", sa.Integer(), nullable=False),
+        sa.Column("images", sa.Integer(), nullable=False),
+        sa.Column("latency_ms", sa.Integer(), nullable=False),
+        sa.Column("cost_usd", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(["account_id"], ["linkedin_accounts.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_llm_usage_created_at", "llm_usage", ["created_at"])
+    op.create_index("ix_llm_usage_account_id", "llm_usage", ["account_id"])
+    op.add_column("linkedin_accounts", sa.Column("llm_daily_budget_usd", sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("linkedin_accounts", "llm_daily_budget_usd")
+    op.drop_index("ix_llm_usage_account_id", table_name="llm_usage")
+    op.drop_index("ix_llm_usage_created_at", table_name="llm_usage")
+    op.drop_table("llm_usage")
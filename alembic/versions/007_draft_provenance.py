@@ -0,0 +1,90 @@
+"""Normalize draft provenance: insights snapshots and strategy decisions stored once per content, referenced by id.
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.provenance import canonical_json, content_hash
+
+revision: str = "007"
+down_revision: Union[str, None] = "006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (snapshot table, JSON column on post_drafts, id column on post_drafts)
+_LINKS = (
+    ("insights_snapshots", "performance_insights", "insights_id"),
+    ("strategy_decisions", "strategy", "strategy_id"),
+)
+
+
+def _snapshot_table(name: str) -> sa.Table:
+    return sa.table(
+        name,
+        sa.column("id", sa.Integer),
+        sa.column("content_hash", sa.String),
+        sa.column("payload", sa.Text),
+        sa.column("created_at", sa.DateTime(timezone=True)),
+    )
+
+
+def upgrade() -> None:
+    for table, _, _ in _LINKS:
+        op.create_table(
+            table,
+            sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column("content_hash", sa.String(64), nullable=False),
+            sa.Column("payload", sa.Text(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("content_hash", name=f"uq_{table}_content_hash"),
+        )
+    op.add_column("post_drafts", sa.Column("insights_id", sa.Integer(), sa.ForeignKey("insights_snapshots.id"), nullable=True))
+    op.add_column("post_drafts", sa.Column("strategy_id", sa.Integer(), sa.ForeignKey("strategy_decisions.id"), nullable=True))
+
+    # Backfill: one snapshot per distinct payload (after canonicalization), then point the drafts at it
+    conn = op.get_bind()
+    for table, json_column, id_column in _LINKS:
+        snapshots = _snapshot_table(table)
+        drafts = sa.table("post_drafts", sa.column(json_column, sa.Text), sa.column(id_column, sa.Integer))
+        ids: dict[str, int] = {}
+        raw_values = conn.execute(
+            sa.select(drafts.c[json_column]).where(drafts.c[json_column].is_not(None)).distinct()
+        ).scalars().all()
+        for raw in raw_values:
+            try:
+                payload = json.loads(raw)
+            except (TypeError, ValueError):
+                continue
+            if not payload:
+                continue
+            text = canonical_json(payload)
+            digest = content_hash(text)
+            if digest not in ids:
+                ids[digest] = conn.execute(
+                    snapshots.insert().values(content_hash=digest, payload=text, created_at=sa.func.now()).returning(snapshots.c.id)
+                ).scalar_one()
+            conn.execute(drafts.update().where(drafts.c[json_column] == raw).values({id_column: ids[digest]}))
+        op.drop_column("post_drafts", json_column)
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    for table, json_column, id_column in _LINKS:
+        op.add_column("post_drafts", sa.Column(json_column, sa.Text(), nullable=True))
+        snapshots = _snapshot_table(table)
+        drafts = sa.table("post_drafts", sa.column(json_column, sa.Text), sa.column(id_column, sa.Integer))
+        conn.execute(
+            drafts.update()
+            .values({json_column: sa.select(snapshots.c.payload).where(snapshots.c.id == drafts.c[id_column]).scalar_subquery()})
+            .where(drafts.c[id_column].is_not(None))
+        )
+        op.drop_column("post_drafts", id_column)
+        op.drop_table(table)
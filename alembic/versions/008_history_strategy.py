@@ -0,0 +1,25 @@
+"""Strategy a published post was generated with (for the strategy bandit).
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "008"
+down_revision: Union[str, None] = "007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing posts keep None: history rows were never linked to their drafts
+    op.add_column("post_history", sa.Column("strategy_id", sa.Integer(), sa.ForeignKey("strategy_decisions.id"), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("post_history", "strategy_id")
@@ -0,0 +1,25 @@
+"""Whether a scheduled post attaches the draft's image (the publish request's include_image).
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "009"
+down_revision: Union[str, None] = "008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing jobs keep the old behaviour (attach the image when the draft has one)
+    op.add_column("scheduled_posts", sa.Column("include_image", sa.Boolean(), nullable=False, server_default=sa.true()))
+
+
+def downgrade() -> None:
+    op.drop_column("scheduled_posts", "include_image")
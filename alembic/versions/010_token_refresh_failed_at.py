@@ -0,0 +1,24 @@
+"""When an account's last background token refresh failed (skipped until TOKEN_REFRESH_RETRY_HOURS have passed).
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "010"
+down_revision: Union[str, None] = "009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("linkedin_accounts", sa.Column("token_refresh_failed_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("linkedin_accounts", "token_refresh_failed_at")
@@ -0,0 +1,29 @@
+"""When a draft was first published; the image GC evicts images of unpublished drafts first.
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "011"
+down_revision: Union[str, None] = "010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("post_drafts", sa.Column("published_at", sa.DateTime(timezone=True), nullable=True))
+    # Scheduled publishes record their draft; earlier immediate publishes did not, so those stay unknown
+    op.execute(
+        "UPDATE post_drafts SET published_at = (SELECT MIN(s.scheduled_at) FROM scheduled_posts s "
+        "WHERE s.draft_id = post_drafts.id AND s.status = 'published')"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("post_drafts", "published_at")
@@ -1,10 +1,26 @@
-"""LangGraph agents in the post generation workflow."""
-from app.agents.performance_agent import performance_agent
-from app.agents.input_handler_agent import input_handler_agent
-from app.agents.strategy_agent import strategy_agent
-from app.agents.post_generator import post_generator_agent
-from app.agents.image_generator import image_generator_agent
-from app.agents.scheduler_agent import scheduler_agent
+"""LangGraph agents in the post generation workflow.
+
+Agents are resolved lazily (PEP 562) so importing one agent module, e.g. scheduler_agent
+from the publish route, does not pull in the others and their dependencies at startup.
+"""
+from importlib import import_module
+
+_AGENT_MODULES = {
+    "performance_agent": "app.agents.performance_agent",
+    "input_handler_agent": "app.agents.input_handler_agent",
+    "strategy_agent": "app.agents.strategy_agent",
+    "post_generator_agent": "app.agents.post_generator",
+    "image_generator_agent": "app.agents.image_generator",
+    "scheduler_agent": "app.agents.scheduler_agent",
+}
+
+
+def __getattr__(name: str):
+    module = _AGENT_MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(module), name)
+
 
 __all__ = [
     "performance_agent",
@@ -2,14 +2,24 @@
 import asyncio
 
 import app.services.gemini_service as gemini_svc
+from app.config import settings
+from app.services.brand import Brand
+from app.services.semantic_cache import get_semantic_cache
 from app.workflow.state import WorkflowState
 
 
 async def post_generator_agent(state: WorkflowState) -> dict:
-    """Call Gemini to generate post content. Returns post dict."""
+    """Call Gemini to generate post content. Returns post dict (and all posts when variants > 1)."""
     optimized = state.get("optimized_input") or "Share a valuable professional insight."
     performance = state.get("performance_insights") or {}
     strategy = state.get("strategy") or {}
+    brand = state.get("brand") or Brand.default()
+    avoid_hooks = [h for h in (state.get("avoid_hooks") or []) if h]
+    if avoid_hooks:
+        # Dedup retry: previous attempt was too close to an earlier post
+        optimized += "\n\nTake a clearly different angle and hook than these earlier posts:\n" + "\n".join(
+            f"- {h[:200]}" for h in avoid_hooks
+        )
 
     analytics_summary = (
         f"Best days: {performance.get('best_days', [])}. "
@@ -18,11 +28,30 @@ async def post_generator_agent(state: WorkflowState) -> dict:
         f"Hook style: {performance.get('hook_style_pattern', '')}."
     )
 
+    variants = state.get("variants") or 1
+    if variants > 1:
+        # Asking for choices: one call with several candidates; the prompt cache only holds single drafts
+        posts = await asyncio.to_thread(
+            gemini_svc.generate_post_variants, optimized, analytics_summary, strategy, brand, variants
+        )
+        return {"post": posts[0], "posts": posts}
+
+    use_cache = settings.semantic_cache_enabled and state.get("use_semantic_cache") and not avoid_hooks
+    if use_cache:
+        hit = get_semantic_cache().lookup(optimized, {**strategy, "brand": brand.name})
+        # POST /generate checks that the draft still exists (and generates anew if it does not)
+        if hit:
+            return {
+                "post": dict(hit.post),
+                "similar_draft": {"draft_id": hit.draft_id, "similarity": round(hit.similarity, 3)},
+            }
+
     # Gemini client is sync; run in thread to avoid blocking
     post = await asyncio.to_thread(
         gemini_svc.generate_post_text,
         optimized,
         analytics_summary,
         strategy,
+        brand,
     )
     return {"post": post}
@@ -1,32 +1,29 @@
-"""Strategy Agent: decide post_type, tone, cta_type, hook_structure. ReeloomStudios default."""
+"""Strategy Agent: decide post_type, tone, cta_type, hook_structure with the learned strategy bandit."""
+from app.services.strategy_bandit import get_strategy_bandit
 from app.workflow.state import WorkflowState
 
 
-async def strategy_agent(state: WorkflowState) -> dict:
-    """Decide strategy from context and performance insights. Defaults to ReeloomStudios founder voice."""
-    performance = state.get("performance_insights") or {}
-    optimized = (state.get("optimized_input") or "")[:500].lower()
-
-    # ReeloomStudios: default founder POV and creator/studio positioning
-    if "data" in optimized or "number" in optimized or "percent" in optimized:
-        post_type = "data_driven"
-        hook_structure = "stat"
-    elif "story" in optimized or "lesson" in optimized:
-        post_type = "story"
-        hook_structure = "story_open"
-    else:
-        post_type = "founder_pov"  # ReeloomStudios default
-        hook_structure = "question" if "?" in (state.get("optimized_input") or "") else "story_open"
+def _input_hints(text: str) -> dict[str, str]:
+    """Options the prompt asks for explicitly; they get a head start in the bandit, not a guarantee."""
+    lowered = text[:500].lower()
+    if "data" in lowered or "number" in lowered or "percent" in lowered:
+        return {"post_type": "data_driven", "hook_structure": "stat"}
+    if "story" in lowered or "lesson" in lowered:
+        return {"post_type": "story", "hook_structure": "story_open"}
+    if "?" in text:
+        return {"hook_structure": "question"}
+    return {}
 
-    tone = "conversational"  # founder-style: approachable but confident
-    cta_type = "question"  # drives comments; fits LinkedIn
 
-    return {
-        "strategy": {
-            "post_type": post_type,
-            "tone": tone,
-            "cta_type": cta_type,
-            "hook_structure": hook_structure,
-            "brand": "ReeloomStudios",  # hint for post generator
-        }
-    }
+async def strategy_agent(state: WorkflowState) -> dict:
+    """
+    Pick each strategy dimension by Thompson sampling over post_history engagement (per account once it has
+    enough posts). Requests that may be answered from the semantic cache take the posterior mean instead, so
+    similar prompts keep landing in the same cache scope; the others explore.
+    """
+    hints = _input_hints(state.get("optimized_input") or "")
+    strategy = get_strategy_bandit().choose(
+        state.get("account_id"), hints, explore=not state.get("use_semantic_cache")
+    )
+    # No brand here: the account's brand is in the system instruction (and added to the semantic cache key)
+    return {"strategy": strategy}
@@ -6,6 +6,7 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 # Project root (parent of app/); .env is loaded from here so it works regardless of CWD
 _PROJECT_ROOT = Path(__file__).resolve().parent.parent
 _ENV_FILE = _PROJECT_ROOT / ".env"
+_CREATED_DIRS: set[Path] = set()
 
 
 class Settings(BaseSettings):
@@ -19,6 +20,62 @@ class Settings(BaseSettings):
     gemini_api_key: str = ""
     gemini_text_model: str = "gemini-3-flash-preview"
     gemini_image_model: str = "imagen-4.0-generate-001"
+    gemini_base_url: str = ""  # override the API endpoint (proxy, or the local stand-in in benchmarks/)
+    # Post text comes back as schema-constrained JSON, streamed so a cut-off answer keeps its finished fields;
+    # fields still missing are re-requested (only those) up to gemini_repair_attempts times
+    gemini_text_stream: bool = True
+    gemini_repair_attempts: int = 1
+    # The static prompt prefix (brand + rules) is sent as a system instruction through an explicit context cache,
+    # created per (model, prefix) and extended before expiry; falls back to a plain system instruction when the
+    # prefix is below the model's minimum cacheable size or the API refuses to cache it
+    gemini_context_cache: bool = True
+    gemini_context_cache_ttl_seconds: int = 3600
+    # Minimum cacheable prefix per model in tokens, as JSON {"model": n}; overrides the built-in table. Shorter
+    # prefixes are sent inline without trying to create a cache
+    gemini_context_cache_min_tokens: dict[str, int] = {}
+    # Model chains: the configured model first, then these (comma-separated). A call still running past its
+    # model's p95 latency (rolling window; gemini_hedge_default_ms until 20 samples) is hedged to the next model
+    # and the slower one cancelled; gemini_breaker_failures consecutive failures take a model out for the cooldown
+    gemini_text_fallback_models: str = "gemini-2.5-flash"
+    gemini_image_fallback_models: str = "gemini-2.5-flash-image,gemini-3-pro-image-preview"
+    gemini_hedge_text: bool = True
+    gemini_hedge_image: bool = False  # images are billed per attempt; fall back on failure only
+    gemini_latency_window: int = 200
+    gemini_hedge_default_ms: int = 20000
+    gemini_hedge_min_ms: int = 1000
+    gemini_breaker_failures: int = 5
+    gemini_breaker_cooldown_seconds: int = 30
+    gemini_router_workers: int = 32
+
+    # Brand voice for generated posts and images (defaults); each account can override them via PUT /accounts/{id}/brand
+    brand_name: str = "ReeloomStudios"
+    brand_description: str = (
+        "creative video and content studio. Founder-led, authentic voice. Positioning: quality storytelling, "
+        "modern production, startup energy. Tone: confident but approachable, expert without being preachy. "
+        "Write as the founder or the studio voice."
+    )
+    brand_hashtags: str = "#ContentCreation #FounderLife #ReeloomStudios"
+    brand_image_style: str = "creative video/content studio, modern, clean, bold."
+
+    # Gemini usage accounting (llm_usage table, written in batches) and budgets. Prices: USD per 1M tokens
+    # (input, cached_input, output) or per image, as JSON {"model": {...}}; overrides the built-in table.
+    llm_prices: dict[str, dict[str, float]] = {}
+    llm_usage_flush_seconds: float = 5.0
+    llm_usage_batch_size: int = 200
+    llm_usage_max_buffer: int = 50_000
+    # Daily spend cap for accounts without their own (0 = none). Over budget: "downgrade" switches to the
+    # budget models below, "block" refuses the request with 429
+    llm_daily_budget_usd: float = 0.0
+    llm_budget_action: str = "downgrade"
+    llm_budget_text_model: str = "gemini-2.5-flash-lite"
+    llm_budget_image_model: str = "imagen-4.0-fast-generate-001"
+
+    # Strategy bandit (app.services.strategy_bandit): a post at or above the target engagement rate counts as a
+    # full success; accounts use their own posteriors after this many posts with metrics (pooled ones before);
+    # options asked for in the prompt ("story", "data", ...) start with this many pseudo-successes
+    strategy_target_engagement_rate: float = 0.04
+    strategy_min_account_posts: int = 10
+    strategy_hint_weight: float = 2.0
 
     # LinkedIn
     linkedin_client_id: str = ""
@@ -26,6 +83,15 @@ class Settings(BaseSettings):
     # Must match EXACTLY the redirect URL in LinkedIn Developer Portal (Auth → Authorized redirect URLs).
     # Default 127.0.0.1 to match common portal setup; use localhost in .env if your portal has localhost.
     linkedin_redirect_uri: str = "http://127.0.0.1:8000/auth/linkedin/callback"
+    linkedin_api_base: str = "https://api.linkedin.com"
+    linkedin_oauth_base: str = "https://www.linkedin.com/oauth/v2"
+    linkedin_max_connections: int = 20  # pooled client size (per event loop), bounds fan-out concurrency
+    # Account/token cache for publishing; tokens are refreshed in the background ahead of expiry
+    account_cache_ttl_seconds: int = 300
+    token_refresh_interval_minutes: int = 60
+    token_refresh_ahead_hours: int = 72  # refresh tokens expiring within this window
+    token_refresh_batch_size: int = 50  # accounts refreshed concurrently; a run works through all due batches
+    token_refresh_retry_hours: int = 24  # back off this long after a failed refresh before trying the account again
 
     # Database (Supabase: use Connection string from Supabase Dashboard → Settings → Database)
     database_url: str = ""
@@ -45,11 +111,80 @@ class Settings(BaseSettings):
     secret_key: str = "change-me-in-production"
     storage_path: str = "./storage"
     log_level: str = "INFO"
+    # Tracing (OpenTelemetry-compatible): none | file | otlp. Sampling is decided per trace at the root span.
+    tracing_exporter: str = "none"
+    trace_sample_ratio: float = 0.1
+    trace_file_path: str = ""  # default: <storage>/traces/spans.jsonl
+    trace_otlp_endpoint: str = "http://localhost:4318"
+    trace_export_interval_seconds: float = 2.0
+
+    # Admin endpoints (/admin/*) require header X-Admin-Token; empty token disables them
+    admin_token: str = ""
+    # Sampling profiler (opt-in): /admin/profile, plus automatic capture of requests slower than the threshold
+    profiling_enabled: bool = False
+    profile_slow_request_ms: int = 5000  # 0 = no slow-request capture
+    profile_sample_interval_ms: int = 10
+    profile_ring_size: int = 50  # profiles kept under <storage>/profiles
+
+    # Event-loop stall detector: heartbeat lag histogram, stalls over the threshold logged with task + stack
+    loop_monitor_enabled: bool = True
+    loop_monitor_interval_ms: int = 100
+    loop_stall_threshold_ms: int = 100
+
+    # Threads behind asyncio.to_thread (Gemini calls, image writes); 0 = Python default min(32, cpu + 4)
+    thread_pool_workers: int = 0
+
+    # Image storage (content-addressed under <storage>/images): GC pass interval, age before unreferenced
+    # files may be removed, and disk quota (0 = unlimited; least recently updated drafts lose their image first)
+    image_gc_interval_minutes: int = 60
+    image_gc_grace_minutes: int = 60
+    image_storage_quota_mb: int = 0
+
+    # Where stored images live: local (under storage_path) or s3 (any S3-compatible bucket; MinIO/R2 via
+    # s3_endpoint_url). With s3, reads go through a local cache tier bounded by storage_cache_max_mb.
+    storage_backend: str = "local"
+    s3_bucket: str = ""
+    s3_endpoint_url: str = ""  # default: https://s3.<region>.amazonaws.com (path-style requests)
+    s3_region: str = "us-east-1"
+    s3_access_key_id: str = ""
+    s3_secret_access_key: str = ""
+    s3_prefix: str = ""  # key prefix inside the bucket
+    s3_presign_seconds: int = 3600
+    storage_cache_dir: str = ""  # default: <storage>/cache
+    storage_cache_max_mb: int = 512
+    # /storage/{id} redirects to the object instead of proxying bytes: to storage_public_base_url + key if set
+    # (CDN or public bucket), else to a presigned URL (s3 backend only)
+    storage_redirect: bool = True
+    storage_public_base_url: str = ""
+    # Images served by the app: stat results and validators of up to storage_file_cache_entries files, plus the
+    # bytes of files up to storage_file_cache_max_file_kb (storage_file_cache_mb in total); re-stat after valid_seconds
+    storage_file_cache_entries: int = 1024
+    storage_file_cache_mb: int = 64
+    storage_file_cache_max_file_kb: int = 4096
+    storage_file_cache_valid_seconds: int = 30
+
+    # Build the LangGraph graph and Gemini client in the background once the app is serving
+    warmup_on_startup: bool = True
+
+    # Near-duplicate detection (MinHash/LSH): estimated Jaccard at or above threshold counts as a duplicate
+    dedup_threshold: float = 0.8
+    dedup_max_retries: int = 1  # extra generation attempts when a draft duplicates an earlier one
+    # Upper bound for `variants` on /generate (Gemini candidate_count; sibling drafts ranked locally)
+    generate_max_variants: int = 5
+
+    # Semantic prompt cache in front of post generation (cosine similarity of local hashed embeddings)
+    semantic_cache_enabled: bool = True
+    semantic_cache_threshold: float = 0.8
+    semantic_cache_max_entries: int = 1000
+    semantic_cache_ttl_seconds: int = 3 * 24 * 3600
 
     @property
     def storage_dir(self) -> Path:
+        """Storage root, created on first access only (no filesystem call on later accesses)."""
         p = Path(self.storage_path)
-        p.mkdir(parents=True, exist_ok=True)
+        if p not in _CREATED_DIRS:
+            p.mkdir(parents=True, exist_ok=True)
+            _CREATED_DIRS.add(p)
         return p
 
 
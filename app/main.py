@@ -1,4 +1,12 @@
-"""FastAPI application: lifecycle, routes, scheduler."""
+"""FastAPI application: lifecycle, routes, scheduler.
+
+Keep this import graph light: langgraph/langchain-core (via the post graph), google-genai,
+Pillow and numpy load on first use or in the background warmup. check_startup.py enforces it.
+"""
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from pathlib import Path
 
@@ -9,13 +17,31 @@ from apscheduler.schedulers.background import BackgroundScheduler
 
 from app.config import settings
 from app.db import create_tables, init_db
+from app.services.dedup_service import rebuild_index
+from app.services.gemini_service import release_context_caches
+from app.services.image_store import run_image_gc
+from app.services.linkedin_service import close_client as close_linkedin_client, run_token_refresh
+from app.services.llm_usage import flush_usage, usage_writer
+from app.services.strategy_bandit import rebuild_strategy_bandit
+from app.utils.app_loop import set_app_loop
 from app.utils.logging import setup_logging, get_logger
+from app.utils.loop_monitor import start_loop_monitor, stop_loop_monitor
+from app.utils.metrics import (
+    SCHEDULER_QUEUE_DEPTH,
+    THREADPOOL_MAX_WORKERS,
+    THREADPOOL_QUEUE_DEPTH,
+    MetricsMiddleware,
+)
+from app.utils.profiler import ProfilingMiddleware, start_continuous_sampler, stop_continuous_sampler
+from app.utils.tracing import TracingMiddleware, shutdown_tracing
 from app.routes import (
     generate_router,
     publish_router,
     analytics_router,
     accounts_router,
     history_router,
+    metrics_router,
+    admin_router,
 )
 from app.routes.generate import regenerate_router
 from app.routes.storage import router as storage_router
@@ -26,20 +52,91 @@ logger = get_logger(__name__)
 STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
 
 
+async def _warmup() -> None:
+    """Load heavy dependencies off the request path: compile the post graph, build the Gemini client."""
+    from app.routes.generate import get_graph
+    from app.services import gemini_service
+    from app.services.semantic_cache import get_semantic_cache
+
+    for name, fn in (
+        ("graph", get_graph),
+        ("gemini_client", gemini_service.warmup),
+        ("semantic_cache", get_semantic_cache),
+    ):
+        try:
+            await asyncio.to_thread(fn)
+        except Exception as e:
+            logger.warning("warmup_failed", step=name, error=str(e))
+    logger.info("warmup_done")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Startup: logging, DB tables, scheduler. Shutdown: scheduler."""
+    """Startup: logging, thread pool, loop monitor, DB tables, dedup index, strategy bandit, scheduler + token refresher + image GC, LLM usage writer, profiler, warmup. Shutdown: scheduler, LinkedIn client, usage flush."""
     setup_logging()
+    # Own the default executor so its size is configurable and its backlog visible in /metrics
+    executor = ThreadPoolExecutor(max_workers=settings.thread_pool_workers or None, thread_name_prefix="to_thread")
+    asyncio.get_running_loop().set_default_executor(executor)
+    THREADPOOL_MAX_WORKERS.labels().set(executor._max_workers)
+    THREADPOOL_QUEUE_DEPTH.labels().set_function(executor._work_queue.qsize)
+    start_loop_monitor()
+    # Scheduler jobs run their coroutines here, sharing the DB pool and HTTP clients with requests
+    set_app_loop(asyncio.get_running_loop())
     init_db()
     try:
         await create_tables()
     except Exception as e:
         logger.warning("create_tables_failed", error=str(e))
+    try:
+        async with init_db()() as session:
+            await rebuild_index(session)
+    except Exception as e:
+        logger.warning("dedup_index_rebuild_failed", error=str(e))
+    try:
+        async with init_db()() as session:
+            await rebuild_strategy_bandit(session)
+    except Exception as e:
+        logger.warning("strategy_bandit_rebuild_failed", error=str(e))
     scheduler = BackgroundScheduler()
     scheduler.start()
     set_scheduler(scheduler)
+    # Renew LinkedIn tokens ahead of expiry (first run right away, then every interval)
+    scheduler.add_job(
+        run_token_refresh,
+        "interval",
+        minutes=settings.token_refresh_interval_minutes,
+        id="linkedin_token_refresh",
+        next_run_time=datetime.now(timezone.utc),
+        replace_existing=True,
+    )
+    # Remove orphaned/empty images and enforce the storage quota
+    scheduler.add_job(
+        run_image_gc,
+        "interval",
+        minutes=settings.image_gc_interval_minutes,
+        id="image_gc",
+        next_run_time=datetime.now(timezone.utc) + timedelta(minutes=1),
+        replace_existing=True,
+    )
+    # One-off publish jobs only; the recurring token refresher and image GC are always there
+    SCHEDULER_QUEUE_DEPTH.labels().set_function(lambda: sum(j.id.startswith("scheduled_") for j in scheduler.get_jobs()))
+    # Batched writes of Gemini token/cost records to llm_usage
+    usage_task = asyncio.create_task(usage_writer())
+    start_continuous_sampler(threading.get_ident())
+    # Runs once startup completes, i.e. after the server starts accepting requests
+    warmup = asyncio.create_task(_warmup()) if settings.warmup_on_startup else None
     yield
+    if warmup is not None and not warmup.done():
+        warmup.cancel()
     scheduler.shutdown(wait=False)
+    set_app_loop(None)
+    await close_linkedin_client()
+    usage_task.cancel()
+    await flush_usage()
+    await asyncio.to_thread(release_context_caches)
+    stop_continuous_sampler()
+    stop_loop_monitor()
+    shutdown_tracing()
 
 
 app = FastAPI(
@@ -56,6 +153,12 @@ app.include_router(analytics_router)
 app.include_router(accounts_router)
 app.include_router(history_router)
 app.include_router(storage_router)
+app.include_router(metrics_router)
+app.include_router(admin_router)
+if settings.profiling_enabled:
+    app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)  # outermost: root span covers the whole request
 
 if STATIC_DIR.exists():
     app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
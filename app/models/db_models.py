@@ -1,13 +1,18 @@
 """SQLAlchemy models for PostgreSQL. Run migrations to create tables."""
+import json
+import time
 from datetime import datetime
 from typing import AsyncGenerator
 from urllib.parse import urlparse, urlencode, urlunparse, parse_qs
 
-from sqlalchemy import DateTime, Float, ForeignKey, Integer, String, Text, Boolean
+from sqlalchemy import DateTime, Float, ForeignKey, Integer, LargeBinary, String, Text, Boolean, event, true
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.config import settings
+from app.utils.metrics import DB_POOL_CHECKOUT_WAIT, DB_QUERY_DURATION
+from app.utils.tracing import instrument_engine, tracing_enabled
 
 
 def _ensure_ssl_url(url: str) -> str:
@@ -39,7 +44,16 @@ class LinkedInAccount(Base):
     access_token: Mapped[str | None] = mapped_column(Text, nullable=True)
     refresh_token: Mapped[str | None] = mapped_column(Text, nullable=True)
     token_expires_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    # Last failed background refresh (revoked/expired refresh token); retried after TOKEN_REFRESH_RETRY_HOURS
+    token_refresh_failed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    # Brand voice overrides for generation (None = settings.brand_*)
+    brand_name: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    brand_description: Mapped[str | None] = mapped_column(Text, nullable=True)
+    brand_hashtags: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    brand_image_style: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Gemini spend cap per UTC day (None: settings.llm_daily_budget_usd applies)
+    llm_daily_budget_usd: Mapped[float | None] = mapped_column(Float, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -59,12 +73,51 @@ class PostDraft(Base):
     hashtags: Mapped[str] = mapped_column(String(500), nullable=False)
     suggested_visual: Mapped[str | None] = mapped_column(Text, nullable=True)
     image_path: Mapped[str | None] = mapped_column(String(1024), nullable=True)
-    performance_insights: Mapped[dict | None] = mapped_column(Text, nullable=True)  # JSON string
-    strategy: Mapped[dict | None] = mapped_column(Text, nullable=True)  # JSON string
+    # What the draft was generated from, shared by every draft with the same content (app.services.provenance)
+    insights_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("insights_snapshots.id"), nullable=True)
+    strategy_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("strategy_decisions.id"), nullable=True)
+    minhash: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)  # near-duplicate signature (dedup_service)
+    # Variants generated together share a batch_id; rank_score is the local ranking (app.services.variant_ranker)
+    batch_id: Mapped[str | None] = mapped_column(String(32), nullable=True, index=True)
+    rank_score: Mapped[float | None] = mapped_column(Float, nullable=True)
+    # First successful publish to any account; the image GC evicts images of unpublished drafts first
+    published_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
 
     scheduled_posts: Mapped[list["ScheduledPost"]] = relationship("ScheduledPost", back_populates="draft")
+    insights_snapshot: Mapped["InsightsSnapshot | None"] = relationship("InsightsSnapshot", lazy="joined")
+    strategy_decision: Mapped["StrategyDecision | None"] = relationship("StrategyDecision", lazy="joined")
+
+    @property
+    def performance_insights(self) -> dict | None:
+        return json.loads(self.insights_snapshot.payload) if self.insights_snapshot is not None else None
+
+    @property
+    def strategy(self) -> dict | None:
+        return json.loads(self.strategy_decision.payload) if self.strategy_decision is not None else None
+
+
+class InsightsSnapshot(Base):
+    """Performance insights a generation ran with; one row per distinct content."""
+
+    __tablename__ = "insights_snapshots"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False, unique=True)  # sha256 of payload
+    payload: Mapped[str] = mapped_column(Text, nullable=False)  # canonical JSON
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+
+
+class StrategyDecision(Base):
+    """Strategy (post type, hook structure, tone, ...) a generation ran with; one row per distinct content."""
+
+    __tablename__ = "strategy_decisions"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False, unique=True)  # sha256 of payload
+    payload: Mapped[str] = mapped_column(Text, nullable=False)  # canonical JSON
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
 
 
 class PostHistory(Base):
@@ -81,7 +134,42 @@ class PostHistory(Base):
     published_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
 
+    # Precomputed text features (see app.utils.post_features); set when the row is written
+    word_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    line_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    hashtag_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    hook_has_question: Mapped[bool | None] = mapped_column(Boolean, nullable=True)
+    hook_has_number: Mapped[bool | None] = mapped_column(Boolean, nullable=True)
+    hook_has_emoji: Mapped[bool | None] = mapped_column(Boolean, nullable=True)
+    hook_style: Mapped[str | None] = mapped_column(String(20), nullable=True)  # question | stat | story | emoji | statement
+    minhash: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)  # near-duplicate signature (dedup_service)
+    # Strategy of the draft it was published from (None for posts from elsewhere); credited when metrics arrive
+    strategy_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("strategy_decisions.id"), nullable=True)
+
     account: Mapped["LinkedInAccount"] = relationship("LinkedInAccount", back_populates="post_histories")
+    strategy_decision: Mapped["StrategyDecision | None"] = relationship("StrategyDecision", lazy="joined")
+
+    @property
+    def strategy(self) -> dict | None:
+        return json.loads(self.strategy_decision.payload) if self.strategy_decision is not None else None
+
+
+class LLMUsage(Base):
+    """One Gemini call: tokens, latency and cost (append-only; written in batches by app.services.llm_usage)."""
+
+    __tablename__ = "llm_usage"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+    account_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("linkedin_accounts.id"), nullable=True, index=True)
+    model: Mapped[str] = mapped_column(String(128), nullable=False)
+    operation: Mapped[str] = mapped_column(String(32), nullable=False)  # text | repair | image
+    input_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)  # excluding cached tokens
+    cached_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    output_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    images: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    latency_ms: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    cost_usd: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
 
 
 class ScheduledPost(Base):
@@ -94,12 +182,40 @@ class ScheduledPost(Base):
     account_id: Mapped[int] = mapped_column(Integer, ForeignKey("linkedin_accounts.id"), nullable=False)
     scheduled_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
     status: Mapped[str] = mapped_column(String(20), default="pending")  # pending | published | failed
+    include_image: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True, server_default=true())  # attach the draft's image
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
 
     draft: Mapped["PostDraft"] = relationship("PostDraft", back_populates="scheduled_posts")
     account: Mapped["LinkedInAccount"] = relationship("LinkedInAccount", back_populates="scheduled_posts")
 
 
+class _TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection."""
+
+    _wait = DB_POOL_CHECKOUT_WAIT.labels()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self._wait.observe(time.perf_counter() - start)
+
+
+def _time_queries(engine) -> None:
+    """Record db_query_duration_seconds for every statement via cursor events."""
+    sync_engine = engine.sync_engine
+    child = DB_QUERY_DURATION.labels()
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        context._query_start = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _end(conn, cursor, statement, parameters, context, executemany):
+        child.observe(time.perf_counter() - context._query_start)
+
+
 # Async engine and session factory
 _engine = None
 _session_factory: async_sessionmaker[AsyncSession] | None = None
@@ -115,11 +231,19 @@ def init_db() -> async_sessionmaker[AsyncSession]:
             "DATABASE_URL is not set. Add your Supabase connection string to .env. "
             "Supabase Dashboard → Settings → Database → Connection string (URI); use postgresql+asyncpg://..."
         )
+    url = _ensure_ssl_url(settings.database_url)
+    engine_kwargs = {}
+    if not url.startswith("sqlite"):  # SQLite (local/benchmarks) keeps the dialect's default pool
+        engine_kwargs["poolclass"] = _TimedQueuePool
     _engine = create_async_engine(
-        _ensure_ssl_url(settings.database_url),
+        url,
         echo=settings.log_level.upper() == "DEBUG",
         pool_pre_ping=True,
+        **engine_kwargs,
     )
+    _time_queries(_engine)
+    if tracing_enabled():
+        instrument_engine(_engine)
     _session_factory = async_sessionmaker(_engine, class_=AsyncSession, expire_on_commit=False)
     return _session_factory
 
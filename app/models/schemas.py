@@ -2,7 +2,7 @@
 from datetime import datetime
 from typing import Any
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 # ----- Performance Intelligence Agent output -----
@@ -32,25 +32,61 @@ class GenerateRequest(BaseModel):
 
     user_input: str | None = Field(default=None, description="Optional manual input to optimize for LinkedIn")
     regenerate_draft_id: int | None = Field(default=None, description="If set, regenerate from this draft")
+    skip_cache: bool = Field(default=False, description="Always generate, even if a similar prompt was answered recently")
+    account_id: int | None = Field(default=None, description="Write in this account's brand voice (default brand if omitted)")
+    variants: int = Field(default=1, ge=1, description="Alternative drafts from one model call, ranked (max GENERATE_MAX_VARIANTS)")
+
+
+class DraftVariant(BaseModel):
+    """One of the sibling drafts of a multi-variant generation."""
+
+    draft_id: int
+    rank_score: float | None = Field(default=None, description="Local ranking score (0-1), higher is better")
+    post_preview: dict[str, Any]
+    duplicate_of: dict[str, Any] | None = None
 
 
 class GenerateResponse(BaseModel):
     """Response when post is ready for review."""
 
-    status: str = Field(default="ready", description="e.g. 'ready'")
+    status: str = Field(default="ready", description="'ready', or 'similar' when an existing draft is offered from the prompt cache")
     message: str = Field(default="Your LinkedIn post is ready for review.")
     draft_id: int = Field(description="ID of the draft for edit/publish")
     post_preview: dict[str, Any] = Field(description="Hook, body, cta, hashtags, suggested_visual")
     image_url: str | None = Field(default=None, description="Local or storage URL of generated image")
     image_path: str | None = Field(default=None, description="Path to image file if stored locally")
+    duplicate_of: dict[str, Any] | None = Field(
+        default=None,
+        description="Set when the post near-duplicates an earlier draft or published post: {kind, id, similarity}",
+    )
+    cache_similarity: float | None = Field(default=None, description="Prompt similarity when status is 'similar'")
+    batch_id: str | None = Field(default=None, description="Shared by the sibling drafts of a multi-variant generation")
+    variants: list[DraftVariant] = Field(
+        default_factory=list, description="All drafts of the batch, best-ranked first (draft_id is the first one)"
+    )
 
 
 class PublishRequest(BaseModel):
     """Request body for POST /publish."""
 
     draft_id: int = Field(description="Draft to publish")
-    account_id: int = Field(description="LinkedIn account (personal or company) ID")
+    account_ids: list[int] = Field(default_factory=list, description="LinkedIn accounts (personal and/or company) to post as")
+    account_id: int | None = Field(default=None, description="Single account; same as account_ids=[account_id]")
     schedule_override: datetime | None = Field(default=None, description="Override scheduled time; null = use smart logic")
+    include_image: bool = Field(
+        default=True,
+        description="Attach the draft's generated image (now, or when a scheduled post goes out)",
+    )
+
+    @model_validator(mode="after")
+    def _merge_account_ids(self) -> "PublishRequest":
+        ids = list(self.account_ids)
+        if self.account_id is not None:
+            ids.insert(0, self.account_id)
+        self.account_ids = list(dict.fromkeys(ids))
+        if not self.account_ids:
+            raise ValueError("account_ids must name at least one account")
+        return self
 
 
 class UpdateDraftRequest(BaseModel):
@@ -74,6 +110,29 @@ class AnalyticsSummary(BaseModel):
     top_posts: list[dict[str, Any]] = Field(default_factory=list)
 
 
+class LLMUsageRow(BaseModel):
+    """Gemini usage for one UTC day, account and model."""
+
+    day: str
+    account_id: int | None = None
+    model: str
+    calls: int = 0
+    input_tokens: int = 0
+    cached_tokens: int = 0
+    output_tokens: int = 0
+    images: int = 0
+    cost_usd: float = 0.0
+
+
+class LLMUsageReport(BaseModel):
+    """Estimated Gemini spend over the last `days` days."""
+
+    days: int
+    total_calls: int = 0
+    total_cost_usd: float = 0.0
+    rows: list[LLMUsageRow] = Field(default_factory=list)
+
+
 # ----- DB-backed DTOs -----
 class AccountOut(BaseModel):
     """LinkedIn account for selector."""
@@ -88,6 +147,36 @@ class AccountOut(BaseModel):
         from_attributes = True
 
 
+class AccountBrand(BaseModel):
+    """Brand voice overrides for an account; null or empty falls back to the default brand."""
+
+    brand_name: str | None = Field(default=None, max_length=255)
+    brand_description: str | None = Field(default=None, description="Positioning and tone")
+    brand_hashtags: str | None = Field(default=None, max_length=255, description="Example hashtags")
+    brand_image_style: str | None = Field(default=None, description="Visual style for generated images")
+
+
+class AccountBrandOut(AccountBrand):
+    """Stored overrides plus the brand generation actually uses."""
+
+    account_id: int
+    effective: dict[str, str]
+
+
+class AccountBudget(BaseModel):
+    """Daily Gemini spend cap for an account; null falls back to the default (LLM_DAILY_BUDGET_USD, 0 = none)."""
+
+    llm_daily_budget_usd: float | None = Field(default=None, ge=0)
+
+
+class AccountBudgetOut(AccountBudget):
+    """Stored cap plus the one that applies and today's (UTC) spend."""
+
+    account_id: int
+    effective_budget_usd: float
+    spent_today_usd: float
+
+
 class PostDraftOut(BaseModel):
     """Draft ready for review/edit/publish."""
 
@@ -102,6 +191,9 @@ class PostDraftOut(BaseModel):
     strategy: dict | None
     created_at: datetime
     updated_at: datetime
+    duplicate_ids: list[int] = Field(default_factory=list, description="Near-duplicate drafts collapsed into this one")
+    batch_id: str | None = None
+    rank_score: float | None = None
 
     class Config:
         from_attributes = True
@@ -123,6 +215,22 @@ class PostHistoryOut(BaseModel):
         from_attributes = True
 
 
+class PostMetrics(BaseModel):
+    """Engagement figures for a published post (e.g. from a LinkedIn analytics sync)."""
+
+    history_id: int
+    impressions: int | None = Field(default=None, ge=0)
+    engagements: int | None = Field(default=None, ge=0, description="Reactions + comments + reposts + clicks")
+    engagement_rate: float | None = Field(default=None, ge=0, le=1, description="Defaults to engagements / impressions")
+
+
+class PostMetricsResult(BaseModel):
+    """Outcome of a metrics upload."""
+
+    updated: int = Field(description="Posts whose stored figures changed")
+    missing: list[int] = Field(default_factory=list)
+
+
 class ScheduledPostOut(BaseModel):
     """Scheduled post in queue."""
 
@@ -131,6 +239,7 @@ class ScheduledPostOut(BaseModel):
     account_id: int
     scheduled_at: datetime
     status: str  # pending | published | failed
+    include_image: bool = True
     created_at: datetime
 
     class Config:
@@ -4,6 +4,8 @@ from app.routes.publish import router as publish_router
 from app.routes.analytics import router as analytics_router
 from app.routes.accounts import router as accounts_router
 from app.routes.history import router as history_router
+from app.routes.metrics import router as metrics_router
+from app.routes.admin import router as admin_router
 
 __all__ = [
     "generate_router",
@@ -11,4 +13,6 @@ __all__ = [
     "analytics_router",
     "accounts_router",
     "history_router",
+    "metrics_router",
+    "admin_router",
 ]
@@ -8,8 +8,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
 from app.db import get_db
 from app.models.db_models import LinkedInAccount
-from app.models.schemas import AccountOut
+from app.models.schemas import AccountBrand, AccountBrandOut, AccountBudget, AccountBudgetOut, AccountOut
+from app.services.account_cache import get_account_cache
+from app.services.brand import BRAND_FIELDS, Brand
 from app.services.linkedin_service import LinkedInService
+from app.services.llm_usage import get_usage_recorder
 from app.utils.logging import get_logger
 
 router = APIRouter(prefix="/accounts", tags=["accounts"])
@@ -57,6 +60,68 @@ async def list_accounts(session: AsyncSession = Depends(get_db)):
         ) from e
 
 
+def _brand_out(account: LinkedInAccount) -> AccountBrandOut:
+    brand = Brand.for_account(account)
+    return AccountBrandOut(
+        account_id=account.id,
+        **{f: getattr(account, f) for f in BRAND_FIELDS},
+        effective={"name": brand.name, "description": brand.description, "hashtags": brand.hashtags, "image_style": brand.image_style},
+    )
+
+
+@router.get("/{account_id}/brand", response_model=AccountBrandOut)
+async def get_account_brand(account_id: int, session: AsyncSession = Depends(get_db)):
+    """Brand voice used when generating for this account."""
+    account = await session.get(LinkedInAccount, account_id)
+    if account is None:
+        raise HTTPException(status_code=404, detail="Account not found")
+    return _brand_out(account)
+
+
+@router.put("/{account_id}/brand", response_model=AccountBrandOut)
+async def set_account_brand(account_id: int, body: AccountBrand, session: AsyncSession = Depends(get_db)):
+    """Set this account's brand voice overrides (null or empty = use the default brand)."""
+    account = await session.get(LinkedInAccount, account_id)
+    if account is None:
+        raise HTTPException(status_code=404, detail="Account not found")
+    for f in BRAND_FIELDS:
+        setattr(account, f, (getattr(body, f) or "").strip() or None)
+    await session.commit()
+    await session.refresh(account)
+    return _brand_out(account)
+
+
+async def _budget_out(session: AsyncSession, account: LinkedInAccount) -> AccountBudgetOut:
+    budget = account.llm_daily_budget_usd
+    return AccountBudgetOut(
+        account_id=account.id,
+        llm_daily_budget_usd=budget,
+        effective_budget_usd=budget if budget is not None else settings.llm_daily_budget_usd,
+        spent_today_usd=round(await get_usage_recorder().spent_today(session, account.id), 6),
+    )
+
+
+@router.get("/{account_id}/budget", response_model=AccountBudgetOut)
+async def get_account_budget(account_id: int, session: AsyncSession = Depends(get_db)):
+    """Daily Gemini budget for this account and today's estimated spend."""
+    account = await session.get(LinkedInAccount, account_id)
+    if account is None:
+        raise HTTPException(status_code=404, detail="Account not found")
+    return await _budget_out(session, account)
+
+
+@router.put("/{account_id}/budget", response_model=AccountBudgetOut)
+async def set_account_budget(account_id: int, body: AccountBudget, session: AsyncSession = Depends(get_db)):
+    """Set this account's daily Gemini budget in USD (null = default, 0 = unlimited)."""
+    account = await session.get(LinkedInAccount, account_id)
+    if account is None:
+        raise HTTPException(status_code=404, detail="Account not found")
+    account.llm_daily_budget_usd = body.llm_daily_budget_usd
+    await session.commit()
+    await session.refresh(account)
+    return await _budget_out(session, account)
+
+
 @router.get("/auth/linkedin")
 async def linkedin_auth_start(
     account_type: str = "personal",
@@ -108,6 +173,8 @@ async def linkedin_callback(
             display_name=display_name,
         )
         await session.commit()
+        # New tokens (and possibly a new URN): publishing must not use the cached ones
+        get_account_cache().invalidate(account.id)
         # Redirect user back to dashboard so they see the account in the dropdown
         return RedirectResponse(url="/?connected=1", status_code=302)
     except Exception as e:
@@ -0,0 +1,57 @@
+"""Admin-only diagnostics: on-demand sampling profiles and the slow-request profile ring buffer."""
+import asyncio
+import hmac
+import threading
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app.config import settings
+from app.utils import profiler
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+async def require_admin(x_admin_token: str = Header(default="")) -> None:
+    """Profiling must be enabled and X-Admin-Token must match ADMIN_TOKEN."""
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not settings.admin_token or not hmac.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@router.get("/profile", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def profile(
+    seconds: float = Query(5.0, gt=0, le=60),
+    mode: str = Query("wall", pattern="^(wall|cpu)$"),
+    interval_ms: int = Query(5, ge=1, le=1000),
+    all_threads: bool = Query(False, description="Sample every thread, not just the event loop"),
+):
+    """
+    Sample stacks for `seconds` and return collapsed stacks (feed to flamegraph.pl or speedscope).
+    mode=cpu drops samples parked in select/lock/queue waits. The profile is also kept in the ring buffer.
+    """
+    thread_ids = None if all_threads else {threading.get_ident()}  # handlers run on the loop thread
+    stacks, taken = await asyncio.to_thread(profiler.sample, seconds, interval_ms / 1000, thread_ids, mode)
+    header = {"mode": mode, "seconds": seconds, "interval_ms": interval_ms, "samples": taken}
+    path = await asyncio.to_thread(profiler.save_profile, f"ondemand-{mode}", stacks, header)
+    return PlainTextResponse(profiler.format_collapsed(stacks), headers={"X-Profile-Name": path.name})
+
+
+@router.get("/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    """Saved profiles (on-demand and slow-request captures), newest first."""
+    return await asyncio.to_thread(profiler.list_profiles)
+
+
+@router.get("/profiles/{name}", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def get_profile(name: str):
+    """One saved profile as collapsed stacks ('#' header lines describe the capture)."""
+    if "/" in name or "\\" in name or not name.endswith(".collapsed"):
+        raise HTTPException(status_code=400, detail="Invalid profile name")
+    path = profiler.profiles_dir() / name
+    try:
+        text = await asyncio.to_thread(path.read_text, encoding="utf-8")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(text)
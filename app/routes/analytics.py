@@ -1,10 +1,12 @@
-"""GET /analytics."""
-from fastapi import APIRouter, Depends
+"""GET /analytics, GET /analytics/usage, GET /analytics/strategy."""
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db import get_db
 from app.services.analytics_service import AnalyticsService
-from app.models.schemas import AnalyticsSummary
+from app.services.llm_usage import get_usage_recorder, usage_report
+from app.services.strategy_bandit import get_strategy_bandit
+from app.models.schemas import AnalyticsSummary, LLMUsageReport
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
@@ -14,3 +16,26 @@ async def get_analytics(session: AsyncSession = Depends(get_db)):
     """Return dashboard analytics from post history."""
     service = AnalyticsService(session)
     return await service.get_summary()
+
+
+@router.get("/usage", response_model=LLMUsageReport)
+async def get_llm_usage(
+    days: int = Query(30, ge=1, le=366),
+    account_id: int | None = None,
+    session: AsyncSession = Depends(get_db),
+):
+    """Estimated Gemini cost and tokens per day, account and model (optionally one account)."""
+    await get_usage_recorder().flush()  # include calls still waiting in the write buffer
+    rows = await usage_report(session, days, account_id)
+    return LLMUsageReport(
+        days=days,
+        total_calls=sum(r["calls"] for r in rows),
+        total_cost_usd=round(sum(r["cost_usd"] for r in rows), 6),
+        rows=rows,
+    )
+
+
+@router.get("/strategy")
+async def get_strategy_posteriors(account_id: int | None = None):
+    """What the strategy bandit has learned: posterior mean and evidence per option (pooled, or one account)."""
+    return get_strategy_bandit().summary(account_id)
@@ -1,145 +1,318 @@
 """POST /generate and POST /regenerate."""
+import asyncio
+import uuid
+from typing import Any
+
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.db import get_db
-from app.models.db_models import PostDraft
-from app.models.schemas import GenerateRequest, GenerateResponse
-from app.workflow.graph import create_post_graph
-from app.utils.helpers import safe_json_dumps
+from app.models.db_models import LinkedInAccount, PostDraft
+from app.models.schemas import DraftVariant, GenerateRequest, GenerateResponse
+from app.services.brand import Brand
+from app.services.dedup_service import compute_signatures, draft_text, get_index, jaccard_estimate, pack_signature
+from app.services.llm_usage import UsageScope, budget_exceeded, get_usage_recorder, usage_scope
+from app.services.provenance import intern_provenance
+from app.workflow import create_post_graph
 from app.utils.logging import get_logger
+from app.utils.metrics import LLM_BUDGET_ACTIONS
 
 logger = get_logger(__name__)
 
 router = APIRouter(prefix="/generate", tags=["generate"])
 _graph = None
 
+# (post, minhash signature, duplicate_of) for each generated variant
+Candidate = tuple[dict[str, str], tuple[int, ...] | None, dict | None]
+
 
 def get_graph():
+    """Compiled post graph, built on first use (imports langgraph) or by the startup warmup."""
     global _graph
     if _graph is None:
         _graph = create_post_graph()
     return _graph
 
 
+async def load_graph():
+    """Compiled graph; a cold build (imports langgraph) runs in a worker thread, off the event loop."""
+    return _graph if _graph is not None else await asyncio.to_thread(get_graph)
+
+
+async def _invoke_deduped(graph, initial: dict) -> tuple[dict, list[Candidate]]:
+    """
+    Run the graph; while every generated post near-duplicates an earlier draft or published post, retry
+    (up to settings.dedup_max_retries) asking for a different angle. Returns (result, candidates) with one
+    (post, signature, duplicate_of) per variant; no candidates on a semantic cache hit.
+    """
+    index = get_index()
+    avoid_hooks: list[str] = []
+    for attempt in range(settings.dedup_max_retries + 1):
+        state = {**initial, "avoid_hooks": avoid_hooks} if avoid_hooks else initial
+        result = await graph.ainvoke(state)
+        if result.get("similar_draft"):
+            # Semantic cache hit: no new post was generated
+            return result, []
+        candidates: list[Candidate] = []
+        posts = result.get("posts") or [result.get("post") or {}]
+        sigs = await compute_signatures([draft_text(p.get("hook"), p.get("body"), p.get("cta")) for p in posts])
+        for post, sig in zip(posts, sigs):
+            matches = index.query(sig)
+            duplicate = None
+            if matches:
+                (kind, match_id), similarity = matches[0]
+                duplicate = {"kind": kind, "id": match_id, "similarity": round(similarity, 3)}
+            candidates.append((post, sig, duplicate))
+        if any(duplicate is None for _, _, duplicate in candidates):
+            return result, candidates
+        for post, _, duplicate in candidates:
+            logger.warning("generate_near_duplicate", attempt=attempt, **duplicate)
+            avoid_hooks = avoid_hooks + [post.get("hook") or ""]
+    return result, candidates
+
+
+async def load_brand(session: AsyncSession, account_id: int | None) -> Brand:
+    """Brand voice for an account (404 if it does not exist), or the default brand."""
+    if account_id is None:
+        return Brand.default()
+    account = await session.get(LinkedInAccount, account_id)
+    if account is None:
+        raise HTTPException(status_code=404, detail="Account not found")
+    return Brand.for_account(account)
+
+
+async def budget_scope(session: AsyncSession, account_id: int | None) -> UsageScope:
+    """
+    Usage scope for Gemini calls made for an account. Over its daily budget (the account's own, else
+    settings.llm_daily_budget_usd) the request is refused with 429 or downgraded to the budget models.
+    """
+    if account_id is None:
+        return UsageScope()
+    account = await session.get(LinkedInAccount, account_id)
+    budget = account.llm_daily_budget_usd if account and account.llm_daily_budget_usd is not None else settings.llm_daily_budget_usd
+    if not budget_exceeded(await get_usage_recorder().spent_today(session, account_id), budget):
+        return UsageScope(account_id)
+    action = "block" if settings.llm_budget_action == "block" else "downgrade"
+    LLM_BUDGET_ACTIONS.labels(action).inc()
+    logger.warning("llm_budget_exceeded", account_id=account_id, budget_usd=budget, action=action)
+    if action == "block":
+        raise HTTPException(status_code=429, detail=f"Daily AI budget of ${budget:g} reached for this account")
+    return UsageScope(account_id, downgrade=True)
+
+
+def _ready_message(duplicate: dict | None) -> str:
+    if not duplicate:
+        return "Your LinkedIn post is ready for review."
+    label = "published post" if duplicate["kind"] == "history" else "draft"
+    return (
+        f"Your LinkedIn post is ready for review. Heads up: it is very similar to an earlier "
+        f"{label} (#{duplicate['id']}, {int(duplicate['similarity'] * 100)}% overlap)."
+    )
+
+
+def _check_variants(variants: int) -> None:
+    if variants > settings.generate_max_variants:
+        raise HTTPException(status_code=400, detail=f"variants must be at most {settings.generate_max_variants}")
+
+
+async def _store_drafts(
+    session: AsyncSession, result: dict, candidates: list[Candidate]
+) -> tuple[list[PostDraft], list[dict | None]]:
+    """
+    Insert one draft per candidate in a single flush. Several candidates are ranked locally (near-duplicates
+    of earlier posts rank lower, near-duplicates of a better sibling are dropped) and share a batch_id.
+    Returns (drafts best-first, duplicate_of per draft).
+    """
+    batch_id = None
+    scores: list[float | None] = [None] * len(candidates)
+    if len(candidates) > 1:
+        from app.services.variant_ranker import load_reference, rank_scores  # numpy; keep off the import path
+
+        batch_id = uuid.uuid4().hex
+        raw = rank_scores([post for post, _, _ in candidates], await load_reference(session))
+        raw = [score * 0.5 if duplicate else score for score, (_, _, duplicate) in zip(raw, candidates)]
+        kept: list[int] = []
+        for i in sorted(range(len(candidates)), key=lambda i: -raw[i]):
+            sig = candidates[i][1]
+            if sig is not None and any(
+                candidates[j][1] is not None and jaccard_estimate(sig, candidates[j][1]) >= settings.dedup_threshold
+                for j in kept
+            ):
+                continue
+            kept.append(i)
+        candidates = [candidates[i] for i in kept]
+        scores = [raw[i] for i in kept]
+
+    insights_id, strategy_id = await intern_provenance(session, result.get("performance_insights"), result.get("strategy"))
+    drafts = [
+        PostDraft(
+            hook=post.get("hook", ""),
+            body=post.get("body", ""),
+            cta=post.get("cta", ""),
+            hashtags=post.get("hashtags", ""),
+            suggested_visual=post.get("suggested_visual"),
+            image_path=result.get("image_path") if batch_id is None else None,
+            insights_id=insights_id,
+            strategy_id=strategy_id,
+            minhash=pack_signature(sig),
+            batch_id=batch_id,
+            rank_score=score,
+        )
+        for (post, sig, _), score in zip(candidates, scores)
+    ]
+    session.add_all(drafts)
+    await session.commit()
+    index = get_index()
+    for draft, (_, sig, _) in zip(drafts, candidates):
+        index.add(("draft", draft.id), sig)
+    if batch_id:
+        logger.info("generate_variants_stored", batch_id=batch_id, drafts=len(drafts), best_score=scores[0])
+    return drafts, [duplicate for _, _, duplicate in candidates]
+
+
+def _draft_preview(draft: PostDraft) -> dict[str, Any]:
+    return {
+        "hook": draft.hook,
+        "body": draft.body,
+        "cta": draft.cta,
+        "hashtags": draft.hashtags,
+        "suggested_visual": draft.suggested_visual,
+    }
+
+
+def _ready_response(drafts: list[PostDraft], duplicates: list[dict | None]) -> GenerateResponse:
+    """Best draft up front; every sibling listed under variants when several were generated."""
+    best = drafts[0]
+    return GenerateResponse(
+        status="ready",
+        message=_ready_message(duplicates[0]),
+        draft_id=best.id,
+        post_preview=_draft_preview(best),
+        image_url=f"/storage/{best.id}" if best.image_path else None,
+        image_path=best.image_path,
+        duplicate_of=duplicates[0],
+        batch_id=best.batch_id,
+        variants=[
+            DraftVariant(draft_id=d.id, rank_score=d.rank_score, post_preview=_draft_preview(d), duplicate_of=dup)
+            for d, dup in zip(drafts, duplicates)
+        ] if best.batch_id else [],
+    )
+
+
+def _flow_error(e: Exception, event: str, unreachable_detail: str) -> HTTPException:
+    """503 when the AI service is unreachable (e.g. just woken on Render), else 500."""
+    if isinstance(e, OSError) and (getattr(e, "errno", None) == 101 or "network is unreachable" in str(e).lower()):
+        logger.warning(f"{event}_network_unreachable", error=str(e))
+        return HTTPException(status_code=503, detail=unreachable_detail)
+    logger.exception(f"{event}_flow_failed", error=str(e))
+    return HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("", response_model=GenerateResponse)
 async def generate_post(
     body: GenerateRequest,
     session: AsyncSession = Depends(get_db),
 ):
-    """Run the full pipeline and return a draft ready for review."""
+    """Run the full pipeline and return a draft ready for review (or several ranked siblings with variants > 1)."""
+    _check_variants(body.variants)
     if body.regenerate_draft_id:
-        return await _regenerate(session, body.regenerate_draft_id)
+        return await _regenerate(session, body.regenerate_draft_id, body.account_id, body.variants)
 
+    brand = await load_brand(session, body.account_id)
+    scope = await budget_scope(session, body.account_id)
     initial: dict = {
         "user_input": body.user_input or None,
         "session": session,
+        "brand": brand,
+        "variants": body.variants,
+        "account_id": body.account_id,
+        # Auto-topic runs (no input) should vary, so only explicit prompts go through the cache
+        "use_semantic_cache": bool(body.user_input) and not body.skip_cache,
     }
-    graph = get_graph()
-    try:
-        result = await graph.ainvoke(initial)
-    except OSError as e:
-        if getattr(e, "errno", None) == 101 or "network is unreachable" in str(e).lower():
-            logger.warning("generate_network_unreachable", error=str(e))
-            raise HTTPException(
-                status_code=503,
-                detail="Network unreachable (AI service). On Render free tier the service may have just woken up—please try again in 10–20 seconds. If it persists, check that GEMINI_API_KEY is set in Render Environment.",
+    graph = await load_graph()
+
+    async def invoke(state: dict) -> tuple[dict, list[Candidate]]:
+        try:
+            with usage_scope(scope):
+                return await _invoke_deduped(graph, state)
+        except Exception as e:
+            raise _flow_error(
+                e,
+                "generate",
+                "Network unreachable (AI service). On Render free tier the service may have just woken up—please try again in 10–20 seconds. If it persists, check that GEMINI_API_KEY is set in Render Environment.",
             ) from e
-        logger.exception("generate_flow_failed", error=str(e))
-        raise HTTPException(status_code=500, detail=str(e)) from e
-    except Exception as e:
-        logger.exception("generate_flow_failed", error=str(e))
-        raise HTTPException(status_code=500, detail=str(e)) from e
-
-    post = result.get("post") or {}
-    hook = post.get("hook", "")
-    body_text = post.get("body", "")  # body content of the post
-    cta = post.get("cta", "")
-    hashtags = post.get("hashtags", "")
-    suggested_visual = post.get("suggested_visual")
-    image_path = result.get("image_path")
-    performance_insights = result.get("performance_insights")
-    strategy = result.get("strategy")
-
-    draft = PostDraft(
-        hook=hook,
-        body=body_text,
-        cta=cta,
-        hashtags=hashtags,
-        suggested_visual=suggested_visual,
-        image_path=image_path,
-        performance_insights=safe_json_dumps(performance_insights),
-        strategy=safe_json_dumps(strategy),
-    )
-    session.add(draft)
-    await session.commit()
-    await session.refresh(draft)
-
-    post_preview = {
-        "hook": hook,
-        "body": body_text,
-        "cta": cta,
-        "hashtags": hashtags,
-        "suggested_visual": suggested_visual,
-    }
+
+    result, candidates = await invoke(initial)
+    similar = result.get("similar_draft")
+    if similar:
+        existing = await session.get(PostDraft, similar["draft_id"])
+        if existing:
+            return _similar_draft_response(existing, similar["similarity"])
+        # The cached draft was deleted since: forget it and generate a new post
+        from app.services.semantic_cache import get_semantic_cache  # numpy; keep off the import path
+
+        get_semantic_cache().discard(similar["draft_id"])
+        logger.info("semantic_cache_stale_draft", draft_id=similar["draft_id"])
+        result, candidates = await invoke({**initial, "use_semantic_cache": False})
+
+    drafts, duplicates = await _store_drafts(session, result, candidates)
+    if body.user_input and len(drafts) == 1:
+        from app.services.semantic_cache import get_semantic_cache  # numpy; keep off the import path
+
+        strategy = result.get("strategy")
+        get_semantic_cache().add(
+            result.get("optimized_input") or "", {**(strategy or {}), "brand": brand.name}, drafts[0].id, candidates[0][0]
+        )
+    return _ready_response(drafts, duplicates)
+
+
+def _similar_draft_response(draft: PostDraft, similarity: float) -> GenerateResponse:
+    """Offer an existing draft for a near-identical prompt instead of generating again."""
     return GenerateResponse(
-        status="ready",
-        message="Your LinkedIn post is ready for review.",
+        status="similar",
+        message=(
+            f"A similar draft already exists (#{draft.id}). "
+            "Review it, or generate again with skip_cache to get a fresh one."
+        ),
         draft_id=draft.id,
-        post_preview=post_preview,
+        post_preview=_draft_preview(draft),
         image_url=f"/storage/{draft.id}" if draft.image_path else None,
         image_path=draft.image_path,
+        cache_similarity=similarity,
     )
 
 
-async def _regenerate(session: AsyncSession, draft_id: int) -> GenerateResponse:
+async def _regenerate(
+    session: AsyncSession, draft_id: int, account_id: int | None = None, variants: int = 1
+) -> GenerateResponse:
     """Regenerate from an existing draft (use its content as user_input)."""
     r = await session.execute(select(PostDraft).where(PostDraft.id == draft_id))
     existing = r.scalar_one_or_none()
     if not existing:
         raise HTTPException(status_code=404, detail="Draft not found")
     user_input = f"{existing.hook}\n\n{existing.body}\n\n{existing.cta}"
-    initial = {"user_input": user_input, "session": session}
-    graph = get_graph()
+    initial = {
+        "user_input": user_input,
+        "session": session,
+        "brand": await load_brand(session, account_id),
+        "variants": variants,
+        "account_id": account_id,
+    }
+    scope = await budget_scope(session, account_id)
+    graph = await load_graph()
     try:
-        result = await graph.ainvoke(initial)
-    except OSError as e:
-        if getattr(e, "errno", None) == 101 or "network is unreachable" in str(e).lower():
-            logger.warning("regenerate_network_unreachable", error=str(e))
-            raise HTTPException(
-                status_code=503,
-                detail="Network unreachable (AI service). Try again in 10–20 seconds; on Render free tier the service may have just woken up.",
-            ) from e
-        raise HTTPException(status_code=500, detail=str(e)) from e
-    post = result.get("post") or {}
-    draft = PostDraft(
-        hook=post.get("hook", ""),
-        body=post.get("body", ""),
-        cta=post.get("cta", ""),
-        hashtags=post.get("hashtags", ""),
-        suggested_visual=post.get("suggested_visual"),
-        image_path=result.get("image_path"),
-        performance_insights=safe_json_dumps(result.get("performance_insights")),
-        strategy=safe_json_dumps(result.get("strategy")),
-    )
-    session.add(draft)
-    await session.commit()
-    await session.refresh(draft)
-    return GenerateResponse(
-        status="ready",
-        message="Your LinkedIn post is ready for review.",
-        draft_id=draft.id,
-        post_preview={
-            "hook": draft.hook,
-            "body": draft.body,
-            "cta": draft.cta,
-            "hashtags": draft.hashtags,
-            "suggested_visual": draft.suggested_visual,
-        },
-        image_url=f"/storage/{draft.id}" if draft.image_path else None,
-        image_path=draft.image_path,
-    )
+        with usage_scope(scope):
+            result, candidates = await _invoke_deduped(graph, initial)
+    except Exception as e:
+        raise _flow_error(
+            e,
+            "regenerate",
+            "Network unreachable (AI service). Try again in 10–20 seconds; on Render free tier the service may have just woken up.",
+        ) from e
+    drafts, duplicates = await _store_drafts(session, result, candidates)
+    return _ready_response(drafts, duplicates)
 
 
 @router.post("/regenerate", response_model=GenerateResponse)
@@ -150,7 +323,8 @@ async def regenerate_post(
     """Regenerate a new draft from an existing one (pass regenerate_draft_id in body)."""
     if not body.regenerate_draft_id:
         raise HTTPException(status_code=400, detail="regenerate_draft_id required")
-    return await _regenerate(session, body.regenerate_draft_id)
+    _check_variants(body.variants)
+    return await _regenerate(session, body.regenerate_draft_id, body.account_id, body.variants)
 
 
 # Standalone POST /regenerate (same as above, for API surface in FLOW.md)
@@ -165,4 +339,5 @@ async def regenerate_standalone(
     """Regenerate from existing draft. Body: { \"regenerate_draft_id\": <id> }."""
     if not body.regenerate_draft_id:
         raise HTTPException(status_code=400, detail="regenerate_draft_id required")
-    return await _regenerate(session, body.regenerate_draft_id)
+    _check_variants(body.variants)
+    return await _regenerate(session, body.regenerate_draft_id, body.account_id, body.variants)
@@ -1,17 +1,19 @@
 """GET /post-history, GET/PATCH drafts, GET scheduled, POST generate-image."""
 import asyncio
-import uuid
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.config import settings
 from app.db import get_db
 from app.models.db_models import PostDraft, PostHistory, ScheduledPost
-from app.models.schemas import PostDraftOut, PostHistoryOut, ScheduledPostOut, UpdateDraftRequest
+from app.models.schemas import PostDraftOut, PostHistoryOut, PostMetrics, PostMetricsResult, ScheduledPostOut, UpdateDraftRequest
+from app.services.dedup_service import compute_signatures, draft_text, get_index, pack_signature, unpack_signature
+from app.services import image_store
 from app.services.gemini_service import generate_image
-from app.utils.helpers import safe_json_loads
+from app.routes.generate import budget_scope, load_brand
+from app.services.llm_usage import usage_scope
+from app.services.strategy_bandit import get_strategy_bandit, history_arms
 
 router = APIRouter(prefix="/post-history", tags=["history"])
 
@@ -29,16 +31,79 @@ async def list_post_history(
     return [PostHistoryOut.model_validate(p) for p in posts]
 
 
+@router.post("/metrics", response_model=PostMetricsResult)
+async def ingest_metrics(
+    body: list[PostMetrics],
+    session: AsyncSession = Depends(get_db),
+):
+    """
+    Store engagement for published posts (latest figures replace earlier ones) and feed them to the strategy
+    bandit, crediting the strategy each post was generated with.
+    """
+    ids = [m.history_id for m in body]
+    r = await session.execute(select(PostHistory).where(PostHistory.id.in_(ids)))
+    posts = {p.id: p for p in r.scalars().all()}
+    changes = []
+    for m in body:
+        post = posts.get(m.history_id)
+        if post is None:
+            continue
+        old_impressions, old_rate = post.impressions, post.engagement_rate
+        if m.impressions is not None:
+            post.impressions = m.impressions
+        rate = m.engagement_rate
+        if rate is None and m.engagements is not None and post.impressions:
+            rate = min(1.0, m.engagements / post.impressions)
+        if rate is not None:
+            post.engagement_rate = rate
+        if (post.impressions, post.engagement_rate) == (old_impressions, old_rate):
+            continue  # nothing supplied, derivable or different
+        changes.append((post.account_id, history_arms(post.strategy, post.hook_style), old_rate, post.engagement_rate))
+    await session.commit()
+    bandit = get_strategy_bandit()
+    for account_id, arms, old_rate, new_rate in changes:  # only once the figures are stored
+        if new_rate != old_rate:
+            bandit.observe_metrics(account_id, arms, old_rate, new_rate)
+    return PostMetricsResult(updated=len(changes), missing=[i for i in dict.fromkeys(ids) if i not in posts])
+
+
 @router.get("/drafts", response_model=list[PostDraftOut])
 async def list_drafts(
     limit: int = 20,
+    collapse_duplicates: bool = False,
+    batch_id: str | None = None,
     session: AsyncSession = Depends(get_db),
 ):
-    """List draft posts (for review/publish)."""
-    r = await session.execute(
-        select(PostDraft).order_by(PostDraft.updated_at.desc()).limit(limit)
-    )
+    """
+    List draft posts (for review/publish). collapse_duplicates=true keeps only the newest of each near-duplicate group.
+    batch_id lists the sibling variants of one generation, best-ranked first.
+    """
+    # Over-fetch when collapsing so the page still fills up after duplicates are folded away
+    fetch = limit * 4 if collapse_duplicates else limit
+    stmt = select(PostDraft)
+    if batch_id:
+        stmt = stmt.where(PostDraft.batch_id == batch_id).order_by(PostDraft.rank_score.desc().nullslast(), PostDraft.id)
+    else:
+        stmt = stmt.order_by(PostDraft.updated_at.desc())
+    r = await session.execute(stmt.limit(fetch))
     drafts = list(r.scalars().all())
+    collapsed: dict[int, list[int]] = {}
+    if collapse_duplicates:
+        index = get_index()
+        signatures = await _draft_signatures(session, drafts)
+        kept: list[PostDraft] = []
+        owner: dict[int, int] = {}  # draft id -> id of the kept draft it was folded into
+        for d in drafts:
+            matches = index.query(signatures[d.id], kind="draft", exclude=("draft", d.id))
+            target = next((owner[m_id] for (_, m_id), _sim in matches if m_id in owner), None)
+            if target is not None:
+                collapsed[target].append(d.id)
+                owner[d.id] = target
+                continue
+            kept.append(d)
+            owner[d.id] = d.id
+            collapsed[d.id] = []
+        drafts = kept[:limit]
     out = []
     for d in drafts:
         data = {
@@ -49,15 +114,39 @@ async def list_drafts(
             "hashtags": d.hashtags,
             "suggested_visual": d.suggested_visual,
             "image_path": d.image_path,
-            "performance_insights": safe_json_loads(d.performance_insights) if isinstance(d.performance_insights, str) else d.performance_insights,
-            "strategy": safe_json_loads(d.strategy) if isinstance(d.strategy, str) else d.strategy,
+            "performance_insights": d.performance_insights,
+            "strategy": d.strategy,
             "created_at": d.created_at,
             "updated_at": d.updated_at,
+            "duplicate_ids": collapsed.get(d.id, []),
+            "batch_id": d.batch_id,
+            "rank_score": d.rank_score,
         }
         out.append(PostDraftOut(**data))
     return out
 
 
+async def _draft_signatures(session: AsyncSession, drafts: list[PostDraft]) -> dict[int, tuple[int, ...] | None]:
+    """
+    Signature per draft id: from the index, else the stored column; rows written before signatures existed
+    get one computed (off the event loop) and saved, so later listings find it.
+    """
+    index = get_index()
+    sigs = {d.id: index.signature(("draft", d.id)) or unpack_signature(d.minhash) for d in drafts}
+    missing = [d for d in drafts if sigs[d.id] is None]
+    if missing:
+        computed = await compute_signatures([draft_text(d.hook, d.body, d.cta) for d in missing])
+        # updated_at passed through so the backfill does not count as an edit (the list is ordered by it)
+        await session.execute(update(PostDraft), [
+            {"id": d.id, "minhash": pack_signature(sig), "updated_at": d.updated_at} for d, sig in zip(missing, computed)
+        ])
+        await session.commit()
+        for d, sig in zip(missing, computed):
+            sigs[d.id] = sig
+            index.add(("draft", d.id), sig)
+    return sigs
+
+
 @router.get("/drafts/{draft_id}", response_model=PostDraftOut)
 async def get_draft(
     draft_id: int,
@@ -76,10 +165,12 @@ async def get_draft(
         hashtags=d.hashtags,
         suggested_visual=d.suggested_visual,
         image_path=d.image_path,
-        performance_insights=safe_json_loads(d.performance_insights) if isinstance(d.performance_insights, str) else d.performance_insights,
-        strategy=safe_json_loads(d.strategy) if isinstance(d.strategy, str) else d.strategy,
+        performance_insights=d.performance_insights,
+        strategy=d.strategy,
         created_at=d.created_at,
         updated_at=d.updated_at,
+        batch_id=d.batch_id,
+        rank_score=d.rank_score,
     )
 
 
@@ -102,8 +193,11 @@ async def update_draft(
         d.cta = body.cta
     if body.hashtags is not None:
         d.hashtags = body.hashtags
+    (signature,) = await compute_signatures([draft_text(d.hook, d.body, d.cta)])
+    d.minhash = pack_signature(signature)
     await session.commit()
     await session.refresh(d)
+    get_index().add(("draft", d.id), signature)
     return PostDraftOut(
         id=d.id,
         hook=d.hook,
@@ -112,19 +206,25 @@ async def update_draft(
         hashtags=d.hashtags,
         suggested_visual=d.suggested_visual,
         image_path=d.image_path,
-        performance_insights=safe_json_loads(d.performance_insights) if isinstance(d.performance_insights, str) else d.performance_insights,
-        strategy=safe_json_loads(d.strategy) if isinstance(d.strategy, str) else d.strategy,
+        performance_insights=d.performance_insights,
+        strategy=d.strategy,
         created_at=d.created_at,
         updated_at=d.updated_at,
+        batch_id=d.batch_id,
+        rank_score=d.rank_score,
     )
 
 
 @router.post("/drafts/{draft_id}/generate-image")
 async def generate_draft_image(
     draft_id: int,
+    account_id: int | None = None,
     session: AsyncSession = Depends(get_db),
 ):
-    """Generate an image for this draft (relevant to post content). Optional; call when user clicks Generate image."""
+    """
+    Generate an image for this draft (relevant to post content). Optional; call when user clicks Generate image.
+    account_id selects the brand's visual style (default brand if omitted).
+    """
     r = await session.execute(select(PostDraft).where(PostDraft.id == draft_id))
     draft = r.scalar_one_or_none()
     if not draft:
@@ -134,12 +234,15 @@ async def generate_draft_image(
     suggested_visual = draft.suggested_visual or ""
     if not (hook or body or suggested_visual):
         raise HTTPException(status_code=400, detail="Draft has no content to generate image from")
-    storage_dir = settings.storage_dir
-    name = f"linkedin_{uuid.uuid4().hex[:12]}.png"
-    output_path = storage_dir / name
-    path, error_message = await asyncio.to_thread(generate_image, hook, body, suggested_visual, output_path)
-    if path and path.exists() and path.stat().st_size > 0:
-        draft.image_path = path.name
+    brand = await load_brand(session, account_id)
+    scope = await budget_scope(session, account_id)
+    output_path = await asyncio.to_thread(image_store.temp_path)
+    with usage_scope(scope):
+        path, error_message = await asyncio.to_thread(generate_image, hook, body, suggested_visual, output_path, brand)
+    image_path = await asyncio.to_thread(image_store.ingest, path)
+    if image_path:
+        # The previous image (if any) is left for the GC, which removes it once no draft references it
+        draft.image_path = image_path
         await session.commit()
         await session.refresh(draft)
         return {"image_url": f"/storage/{draft_id}", "image_path": draft.image_path}
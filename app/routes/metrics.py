@@ -0,0 +1,13 @@
+"""GET /metrics: Prometheus text exposition of in-process metrics."""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.utils.metrics import render_metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Request/node/Gemini/LinkedIn latency histograms, error counts, DB pool wait, scheduler queue depth."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
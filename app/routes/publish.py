@@ -1,16 +1,19 @@
 """POST /publish: smart schedule or post immediately; enqueue job for scheduled."""
+import asyncio
 from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+from sqlalchemy import insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db import get_db
 from app.models.db_models import PostDraft, PostHistory, ScheduledPost
 from app.models.schemas import PublishRequest
-from app.services.linkedin_service import LinkedInService
+from app.services.dedup_service import compute_signatures, get_index, pack_signature
+from app.services.linkedin_service import LinkedInService, close_client, load_image
 from app.agents.scheduler_agent import scheduler_agent
 from app.workflow.state import WorkflowState
-from app.utils.helpers import safe_json_loads
+from app.utils.app_loop import on_app_loop, run_on_app_loop
+from app.utils.post_features import extract_post_features
 from app.utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -36,18 +39,29 @@ async def publish(
     session: AsyncSession = Depends(get_db),
 ):
     """
-    Publish a draft: if current time is optimal, post now; else schedule for next best slot.
-    Pass schedule_override to force a specific time.
+    Publish a draft to one or more accounts: if current time is optimal, post now; else schedule for next best slot.
+    Pass schedule_override to force a specific time. The draft is rendered once and posted to all accounts
+    concurrently; `results` has one entry per account.
     """
     # Load draft
     r = await session.execute(select(PostDraft).where(PostDraft.id == body.draft_id))
     draft = r.scalar_one_or_none()
     if not draft:
         raise HTTPException(status_code=404, detail="Draft not found")
+    # Hash the image in a thread while accounts load and the schedule is worked out
+    image_task = (
+        asyncio.create_task(load_image(draft.image_path)) if body.include_image and draft.image_path else None
+    )
+    linkedin = LinkedInService(session)
+    accounts = await linkedin.load_accounts(body.account_ids)
+    missing = [i for i in body.account_ids if i not in accounts]
+    if missing:
+        if image_task is not None:
+            image_task.cancel()
+        raise HTTPException(status_code=404, detail=f"Account(s) not found: {missing}")
 
     full_text = f"{draft.hook}\n\n{draft.body}\n\n{draft.cta}\n\n{draft.hashtags}".strip()
-    insights = safe_json_loads(draft.performance_insights) if isinstance(draft.performance_insights, str) else draft.performance_insights
-    state: WorkflowState = {"performance_insights": insights or {}}
+    state: WorkflowState = {"performance_insights": draft.performance_insights or {}}
     schedule_hint = scheduler_agent(state)
     suggested_immediate = schedule_hint.get("suggested_immediate", False)
     suggested_at = schedule_hint.get("suggested_scheduled_at")
@@ -65,54 +79,99 @@ async def publish(
                 scheduled_at = None
 
     if post_now or (scheduled_at and scheduled_at <= datetime.now(timezone.utc)):
-        # Publish immediately
-        linkedin = LinkedInService(session)
-        post_id = await linkedin.create_ugc_post(body.account_id, full_text)
-        await session.flush()
-        history = PostHistory(
-            account_id=body.account_id,
-            content_text=full_text,
-            linkedin_post_id=post_id,
-            published_at=datetime.now(timezone.utc),
-        )
-        session.add(history)
+        # Publish immediately, to all accounts at once
+        image = await image_task if image_task is not None else None
+        post_ids = await linkedin.create_ugc_posts([accounts[i] for i in body.account_ids], full_text, image)
+        published = [i for i in body.account_ids if post_ids[i] is not None]
+        history_ids: dict[int, int] = {}
+        if published:
+            now = datetime.now(timezone.utc)
+            features = extract_post_features(full_text)
+            (signature,) = await compute_signatures([full_text])
+            minhash = pack_signature(signature)
+            rows = [
+                {"account_id": i, "content_text": full_text, "linkedin_post_id": post_ids[i], "published_at": now,
+                 "created_at": now, "minhash": minhash, "strategy_id": draft.strategy_id, **features}
+                for i in published
+            ]
+            r = await session.execute(
+                insert(PostHistory).returning(PostHistory.id, sort_by_parameter_order=True), rows
+            )
+            history_ids = dict(zip(published, r.scalars()))
+            await session.execute(_mark_published(draft.id, now))
         await session.commit()
-        return {"status": "published", "linkedin_post_id": post_id, "scheduled_at": None}
+        index = get_index()
+        for history_id in history_ids.values():
+            index.add(("history", history_id), signature)
+        results = [
+            {"account_id": i, "status": "published" if post_ids[i] is not None else "failed",
+             "linkedin_post_id": post_ids[i], "history_id": history_ids.get(i)}
+            for i in body.account_ids
+        ]
+        status = "published" if len(published) == len(results) else "partial" if published else "failed"
+        logger.info("publish_fan_out", draft_id=body.draft_id, accounts=len(results), published=len(published), image=image is not None)
+        first = post_ids[published[0]] if published else None
+        return {"status": status, "linkedin_post_id": first, "scheduled_at": None, "image": image is not None, "results": results}
     else:
-        # Schedule for later
+        # Schedule for later: one job per account
+        if image_task is not None:
+            image_task.cancel()
         if not scheduled_at:
             from datetime import timedelta
             scheduled_at = datetime.now(timezone.utc) + timedelta(days=1)
-        scheduled = ScheduledPost(
-            draft_id=body.draft_id,
-            account_id=body.account_id,
-            scheduled_at=scheduled_at,
-            status="pending",
-        )
-        session.add(scheduled)
+        scheduled = [
+            ScheduledPost(
+                draft_id=body.draft_id, account_id=i, scheduled_at=scheduled_at, status="pending",
+                include_image=body.include_image,
+            )
+            for i in body.account_ids
+        ]
+        session.add_all(scheduled)
         await session.commit()
-        await session.refresh(scheduled)
-        # Enqueue APScheduler job
+        # Enqueue APScheduler jobs
         sched = get_scheduler()
         if sched:
-            sched.add_job(
-                run_scheduled_publish,
-                "date",
-                run_date=scheduled_at,
-                id=f"scheduled_{scheduled.id}",
-                args=[scheduled.id],
-                replace_existing=True,
-            )
-        return {"status": "scheduled", "scheduled_at": scheduled_at.isoformat(), "scheduled_post_id": scheduled.id}
+            for row in scheduled:
+                sched.add_job(
+                    run_scheduled_publish,
+                    "date",
+                    run_date=scheduled_at,
+                    id=f"scheduled_{row.id}",
+                    args=[row.id],
+                    replace_existing=True,
+                )
+        results = [{"account_id": row.account_id, "status": "scheduled", "scheduled_post_id": row.id} for row in scheduled]
+        return {
+            "status": "scheduled",
+            "scheduled_at": scheduled_at.isoformat(),
+            "scheduled_post_id": scheduled[0].id,
+            "results": results,
+        }
+
+
+def _mark_published(draft_id: int, at: datetime):
+    """Record a draft's first publish. Not an edit: updated_at (draft list order, image GC recency) is kept."""
+    return (
+        update(PostDraft)
+        .where(PostDraft.id == draft_id, PostDraft.published_at.is_(None))
+        .values(published_at=at, updated_at=PostDraft.updated_at)
+    )
 
 
 def run_scheduled_publish(scheduled_post_id: int):
-    """Background job (sync): load scheduled post, publish via LinkedIn, update status and history."""
-    import asyncio
-    asyncio.run(_run_scheduled_publish(scheduled_post_id))
+    """Background job (sync): load scheduled post, publish via LinkedIn, update status and history (on the app loop)."""
+    run_on_app_loop(_run_scheduled_publish(scheduled_post_id))
 
 
 async def _run_scheduled_publish(scheduled_post_id: int):
+    try:
+        await _publish_scheduled(scheduled_post_id)
+    finally:
+        if not on_app_loop():  # a client opened on a loop of its own would outlive it
+            await close_client()
+
+
+async def _publish_scheduled(scheduled_post_id: int):
     from app.models.db_models import init_db
     factory = init_db()
     if factory is None:
@@ -131,14 +190,23 @@ async def _run_scheduled_publish(scheduled_post_id: int):
             return
         full_text = f"{draft.hook}\n\n{draft.body}\n\n{draft.cta}\n\n{draft.hashtags}".strip()
         linkedin = LinkedInService(session)
-        post_id = await linkedin.create_ugc_post(row.account_id, full_text)
+        image = await load_image(draft.image_path) if row.include_image else None
+        post_id = await linkedin.create_ugc_post(row.account_id, full_text, image)
         row.status = "published" if post_id else "failed"
+        now = datetime.now(timezone.utc)
+        if post_id:
+            await session.execute(_mark_published(draft.id, now))
         history = PostHistory(
             account_id=row.account_id,
             content_text=full_text,
             linkedin_post_id=post_id,
-            published_at=datetime.now(timezone.utc),
+            published_at=now,
+            strategy_id=draft.strategy_id,
+            **extract_post_features(full_text),
         )
+        (signature,) = await compute_signatures([full_text])
+        history.minhash = pack_signature(signature)
         session.add(history)
         await session.commit()
+        get_index().add(("history", history.id), signature)
     logger.info("scheduled_publish_done", scheduled_post_id=scheduled_post_id, linkedin_post_id=post_id)
@@ -1,36 +1,171 @@
 """Serve generated draft images by draft_id."""
-from pathlib import Path
+import asyncio
+import re
 
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import FileResponse
+import httpx
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import PlainTextResponse, RedirectResponse, Response
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.types import Receive, Scope, Send
 
 from app.config import settings
 from app.db import get_db
 from app.models.db_models import PostDraft
+from app.services import image_store
+from app.utils.file_cache import CachedFile, OpenFileCache
 
 router = APIRouter(prefix="/storage", tags=["storage"])
 
+_CHUNK = 1024 * 1024
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_file_cache = OpenFileCache(
+    max_entries=settings.storage_file_cache_entries,
+    max_body_bytes=settings.storage_file_cache_mb * 1024 * 1024,
+    max_file_bytes=settings.storage_file_cache_max_file_kb * 1024,
+    valid_seconds=settings.storage_file_cache_valid_seconds,
+)
+
 
 @router.get("/{draft_id}")
 async def get_draft_image(
     draft_id: int,
+    request: Request,
     session: AsyncSession = Depends(get_db),
 ):
-    """Return the generated image for a draft if it exists."""
-    r = await session.execute(select(PostDraft).where(PostDraft.id == draft_id))
-    draft = r.scalar_one_or_none()
-    if not draft or not draft.image_path:
+    """
+    Return the generated image for a draft if it exists (or redirect to it when the storage backend serves it).
+    Supports conditional requests (ETag) and single byte ranges (206).
+    """
+    r = await session.execute(select(PostDraft.image_path).where(PostDraft.id == draft_id))
+    image_path = r.scalar_one_or_none()
+    if not image_path:
         raise HTTPException(status_code=404, detail="Image not found")
-    raw = Path(draft.image_path)
-    # Resolve relative to storage dir (we store filename or relative path)
-    path = (settings.storage_dir / raw) if not raw.is_absolute() else raw
-    path = path.resolve()
     try:
-        path.relative_to(settings.storage_dir.resolve())
+        url = image_store.public_url(image_path)
     except ValueError:
         raise HTTPException(status_code=403, detail="Invalid path")
-    if not path.is_file() or path.stat().st_size == 0:
+    if url:
+        return RedirectResponse(url, status_code=307)
+    file = _file_cache.get(image_path) or await asyncio.to_thread(_load, image_path)
+    return _image_response(image_path, file, request, image_store.content_type(image_path))
+
+
+def _load(image_path: str) -> CachedFile:
+    """Local file for a stored image via the storage backend, stat'ed into the cache (blocking; run in a thread)."""
+    try:
+        path = image_store.local_file(image_path)
+        if path is None:
+            raise HTTPException(status_code=404, detail="Image file not found")
+        file = _file_cache.load(image_path, path)
+    except ValueError:
+        raise HTTPException(status_code=403, detail="Invalid path")
+    except httpx.HTTPError:
+        raise HTTPException(status_code=502, detail="Image storage unavailable")
+    except OSError:
+        raise HTTPException(status_code=404, detail="Image file not found")
+    if file.size == 0:
         raise HTTPException(status_code=404, detail="Image file not found")
-    return FileResponse(path, media_type="image/png")
+    return file
+
+
+def _byte_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    (start, end) of a single `bytes=` range, end exclusive. None means ignore the header and send the whole
+    file (malformed or multi-range; RFC 9110 allows this). Raises ValueError if the range is unsatisfiable.
+    """
+    m = _RANGE_RE.match(header.strip())
+    if not m or m.group(1) == m.group(2) == "":
+        return None
+    first, last = m.groups()
+    if first == "":  # suffix range: the last N bytes
+        if int(last) == 0:
+            raise ValueError("empty suffix range")
+        return max(0, size - int(last)), size
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError("range starts past the end")
+    return start, min(int(last) + 1, size) if last else size
+
+
+def _image_response(image_path: str, file: CachedFile, request: Request, media_type: str) -> Response:
+    headers = {"etag": file.etag, "last-modified": file.last_modified, "accept-ranges": "bytes", "cache-control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (
+        if_none_match.strip() == "*" or file.etag in (t.strip().removeprefix("W/") for t in if_none_match.split(","))
+    ):
+        return Response(status_code=304, headers=headers)
+
+    start, end, status = 0, file.size, 200
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() in (file.etag, file.last_modified)):
+        try:
+            byte_range = _byte_range(range_header, file.size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "content-range": f"bytes */{file.size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            status = 206
+            headers["content-range"] = f"bytes {start}-{end - 1}/{file.size}"
+
+    if file.body is not None:
+        body = file.body if (start, end) == (0, file.size) else file.body[start:end]
+        return Response(body, status_code=status, headers=headers, media_type=media_type)
+    return _FileSliceResponse(image_path, file, start, end, status, headers, media_type)
+
+
+class _FileSliceResponse(Response):
+    """
+    Bytes [start, end) of a file. Handed to the server when it offers the ASGI pathsend (whole file) or
+    zerocopy (sendfile) extension; otherwise read in 1 MiB chunks off the event loop.
+    """
+
+    def __init__(
+        self, key: str, file: CachedFile, start: int, end: int, status_code: int, headers: dict[str, str], media_type: str
+    ):
+        self.key = key
+        self.path = file.path
+        self.size = file.size
+        self.start = start
+        self.end = end
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        self.init_headers({**headers, "content-length": str(end - start)})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        extensions = scope.get("extensions") or {}
+        start_message = {"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers}
+        if "http.response.pathsend" in extensions and (self.start, self.end) == (0, self.size):
+            await send(start_message)
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+            return
+        try:
+            f = await asyncio.to_thread(self.path.open, "rb")
+        except OSError:
+            _file_cache.invalidate(self.key)  # removed since it was stat'ed (e.g. by the GC)
+            await PlainTextResponse("Image file not found", status_code=404)(scope, receive, send)
+            return
+        try:
+            await send(start_message)
+            if "http.response.zerocopy" in extensions:
+                await send({
+                    "type": "http.response.zerocopy", "file": f.fileno(),
+                    "offset": self.start, "count": self.end - self.start, "more_body": False,
+                })
+                return
+            await asyncio.to_thread(f.seek, self.start)
+            remaining = self.end - self.start
+            while remaining > 0:
+                chunk = await asyncio.to_thread(f.read, min(_CHUNK, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            await asyncio.to_thread(f.close)
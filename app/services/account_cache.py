@@ -0,0 +1,115 @@
+"""Per-process cache of LinkedIn accounts and their tokens, so publishing needs no account lookup."""
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.db_models import LinkedInAccount
+from app.utils.metrics import ACCOUNT_CACHE_REQUESTS
+
+
+@dataclass
+class CachedAccount:
+    """Snapshot of a LinkedInAccount row; the fields publishing needs."""
+
+    id: int
+    account_type: str
+    display_name: str
+    linkedin_urn: str | None
+    access_token: str | None
+    refresh_token: str | None
+    token_expires_at: datetime | None
+    is_active: bool
+
+    @classmethod
+    def from_row(cls, row: LinkedInAccount) -> "CachedAccount":
+        expires = row.token_expires_at
+        if expires is not None and expires.tzinfo is None:
+            expires = expires.replace(tzinfo=timezone.utc)  # SQLite drops the offset
+        return cls(
+            id=row.id,
+            account_type=row.account_type,
+            display_name=row.display_name,
+            linkedin_urn=row.linkedin_urn,
+            access_token=row.access_token,
+            refresh_token=row.refresh_token,
+            token_expires_at=expires,
+            is_active=bool(row.is_active),
+        )
+
+    def expires_within(self, seconds: float) -> bool:
+        """True if the access token expires within `seconds` (unknown expiry counts as not expiring)."""
+        if self.token_expires_at is None:
+            return False
+        return self.token_expires_at <= datetime.now(timezone.utc) + timedelta(seconds=seconds)
+
+
+class AccountCache:
+    """
+    Account snapshots by id with a TTL (ACCOUNT_CACHE_TTL_SECONDS). Thread-safe: scheduler jobs run on
+    their own threads and loops. Entries are replaced on token refresh and dropped on OAuth callback.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl = ttl_seconds
+        self._entries: dict[int, tuple[float, CachedAccount]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, account_id: int) -> CachedAccount | None:
+        with self._lock:
+            item = self._entries.get(account_id)
+            if item is None:
+                return None
+            if time.monotonic() - item[0] > self.ttl:
+                del self._entries[account_id]
+                return None
+            return item[1]
+
+    def put(self, account: CachedAccount) -> CachedAccount:
+        with self._lock:
+            self._entries[account.id] = (time.monotonic(), account)
+        return account
+
+    def invalidate(self, account_id: int | None = None) -> None:
+        """Drop one account, or all of them."""
+        with self._lock:
+            if account_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(account_id, None)
+
+    async def get_many(self, session: AsyncSession, account_ids: list[int]) -> dict[int, CachedAccount]:
+        """Accounts by id: fresh entries from the cache, the rest in one query. Unknown ids are absent."""
+        found: dict[int, CachedAccount] = {}
+        misses = []
+        for account_id in account_ids:
+            cached = self.get(account_id)
+            if cached is not None:
+                found[account_id] = cached
+            else:
+                misses.append(account_id)
+        ACCOUNT_CACHE_REQUESTS.labels("hit").inc(len(found))
+        if misses:
+            ACCOUNT_CACHE_REQUESTS.labels("miss").inc(len(misses))
+            r = await session.execute(select(LinkedInAccount).where(LinkedInAccount.id.in_(misses)))
+            for row in r.scalars():
+                found[row.id] = self.put(CachedAccount.from_row(row))
+        return found
+
+
+_cache: AccountCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_account_cache() -> AccountCache:
+    """Process-wide account cache."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AccountCache(settings.account_cache_ttl_seconds)
+    return _cache
@@ -13,6 +13,18 @@ from app.utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Used until post_history has engagement data to learn from
+DEFAULT_IDEAL_LENGTH = "150-300 words for body; hook under 2 lines"
+DEFAULT_HOOK_STYLE_PATTERN = "Strong opening line; question or stat or story"
+
+HOOK_STYLE_PATTERNS = {
+    "question": "Open with a direct question to the reader",
+    "stat": "Open with a concrete number or stat",
+    "story": "Open with a first-person story moment",
+    "emoji": "Open with a short line led by an emoji",
+    "statement": "Open with a bold one-line statement",
+}
+
 
 class AnalyticsService:
     """Compute analytics and performance insights from PostHistory."""
@@ -71,15 +83,69 @@ class AnalyticsService:
             top_posts=top_posts[:10],
         )
 
+    async def _history_feature_stats(self) -> Any:
+        """
+        One aggregate over post_history feature columns: engagement-weighted word-count
+        quantiles (cumulative weight over rows ordered by word_count), engagement-weighted median
+        line count (its own cumulative weight, ordered by line_count), and the hook style with the highest mean engagement. None when there is no signal.
+        """
+        weight = func.coalesce(PostHistory.engagement_rate, 0.0)
+        w = (
+            select(
+                PostHistory.word_count.label("word_count"),
+                PostHistory.line_count.label("line_count"),
+                PostHistory.hook_style.label("hook_style"),
+                weight.label("weight"),
+                func.sum(weight).over(order_by=(PostHistory.word_count, PostHistory.id)).label("cum"),
+                func.sum(weight).over(order_by=(PostHistory.line_count, PostHistory.id)).label("line_cum"),
+                func.sum(weight).over().label("total"),
+            )
+            .where(PostHistory.word_count.is_not(None))
+            .cte("w")
+        )
+        best_hook = (
+            select(w.c.hook_style)
+            .where(w.c.hook_style.is_not(None))
+            .group_by(w.c.hook_style)
+            .order_by(func.avg(w.c.weight).desc(), func.count().desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+        stmt = select(
+            func.count().label("n"),
+            func.max(w.c.total).label("total"),
+            func.min(w.c.word_count).filter(w.c.cum >= 0.25 * w.c.total).label("q25"),
+            func.min(w.c.word_count).filter(w.c.cum >= 0.5 * w.c.total).label("q50"),
+            func.min(w.c.word_count).filter(w.c.cum >= 0.75 * w.c.total).label("q75"),
+            func.min(w.c.line_count).filter(w.c.line_cum >= 0.5 * w.c.total).label("lines_q50"),
+            best_hook.label("best_hook_style"),
+        ).select_from(w)
+        row = (await self.session.execute(stmt)).one_or_none()
+        if not row or not row.n or not row.total or row.q50 is None:
+            return None
+        return row
+
     async def get_performance_insights(self) -> PerformanceInsights:
         """Structured insights for the Performance Intelligence Agent."""
         summary = await self.get_summary()
-        # Infer ideal length from top posts (simplified: medium length)
-        ideal_length = "150-300 words for body; hook under 2 lines"
+        ideal_length = DEFAULT_IDEAL_LENGTH
+        hook_style_pattern = DEFAULT_HOOK_STYLE_PATTERN
+        try:
+            stats = await self._history_feature_stats()
+        except Exception as e:
+            logger.warning("history_feature_stats_failed", error=str(e))
+            stats = None
+        if stats is not None:
+            ideal_length = (
+                f"{stats.q25}-{stats.q75} words (engagement-weighted median {stats.q50}); "
+                f"about {stats.lines_q50} short lines; hook under 2 lines"
+            )
+            if stats.best_hook_style in HOOK_STYLE_PATTERNS:
+                hook_style_pattern = HOOK_STYLE_PATTERNS[stats.best_hook_style]
         return PerformanceInsights(
             best_days=summary.best_days,
             best_time_ranges=summary.best_times,
             ideal_length=ideal_length,
             top_topics=[],  # Could add NLP/keyword extraction later
-            hook_style_pattern="Strong opening line; question or stat or story",
-        )
\ No newline at end of file
+            hook_style_pattern=hook_style_pattern,
+        )
@@ -0,0 +1,32 @@
+"""Brand voice for generation prompts: defaults from settings, overridable per LinkedIn account."""
+from dataclasses import dataclass
+
+from app.config import settings
+from app.models.db_models import LinkedInAccount
+
+BRAND_FIELDS = ("brand_name", "brand_description", "brand_hashtags", "brand_image_style")
+
+
+@dataclass(frozen=True)
+class Brand:
+    name: str
+    description: str  # positioning and tone
+    hashtags: str  # example hashtags
+    image_style: str
+
+    @classmethod
+    def default(cls) -> "Brand":
+        return cls(settings.brand_name, settings.brand_description, settings.brand_hashtags, settings.brand_image_style)
+
+    @classmethod
+    def for_account(cls, account: LinkedInAccount | None) -> "Brand":
+        """The account's overrides on top of the defaults."""
+        base = cls.default()
+        if account is None:
+            return base
+        return cls(
+            name=account.brand_name or base.name,
+            description=account.brand_description or base.description,
+            hashtags=account.brand_hashtags or base.hashtags,
+            image_style=account.brand_image_style or base.image_style,
+        )
@@ -0,0 +1,157 @@
+"""
+Gemini context caches for static prompt prefixes (system instructions). One cache per (model, prefix text),
+created on first use and extended before it expires. A prefix below the model's minimum cacheable size is
+counted once and then always sent inline; one the API refuses anyway (model without caching) is remembered as
+unavailable for a TTL. Blocking; called from worker threads.
+"""
+import hashlib
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from app.config import settings
+from app.utils.logging import get_logger
+from app.utils.metrics import GEMINI_CONTEXT_CACHE_EVENTS
+
+logger = get_logger(__name__)
+
+# Minimum tokens in a cached prefix (Gemini API docs at the time of writing); override with
+# GEMINI_CONTEXT_CACHE_MIN_TOKENS. Unlisted models get DEFAULT_MIN_TOKENS, the smallest documented minimum.
+MIN_TOKENS: dict[str, int] = {
+    "gemini-3-flash-preview": 1024,
+    "gemini-3-pro-preview": 4096,
+    "gemini-2.5-flash": 1024,
+    "gemini-2.5-flash-lite": 1024,
+    "gemini-2.5-pro": 4096,
+}
+DEFAULT_MIN_TOKENS = 1024
+
+
+def min_tokens(model: str) -> int:
+    return settings.gemini_context_cache_min_tokens.get(model) or MIN_TOKENS.get(model, DEFAULT_MIN_TOKENS)
+
+
+@dataclass
+class _Entry:
+    name: str | None  # None: caching unavailable for this prefix until expires_at
+    expires_at: float  # monotonic
+
+
+class ContextCacheManager:
+    def __init__(self, ttl_seconds: int):
+        self.ttl = ttl_seconds
+        self.refresh_margin = min(300.0, ttl_seconds * 0.2)  # extend when less than this is left
+        self._entries: dict[tuple[str, str], _Entry] = {}
+        self._key_locks: dict[tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(model: str, system_instruction: str) -> tuple[str, str]:
+        return model, hashlib.sha256(system_instruction.encode()).hexdigest()
+
+    def handle(self, client: Any, model: str, system_instruction: str) -> str | None:
+        """Cache name to pass as cached_content, or None to send the system instruction inline."""
+        key = self._key(model, system_instruction)
+        with self._lock:
+            entry = self._entries.get(key)
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        now = time.monotonic()
+        if entry is not None and now < entry.expires_at - (self.refresh_margin if entry.name else 0):
+            GEMINI_CONTEXT_CACHE_EVENTS.labels(model, "hit" if entry.name else "unavailable").inc()
+            return entry.name
+        with key_lock:  # one create/extend per prefix at a time
+            with self._lock:
+                entry = self._entries.get(key)
+            now = time.monotonic()
+            if entry is not None and now < entry.expires_at - (self.refresh_margin if entry.name else 0):
+                return entry.name
+            if entry is not None and entry.name and now < entry.expires_at and self._extend(client, model, entry):
+                return entry.name
+            if entry is None and self._below_minimum(client, model, system_instruction):
+                # The prefix text is the key, so it never grows: no cache for it in this process
+                entry = _Entry(None, math.inf)
+                GEMINI_CONTEXT_CACHE_EVENTS.labels(model, "unavailable").inc()
+            else:
+                entry = self._create(client, model, system_instruction)
+            with self._lock:
+                self._entries[key] = entry
+            return entry.name
+
+    @staticmethod
+    def _below_minimum(client: Any, model: str, system_instruction: str) -> bool:
+        """True when the prefix is too short for the model to cache; counts tokens only if it could be long enough."""
+        minimum = min_tokens(model)
+        tokens = len(system_instruction)  # upper bound: a token covers at least one character
+        if tokens >= minimum:
+            try:
+                tokens = client.models.count_tokens(model=model, contents=system_instruction).total_tokens or 0
+            except Exception as e:
+                logger.warning("gemini_count_tokens_failed", model=model, error=str(e)[:200])
+                return False  # let caches.create decide
+        if tokens >= minimum:
+            return False
+        logger.info("gemini_context_cache_prefix_too_small", model=model, tokens=tokens, min_tokens=minimum)
+        return True
+
+    def _extend(self, client: Any, model: str, entry: _Entry) -> bool:
+        from google.genai import types
+
+        try:
+            client.caches.update(name=entry.name, config=types.UpdateCachedContentConfig(ttl=f"{self.ttl}s"))
+        except Exception as e:
+            logger.warning("gemini_context_cache_extend_failed", model=model, cache=entry.name, error=str(e))
+            return False
+        entry.expires_at = time.monotonic() + self.ttl
+        GEMINI_CONTEXT_CACHE_EVENTS.labels(model, "refreshed").inc()
+        return True
+
+    def _create(self, client: Any, model: str, system_instruction: str) -> _Entry:
+        from google.genai import types
+
+        started = time.monotonic()
+        try:
+            cache = client.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    system_instruction=system_instruction, ttl=f"{self.ttl}s", display_name="linkedin-post-prefix"
+                ),
+            )
+        except Exception as e:
+            logger.info("gemini_context_cache_unavailable", model=model, error=str(e)[:200])
+            GEMINI_CONTEXT_CACHE_EVENTS.labels(model, "unavailable").inc()
+            return _Entry(None, started + self.ttl)
+        GEMINI_CONTEXT_CACHE_EVENTS.labels(model, "created").inc()
+        logger.info("gemini_context_cache_created", model=model, cache=cache.name)
+        return _Entry(cache.name, started + self.ttl)
+
+    def invalidate(self, model: str, system_instruction: str) -> None:
+        """Forget a cache the API no longer knows (expired or deleted elsewhere)."""
+        with self._lock:
+            self._entries.pop(self._key(model, system_instruction), None)
+
+    def delete_all(self, client: Any) -> None:
+        """Delete this process's caches (shutdown), so they stop accruing storage time."""
+        with self._lock:
+            names = [e.name for e in self._entries.values() if e.name]
+            self._entries.clear()
+        for name in names:
+            try:
+                client.caches.delete(name=name)
+            except Exception as e:
+                logger.warning("gemini_context_cache_delete_failed", cache=name, error=str(e))
+
+
+_manager: ContextCacheManager | None = None
+_manager_lock = threading.Lock()
+
+
+def get_context_caches() -> ContextCacheManager:
+    """Process-wide context cache manager."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = ContextCacheManager(settings.gemini_context_cache_ttl_seconds)
+    return _manager
@@ -0,0 +1,227 @@
+"""Near-duplicate detection for drafts and published posts: MinHash signatures + in-memory LSH index."""
+import asyncio
+import hashlib
+import re
+import struct
+import threading
+from collections import defaultdict
+from typing import Iterable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.db_models import PostDraft, PostHistory
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+NUM_PERM = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS  # 4 rows/band -> ~50% similarity candidate threshold
+SHINGLE_SIZE = 3
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_SIG_STRUCT = struct.Struct(f"<{NUM_PERM}I")
+_TOKEN_RE = re.compile(r"[#\w']+")
+
+
+def _permutations(seed: int = 1) -> list[tuple[int, int]]:
+    """Deterministic (a, b) pairs for universal hashing; must never change once signatures are stored."""
+    out = []
+    for i in range(NUM_PERM):
+        h = hashlib.blake2b(f"minhash:{seed}:{i}".encode(), digest_size=16).digest()
+        a = int.from_bytes(h[:8], "little") % (_MERSENNE_PRIME - 1) + 1
+        b = int.from_bytes(h[8:], "little") % _MERSENNE_PRIME
+        out.append((a, b))
+    return out
+
+
+_PERMS = _permutations()
+_perm_arrays = None  # (a_lo, a_hi, b) as numpy column vectors, built on first use (keeps numpy off the import path)
+
+
+def _perm_columns():
+    global _perm_arrays
+    if _perm_arrays is None:
+        import numpy as np
+
+        a = np.array([a for a, _ in _PERMS], dtype=np.uint64)[:, None]
+        b = np.array([b for _, b in _PERMS], dtype=np.uint64)[:, None]
+        _perm_arrays = (a & np.uint64(_MAX_HASH), a >> np.uint64(32), b)
+    return _perm_arrays
+
+
+def _shingles(text: str) -> set[int]:
+    """Word 3-gram shingles (lowercased, hashtags dropped) hashed to 32-bit ints."""
+    tokens = [t for t in _TOKEN_RE.findall((text or "").lower()) if not t.startswith("#")]
+    if len(tokens) < SHINGLE_SIZE:
+        grams = [" ".join(tokens)] if tokens else []
+    else:
+        grams = [" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)]
+    return {
+        int.from_bytes(hashlib.blake2b(g.encode(), digest_size=4).digest(), "little")
+        for g in grams
+    }
+
+
+def minhash_signature(text: str) -> tuple[int, ...] | None:
+    """
+    MinHash signature of text (NUM_PERM uint32 values). None for empty text.
+    (a*x + b) mod 2^61-1 over all permutations x shingles at once, in uint64 without overflow: a*x is split as
+    a_lo*x + a_hi*x*2^32, and 2^61 = 1 (mod p) folds the high bits back in. Same values as the scalar formula.
+    """
+    import numpy as np
+
+    shingles = _shingles(text)
+    if not shingles:
+        return None
+    a_lo, a_hi, b = _perm_columns()
+    p = np.uint64(_MERSENNE_PRIME)
+    x = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+    lo = a_lo * x  # < 2^64
+    hi = a_hi * x  # < 2^61; hi*2^32 = (hi >> 29)*2^61 + (hi & (2^29-1))*2^32
+    s = (lo & p) + (lo >> np.uint64(61)) + b
+    s += (hi >> np.uint64(29)) + ((hi & np.uint64((1 << 29) - 1)) << np.uint64(32))
+    s = (s & p) + (s >> np.uint64(61))
+    s = np.where(s >= p, s - p, s)
+    return tuple((s & np.uint64(_MAX_HASH)).min(axis=1).tolist())
+
+
+def minhash_signatures(texts: list[str]) -> list[tuple[int, ...] | None]:
+    return [minhash_signature(t) for t in texts]
+
+
+async def compute_signatures(texts: list[str]) -> list[tuple[int, ...] | None]:
+    """minhash_signatures in a worker thread: shingling is pure Python and the first call imports numpy."""
+    return await asyncio.to_thread(minhash_signatures, texts)
+
+
+def draft_text(hook: str | None, body: str | None, cta: str | None) -> str:
+    """Text used for draft signatures (hashtags excluded so they don't dominate)."""
+    return f"{hook or ''}\n\n{body or ''}\n\n{cta or ''}"
+
+
+def pack_signature(sig: tuple[int, ...] | None) -> bytes | None:
+    """Serialize a signature for the minhash column."""
+    return _SIG_STRUCT.pack(*sig) if sig else None
+
+
+def unpack_signature(raw: bytes | None) -> tuple[int, ...] | None:
+    """Deserialize a minhash column value; None if missing or from a different NUM_PERM."""
+    if not raw or len(raw) != _SIG_STRUCT.size:
+        return None
+    return _SIG_STRUCT.unpack(raw)
+
+
+def jaccard_estimate(a: tuple[int, ...], b: tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity: fraction of equal MinHash slots."""
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERM
+
+
+# Index keys: ("draft", id) or ("history", id)
+IndexKey = tuple[str, int]
+
+
+class LSHIndex:
+    """Banded LSH over MinHash signatures. Thread-safe (scheduled publishes run in a worker thread)."""
+
+    def __init__(self, bands: int = LSH_BANDS, rows: int = LSH_ROWS):
+        self.bands = bands
+        self.rows = rows
+        self._buckets: list[dict[tuple[int, ...], set[IndexKey]]] = [defaultdict(set) for _ in range(bands)]
+        self._sigs: dict[IndexKey, tuple[int, ...]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sigs)
+
+    def _band_keys(self, sig: tuple[int, ...]) -> Iterable[tuple[int, tuple[int, ...]]]:
+        for i in range(self.bands):
+            yield i, sig[i * self.rows:(i + 1) * self.rows]
+
+    def add(self, key: IndexKey, sig: tuple[int, ...] | None) -> None:
+        """Insert or replace the signature for key."""
+        if sig is None:
+            self.remove(key)
+            return
+        with self._lock:
+            self._remove_locked(key)
+            self._sigs[key] = sig
+            for i, band in self._band_keys(sig):
+                self._buckets[i][band].add(key)
+
+    def remove(self, key: IndexKey) -> None:
+        with self._lock:
+            self._remove_locked(key)
+
+    def _remove_locked(self, key: IndexKey) -> None:
+        old = self._sigs.pop(key, None)
+        if old is None:
+            return
+        for i, band in self._band_keys(old):
+            bucket = self._buckets[i].get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[i][band]
+
+    def signature(self, key: IndexKey) -> tuple[int, ...] | None:
+        """Stored signature for key, if indexed."""
+        return self._sigs.get(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sigs.clear()
+            for b in self._buckets:
+                b.clear()
+
+    def query(
+        self,
+        sig: tuple[int, ...] | None,
+        threshold: float | None = None,
+        kind: str | None = None,
+        exclude: IndexKey | None = None,
+    ) -> list[tuple[IndexKey, float]]:
+        """Near-duplicates of sig with estimated Jaccard >= threshold, most similar first."""
+        if sig is None:
+            return []
+        threshold = settings.dedup_threshold if threshold is None else threshold
+        with self._lock:
+            candidates: set[IndexKey] = set()
+            for i, band in self._band_keys(sig):
+                bucket = self._buckets[i].get(band)
+                if bucket:
+                    candidates |= bucket
+            scored = []
+            for key in candidates:
+                if key == exclude or (kind and key[0] != kind):
+                    continue
+                sim = jaccard_estimate(sig, self._sigs[key])
+                if sim >= threshold:
+                    scored.append((key, sim))
+        scored.sort(key=lambda kv: kv[1], reverse=True)
+        return scored
+
+
+_index = LSHIndex()
+
+
+def get_index() -> LSHIndex:
+    """Process-wide LSH index (rebuilt from stored signatures at startup)."""
+    return _index
+
+
+async def rebuild_index(session: AsyncSession) -> int:
+    """Load all stored draft and history signatures into the index. Returns number indexed."""
+    index = get_index()
+    index.clear()
+    for kind, model in (("draft", PostDraft), ("history", PostHistory)):
+        result = await session.stream(
+            select(model.id, model.minhash).where(model.minhash.is_not(None)).execution_options(yield_per=1000)
+        )
+        async for row_id, raw in result:
+            index.add((kind, row_id), unpack_signature(raw))
+    logger.info("dedup_index_rebuilt", size=len(index))
+    return len(index)
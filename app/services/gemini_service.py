@@ -1,11 +1,27 @@
 """Gemini API: text generation (Gemini Pro) and image generation (Gemini Image)."""
+import base64
 import json
-import re
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Any, Optional
 
 from app.config import settings
+from app.services.brand import Brand
+from app.services.context_cache import get_context_caches
+from app.services.llm_usage import current_scope, record_usage
+from app.services.model_router import CallCancelled, get_model_router, model_chain
 from app.utils.logging import get_logger
+from app.utils.json_stream import ObjectFieldParser
+from app.utils.metrics import (
+    GEMINI_ERRORS,
+    GEMINI_PREFIX_DURATION,
+    GEMINI_REQUEST_DURATION,
+    GEMINI_STRUCTURED_OUTPUTS,
+    GEMINI_TOKENS,
+)
+from app.utils.tracing import KIND_CLIENT, start_span
 
 logger = get_logger(__name__)
 
@@ -19,81 +35,309 @@ def _get_client():
     if _gemini_client is None:
         try:
             from google import genai
+            from google.genai import types
 
-            _gemini_client = genai.Client(api_key=settings.gemini_api_key)
+            http_options = types.HttpOptions(base_url=settings.gemini_base_url) if settings.gemini_base_url else None
+            _gemini_client = genai.Client(api_key=settings.gemini_api_key, http_options=http_options)
         except Exception as e:
             logger.warning("gemini_client_init_failed", error=str(e))
             raise ValueError("Gemini API key not configured or invalid") from e
     return _gemini_client
 
 
-def generate_post_text(
-    user_context: str,
-    analytics_summary: str,
-    strategy: dict[str, str],
-) -> dict[str, str]:
+@contextmanager
+def _track_call(model: str, operation: str):
+    """Trace and record latency/errors of one Gemini API call (operation: text | repair | image)."""
+    start = time.perf_counter()
+    try:
+        with start_span(
+            f"gemini.{operation}",
+            KIND_CLIENT,
+            {"gen_ai.system": "gemini", "gen_ai.request.model": model, "gen_ai.operation.name": operation},
+        ):
+            yield
+    except CallCancelled:
+        raise
+    except Exception:
+        GEMINI_ERRORS.labels(model, operation).inc()
+        raise
+    finally:
+        GEMINI_REQUEST_DURATION.labels(model, operation).observe(time.perf_counter() - start)
+
+
+def warmup() -> None:
+    """Import google-genai and build the client ahead of the first request (startup warmup)."""
+    if settings.gemini_api_key:
+        _get_client()
+
+
+POST_FIELDS = ("hook", "body", "cta", "hashtags", "suggested_visual")
+_REQUIRED_FIELDS = ("hook", "body")
+_FIELD_DESCRIPTIONS = {
+    "hook": "First 2 lines that grab attention",
+    "body": "Main content, short paragraphs",
+    "cta": "Call to action",
+    "hashtags": "Comma or space separated, max 5",
+    "suggested_visual": (
+        "1-2 sentences describing a concrete image that matches this post: scene, mood, key visual element; "
+        'on-brand, minimal, professional. E.g. "Clean desk with laptop and notebook, soft daylight, text overlay '
+        'area left empty" or "Abstract gradient background with bold headline space, modern and minimal."'
+    ),
+}
+
+
+def _post_schema(fields: tuple[str, ...] | list[str]) -> dict:
+    """Gemini response_schema: an object with the given string fields, all required, in this order."""
+    return {
+        "type": "OBJECT",
+        "properties": {f: {"type": "STRING", "description": _FIELD_DESCRIPTIONS[f]} for f in fields},
+        "required": list(fields),
+        "propertyOrdering": list(fields),
+    }
+
+
+def _record_usage(model: str, usage: Any) -> None:
+    """Token counters from a response's usage_metadata (prompt_token_count includes the cached part)."""
+    if usage is None:
+        return
+    prompt = usage.prompt_token_count or 0
+    cached = usage.cached_content_token_count or 0
+    GEMINI_TOKENS.labels(model, "input").inc(max(0, prompt - cached))
+    GEMINI_TOKENS.labels(model, "cached_input").inc(cached)
+    GEMINI_TOKENS.labels(model, "output").inc(usage.candidates_token_count or 0)
+
+
+def _feed_candidates(parsers: dict[int, ObjectFieldParser], response: Any) -> None:
+    """Route each candidate's text (thought parts skipped) to its own parser, keyed by candidate index."""
+    for i, candidate in enumerate(response.candidates or []):
+        parts = candidate.content.parts if candidate.content else None
+        text = "".join(p.text for p in parts or [] if p.text and not p.thought)
+        parsers.setdefault(candidate.index if candidate.index is not None else i, ObjectFieldParser()).feed(text)
+
+
+def _stream_fields(
+    client: Any,
+    model: str,
+    prompt: str,
+    config: Any,
+    fields: tuple[str, ...] | list[str],
+    operation: str,
+    prefix: str,
+    cancel: threading.Event,
+) -> list[dict[str, str]]:
     """
-    Generate LinkedIn post (hook, body, cta, hashtags, suggested_visual) using Gemini Pro.
-    Returns dict with keys: hook, body, cta, hashtags, suggested_visual.
+    Run one call into tolerant parsers, one per candidate; the fields completed before an interruption are
+    kept. A set `cancel` (lost hedge race) closes the stream at the next chunk and raises CallCancelled.
+    Usage is recorded for every attempt that reported tokens, the cancelled and failed ones included: they are billed.
     """
-    client = _get_client()
-    strategy_str = ", ".join(f"{k}: {v}" for k, v in strategy.items())
+    parsers: dict[int, ObjectFieldParser] = {}
+    usage = None
+    start = time.perf_counter()
+    try:
+        with _track_call(model, operation):
+            if settings.gemini_text_stream:
+                stream = client.models.generate_content_stream(model=model, contents=[prompt], config=config)
+                try:
+                    for chunk in stream:
+                        usage = chunk.usage_metadata or usage
+                        if cancel.is_set():
+                            raise CallCancelled(model)
+                        _feed_candidates(parsers, chunk)
+                finally:
+                    stream.close()
+            else:
+                response = client.models.generate_content(model=model, contents=[prompt], config=config)
+                _feed_candidates(parsers, response)
+                usage = response.usage_metadata
+    except Exception as e:
+        if isinstance(e, CallCancelled) or not any(p.fields for p in parsers.values()):
+            if usage is not None:  # nothing is kept, but the tokens streamed so far are billed
+                _record_usage(model, usage)
+                record_usage(model, operation, usage, time.perf_counter() - start)
+            raise
+        completed = sorted({f for p in parsers.values() for f in p.fields})
+        logger.warning("gemini_response_interrupted", model=model, error=str(e), completed=completed)
+    elapsed = time.perf_counter() - start
+    GEMINI_PREFIX_DURATION.labels(model, prefix).observe(elapsed)
+    _record_usage(model, usage)
+    record_usage(model, operation, usage, elapsed)
+    return [
+        {f: p.fields[f].strip() for f in fields if p.fields.get(f, "").strip()}
+        for _, p in sorted(parsers.items())
+    ] or [{}]
 
-    prompt = f"""You are a LinkedIn growth strategist writing for ReeloomStudios.
 
-Brand: ReeloomStudios — creative video and content studio. Founder-led, authentic voice. Positioning: quality storytelling, modern production, startup energy. Tone: confident but approachable, expert without being preachy. Write as the founder or the studio voice.
+def _generate_fields(
+    client: Any,
+    model: str,
+    system: str,
+    prompt: str,
+    fields: tuple[str, ...] | list[str],
+    operation: str,
+    cancel: threading.Event,
+    candidates: int = 1,
+) -> list[dict[str, str]]:
+    """
+    One schema-constrained call with `system` as the static prefix (through the context cache when available)
+    and `prompt` as the per-request part; one fields dict per candidate. Raises only when nothing usable came back.
+    """
+    from google.genai import types
 
-Generate a high-performing LinkedIn post that fits this brand.
+    schema = {"response_mime_type": "application/json", "response_schema": _post_schema(fields)}
+    if candidates > 1:
+        schema["candidate_count"] = candidates
+    caches = get_context_caches()
+    cache_name = caches.handle(client, model, system) if settings.gemini_context_cache else None
+    if cache_name:
+        try:
+            config = types.GenerateContentConfig(cached_content=cache_name, **schema)
+            return _stream_fields(client, model, prompt, config, fields, operation, "context_cache", cancel)
+        except Exception as e:
+            if getattr(e, "code", None) not in (403, 404) and "cache" not in str(e).lower():
+                raise
+            # Expired or deleted behind our back: forget it and send the prefix inline
+            logger.warning("gemini_context_cache_lost", model=model, cache=cache_name, error=str(e)[:200])
+            caches.invalidate(model, system)
+    config = types.GenerateContentConfig(system_instruction=system, **schema)
+    return _stream_fields(client, model, prompt, config, fields, operation, "system_instruction", cancel)
 
-Context:
-{user_context}
 
-Performance Insights:
-{analytics_summary}
+def _repair_prompt(prompt: str, done: dict[str, str], missing: list[str]) -> str:
+    return (
+        f"{prompt}\n"
+        f"An earlier answer was cut off. These fields are already written:\n{json.dumps(done, ensure_ascii=False, indent=1)}\n\n"
+        f"Write only the missing fields ({', '.join(missing)}) so they fit with the ones above."
+    )
 
-Strategy:
-{strategy_str}
+
+def _repair(client: Any, model: str, system: str, prompt: str, data: dict[str, str], cancel: threading.Event) -> bool:
+    """Re-request the fields missing from `data` (in place), up to gemini_repair_attempts calls. True if any ran."""
+    repaired = False
+    for _ in range(settings.gemini_repair_attempts):
+        missing = [f for f in POST_FIELDS if f not in data]
+        if not missing or cancel.is_set():
+            break
+        logger.info("gemini_post_repair", model=model, missing=missing)
+        try:
+            fixed = _generate_fields(client, model, system, _repair_prompt(prompt, data, missing), missing, "repair", cancel)
+        except CallCancelled:
+            raise
+        except Exception as e:
+            logger.warning("gemini_post_repair_failed", model=model, error=str(e))
+            break
+        data.update(fixed[0])
+        repaired = True
+    return repaired
+
+
+def _post_attempt(
+    client: Any, model: str, system: str, prompt: str, variants: int, cancel: threading.Event
+) -> tuple[list[dict[str, str]], str]:
+    """
+    Post fields for up to `variants` candidates from one model (one call), with repair calls for missing
+    fields. Candidates still missing a required field are dropped. Returns (posts, outcome).
+    """
+    posts = _generate_fields(client, model, system, prompt, POST_FIELDS, "text", cancel, candidates=variants)
+    outcome = "ok"
+    for data in posts:
+        if _repair(client, model, system, prompt, data, cancel):
+            outcome = "repaired"
+    usable = [d for d in posts if all(f in d for f in _REQUIRED_FIELDS)]
+    if not usable:
+        missing = [f for f in POST_FIELDS if f not in posts[0]]
+        raise ValueError(f"Gemini response is missing {', '.join(missing)}")
+    if any(f not in d for d in usable for f in POST_FIELDS):
+        outcome = "incomplete"
+    return usable, outcome
+
+
+def _post_system_prompt(brand: Brand) -> str:
+    """Static part of the post prompt: identical for every request of a brand, so it can be cached."""
+    fields_str = "\n".join(f"- {f}: {_FIELD_DESCRIPTIONS[f]}" for f in POST_FIELDS)
+    return f"""You are a LinkedIn growth strategist writing for {brand.name}.
+
+Brand: {brand.name} — {brand.description}
+
+Generate a high-performing LinkedIn post that fits this brand, using the context, performance insights and strategy in the request.
 
 Rules:
 - Strong 2-line hook (founder-style: bold take, question, or story open)
 - Short readable paragraphs
-- Natural human tone; ReeloomStudios = creative, driven, clear
-- Marketing positioning clarity (studio/founder value, not generic)
+- Natural human tone, true to the {brand.name} voice
+- Marketing positioning clarity (brand/founder value, not generic)
 - Subtle CTA (comment, follow, or link — never pushy)
-- Max 5 hashtags (mix of niche + broad, e.g. #ContentCreation #FounderLife #ReeloomStudios)
+- Max 5 hashtags (mix of niche + broad, e.g. {brand.hashtags})
 - Optimized for dwell time
 - Avoid robotic or corporate jargon
 
-Return ONLY valid JSON with exactly these keys (no markdown, no code block):
-- "hook": string (first 2 lines that grab attention)
-- "body": string (main content, short paragraphs)
-- "cta": string (call to action)
-- "hashtags": string (comma or space separated, max 5)
-- "suggested_visual": string (1-2 sentences describing a concrete image that matches this post: scene, mood, key visual element; on-brand, minimal, professional. E.g. "Clean desk with laptop and notebook, soft daylight, text overlay area left empty" or "Abstract gradient background with bold headline space, modern and minimal.")
+Fields:
+{fields_str}
+"""
+
+
+def generate_post_text(
+    user_context: str,
+    analytics_summary: str,
+    strategy: dict[str, str],
+    brand: Brand | None = None,
+) -> dict[str, str]:
+    """
+    Generate LinkedIn post (hook, body, cta, hashtags, suggested_visual) using Gemini Pro, in the voice of
+    `brand` (default brand if None). Returns dict with keys: hook, body, cta, hashtags, suggested_visual.
+    """
+    return generate_post_variants(user_context, analytics_summary, strategy, brand, 1)[0]
+
+
+def generate_post_variants(
+    user_context: str,
+    analytics_summary: str,
+    strategy: dict[str, str],
+    brand: Brand | None = None,
+    variants: int = 1,
+) -> list[dict[str, str]]:
+    """
+    Up to `variants` alternative posts from one call (candidate_count), each with keys hook, body, cta,
+    hashtags, suggested_visual; candidates that came back without a hook or body are dropped.
+    Routed over the text model chain (hedging a slow model, skipping ones with an open circuit).
+    """
+    client = _get_client()
+    if current_scope().downgrade:  # account over its daily budget
+        models = model_chain(settings.llm_budget_text_model, "")
+    else:
+        models = model_chain(settings.gemini_text_model, settings.gemini_text_fallback_models)
+    system = _post_system_prompt(brand or Brand.default())
+    strategy_str = ", ".join(f"{k}: {v}" for k, v in strategy.items())
+    prompt = f"""Context:
+{user_context}
+
+Performance Insights:
+{analytics_summary}
+
+Strategy:
+{strategy_str}
 """
 
     try:
-        response = client.models.generate_content(
-            model=settings.gemini_text_model,
-            contents=[prompt],
+        model, (posts, outcome) = get_model_router().call(
+            "text",
+            models,
+            lambda m, cancel: _post_attempt(client, m, system, prompt, variants, cancel),
+            hedge=settings.gemini_hedge_text,
         )
-        text = (response.text or "").strip()
-        # Strip markdown code block if present
-        if "```" in text:
-            match = re.search(r"```(?:json)?\s*([\s\S]*?)```", text)
-            if match:
-                text = match.group(1).strip()
-        data = json.loads(text)
-        return {
-            "hook": data.get("hook", ""),
-            "body": data.get("body", ""),
-            "cta": data.get("cta", ""),
-            "hashtags": data.get("hashtags", ""),
-            "suggested_visual": data.get("suggested_visual", ""),
-        }
     except Exception as e:
+        GEMINI_STRUCTURED_OUTPUTS.labels(models[0], "failed").inc()
         logger.exception("gemini_post_generation_failed", error=str(e))
         raise
+    GEMINI_STRUCTURED_OUTPUTS.labels(model, outcome).inc()
+    if len(posts) < variants:
+        logger.info("gemini_post_variants_short", model=model, requested=variants, returned=len(posts))
+    return [{f: data.get(f, "") for f in POST_FIELDS} for data in posts]
+
+
+def release_context_caches() -> None:
+    """Delete this process's context caches (app shutdown; blocking)."""
+    if _gemini_client is not None:
+        get_context_caches().delete_all(_gemini_client)
 
 
 def _image_error_message(err: Exception) -> str:
@@ -108,18 +352,65 @@ def _image_error_message(err: Exception) -> str:
     return s[:200] if len(s) > 200 else (s or "Image generation failed.")
 
 
-def generate_image(hook: str, body: str, suggested_visual: str, output_path: Path) -> tuple[Path, Optional[str]]:
+_IMAGEN_PREFIXES = ("imagen-4", "imagen-3")
+
+
+def _image_attempt(client: Any, model: str, prompt: str, system: str, post_part: str, cancel: threading.Event) -> bytes:
+    """
+    Image bytes from one model: Imagen (generate_images) takes the single combined prompt, Gemini image models
+    (generate_content with IMAGE output) the static part as a system instruction. Raises if no image came back.
+    """
+    from google.genai import types
+
+    start = time.perf_counter()
+    if model.lower().startswith(_IMAGEN_PREFIXES):
+        with _track_call(model, "image"):
+            resp = client.models.generate_images(
+                model=model,
+                prompt=prompt[:2000],
+                config=types.GenerateImagesConfig(number_of_images=1, aspect_ratio="1:1"),
+            )
+        raws = [g.image.image_bytes for g in resp.generated_images or [] if g.image is not None]
+        record_usage(model, "image", None, time.perf_counter() - start, images=len(raws))
+    else:
+        config = types.GenerateContentConfig(response_modalities=["TEXT", "IMAGE"], system_instruction=system)
+        with _track_call(model, "image"):
+            response = client.models.generate_content(model=model, contents=[post_part], config=config)
+        _record_usage(model, response.usage_metadata)
+        parts = response.parts
+        if parts is None and response.candidates and response.candidates[0].content.parts:
+            parts = response.candidates[0].content.parts
+        raws = [p.inline_data.data for p in parts or [] if p.inline_data is not None]
+        record_usage(model, "image", response.usage_metadata, time.perf_counter() - start, images=len(raws))
+    # Recorded above even when a hedge won meanwhile: this attempt is billed, though the winner's image is kept
+    if cancel.is_set():
+        raise CallCancelled(model)
+    for raw in raws:
+        if raw:
+            return raw if isinstance(raw, bytes) else base64.b64decode(raw)
+    raise ValueError(f"{model} returned no image")
+
+
+def generate_image(
+    hook: str, body: str, suggested_visual: str, output_path: Path, brand: Brand | None = None
+) -> tuple[Optional[Path], Optional[str]]:
     """
     Generate a relevant LinkedIn image from the post content. Saves as PNG.
-    Returns (output_path, error_message). error_message is set when no file was produced.
-    Uses Imagen (generate_images) when model is imagen-* else Gemini (generate_content).
+    Returns (path, None) on success, or (None, error_message) when no file was produced.
+    Routed over the image model chain: the configured model (Imagen or Gemini image), then the fallbacks.
     """
     client = _get_client()
+    brand = brand or Brand.default()
     body_snippet = (body or "")[:400].strip()
     visual_brief = (suggested_visual or "").strip() or "professional, minimal, on-brand"
-    prompt = f"""Create a single professional image that will accompany this LinkedIn post. The image must visually support the post message.
-
-POST HOOK (opening lines):
+    intro = "Create a single professional image that will accompany this LinkedIn post. The image must visually support the post message.\n"
+    requirements = f"""Requirements:
+- {brand.name} brand: {brand.image_style}
+- Image must feel relevant to the post topic and tone (no generic stock look).
+- 1:1 square format, suitable for LinkedIn. No watermark, no clip art.
+- Style: minimal, professional, high contrast. High quality photo or illustration.
+"""
+    post_part = f"""POST HOOK (opening lines):
 {hook[:300] if hook else "—"}
 
 POST MAIN MESSAGE:
@@ -127,100 +418,32 @@ POST MAIN MESSAGE:
 
 VISUAL BRIEF FROM AUTHOR:
 {visual_brief}
-
-Requirements:
-- ReeloomStudios brand: creative video/content studio, modern, clean, bold.
-- Image must feel relevant to the post topic and tone (no generic stock look).
-- 1:1 square format, suitable for LinkedIn. No watermark, no clip art.
-- Style: minimal, professional, high contrast. High quality photo or illustration.
 """
+    # Imagen takes a single prompt; Gemini image models get the static part as a system instruction
+    prompt = f"{intro}\n{post_part}\n{requirements}"
+    system = f"{intro}\n{requirements}"
     out = Path(output_path)
     if out.suffix.lower() != ".png":
         out = out.with_suffix(".png")
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    last_error: Optional[str] = None
-
-    # Imagen models: use generate_images (imagen-4-preview, imagen-4.0-generate-001, etc.)
-    imagen_models = ("imagen-4", "imagen-3")
-    model_id = (settings.gemini_image_model or "").strip().lower()
-    # Map preview alias to GA model id
-    imagen_model = settings.gemini_image_model or "imagen-4.0-generate-001"
-    if model_id == "imagen-4-preview":
-        imagen_model = "imagen-4.0-generate-001"
-    if any(model_id.startswith(p) for p in imagen_models):
-        try:
-            from google.genai import types
-            import base64
-            resp = client.models.generate_images(
-                model=imagen_model,
-                prompt=prompt[:2000],
-                config=types.GenerateImagesConfig(
-                    number_of_images=1,
-                    aspect_ratio="1:1",
-                ),
-            )
-            if getattr(resp, "generated_images", None) and len(resp.generated_images) > 0:
-                gen = resp.generated_images[0]
-                img_obj = getattr(gen, "image", None)
-                if img_obj is not None:
-                    raw = getattr(img_obj, "image_bytes", None)
-                    if raw:
-                        if isinstance(raw, bytes):
-                            out.write_bytes(raw)
-                        else:
-                            out.write_bytes(base64.b64decode(raw))
-                        if out.stat().st_size > 0:
-                            return (out, None)
-                    if hasattr(img_obj, "save"):
-                        img_obj.save(str(out))
-                        return (out, None)
-        except Exception as e:
-            logger.warning("imagen_generate_failed", model=imagen_model, error=str(e))
-            last_error = _image_error_message(e)
 
-    # Gemini image models: use generate_content with response_modalities IMAGE
+    primary = settings.gemini_image_model or "imagen-4.0-generate-001"
+    if primary.strip().lower() == "imagen-4-preview":  # map preview alias to GA model id
+        primary = "imagen-4.0-generate-001"
+    if current_scope().downgrade:  # account over its daily budget
+        models = model_chain(settings.llm_budget_image_model, "")
+    else:
+        models = model_chain(primary, settings.gemini_image_fallback_models)
     try:
-        from google.genai import types
-        gen_config = types.GenerateContentConfig(response_modalities=["TEXT", "IMAGE"])
-    except Exception:
-        gen_config = None
-
-    models_to_try = [settings.gemini_image_model, "gemini-2.5-flash-image", "gemini-3-pro-image-preview"]
-    for model in models_to_try:
-        if not model or any(model.strip().lower().startswith(p) for p in imagen_models):
-            continue
-        try:
-            kwargs = {"model": model, "contents": [prompt]}
-            if gen_config is not None:
-                kwargs["config"] = gen_config
-            response = client.models.generate_content(**kwargs)
-            parts = getattr(response, "parts", None)
-            if parts is None and response.candidates and response.candidates[0].content.parts:
-                parts = response.candidates[0].content.parts
-            if not parts:
-                continue
-            for part in parts:
-                if hasattr(part, "as_image") and callable(getattr(part, "as_image", None)):
-                    try:
-                        img = part.as_image()
-                        if img is not None:
-                            img.save(str(out))
-                            return (out, None)
-                    except Exception:
-                        pass
-                if getattr(part, "inline_data", None) and getattr(part.inline_data, "data", None):
-                    data = part.inline_data.data
-                    if isinstance(data, bytes):
-                        out.write_bytes(data)
-                    else:
-                        import base64
-                        out.write_bytes(base64.b64decode(data))
-                    if out.stat().st_size > 0:
-                        return (out, None)
-        except Exception as e:
-            logger.warning("gemini_image_try_failed", model=model, error=str(e))
-            last_error = _image_error_message(e)
-            continue
-
-    out.touch()
-    return (out, last_error or "Image generation did not produce a file.")
+        model, data = get_model_router().call(
+            "image",
+            models,
+            lambda m, cancel: _image_attempt(client, m, prompt, system, post_part, cancel),
+            hedge=settings.gemini_hedge_image,
+        )
+        out.write_bytes(data)
+    except Exception as e:
+        logger.warning("gemini_image_failed", models=models, error=str(e))
+        out.unlink(missing_ok=True)  # drop any partial write
+        return (None, _image_error_message(e))
+    return (out, None)
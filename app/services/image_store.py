@@ -0,0 +1,247 @@
+"""
+Content-addressed image storage: files are named by SHA-256 and sharded two levels deep
+(images/ab/cd/abcd....png), so identical images are stored once. Drafts reference them via post_drafts.image_path,
+which is the key in the configured storage backend (storage_backend.py); a background GC removes unreferenced and
+empty objects and enforces the storage quota.
+"""
+import asyncio
+import hashlib
+import os
+import re
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.db_models import PostDraft, ScheduledPost
+from app.services.storage_backend import get_backend, validate_key
+from app.utils.app_loop import run_on_app_loop
+from app.utils.logging import get_logger
+from app.utils.metrics import IMAGE_GC_RECLAIMED_BYTES, IMAGE_STORAGE_BYTES
+
+logger = get_logger(__name__)
+
+IMAGES_DIR = "images"
+_TMP_DIR = "tmp"
+_CHUNK = 256 * 1024
+_HASH_NAME_RE = re.compile(r"^[0-9a-f]{64}$")
+# Pre-content-addressing files written straight into storage_dir
+_LEGACY_RE = re.compile(r"^linkedin_[0-9a-f]+\.(png|webp|jpe?g)$")
+_CONTENT_TYPES = {".png": "image/png", ".webp": "image/webp", ".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".gif": "image/gif"}
+
+
+def content_type(image_path: str) -> str:
+    return _CONTENT_TYPES.get(Path(image_path).suffix.lower(), "image/png")
+
+
+def temp_path(suffix: str = ".png") -> Path:
+    """A fresh local path for a generator to write to before ingest(); leftovers are removed by the GC."""
+    d = settings.storage_dir / _TMP_DIR
+    d.mkdir(parents=True, exist_ok=True)
+    return d / f"{uuid.uuid4().hex}{suffix}"
+
+
+def relative_path(digest: str, suffix: str) -> str:
+    """image_path value (relative to storage_dir) for a content hash."""
+    return f"{IMAGES_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{suffix}"
+
+
+def digest_from_path(path: Path) -> str | None:
+    """The SHA-256 a content-addressed file is named after, or None for other files."""
+    return path.stem if _HASH_NAME_RE.match(path.stem) else None
+
+
+def _file_digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def local_file(image_path: str) -> Path | None:
+    """
+    A local file with the image's bytes, fetched into the cache tier for remote backends (blocking).
+    None if missing; ValueError for paths that would leave storage.
+    """
+    if _LEGACY_RE.match(image_path):
+        p = settings.storage_dir / image_path  # not migrated yet; always local
+        return p if p.is_file() else None
+    return get_backend().local_path(validate_key(image_path))
+
+
+def public_url(image_path: str) -> str | None:
+    """Where clients can fetch the image directly (public base URL or presigned), or None to serve it ourselves."""
+    if not settings.storage_redirect or _LEGACY_RE.match(image_path):
+        return None
+    validate_key(image_path)
+    if settings.storage_public_base_url:
+        return f"{settings.storage_public_base_url.rstrip('/')}/{image_path}"
+    return get_backend().url(image_path)
+
+
+def ingest(path: Path | None) -> str | None:
+    """
+    Move a freshly written local image into content-addressed storage (blocking; run in a thread). Nothing is
+    uploaded if the backend already has the same image.
+    Returns the image_path to store on the draft, or None (and removes the file) if it is missing or empty.
+    """
+    if path is None:
+        return None
+    try:
+        if path.stat().st_size == 0:
+            path.unlink(missing_ok=True)
+            return None
+    except FileNotFoundError:
+        return None
+    suffix = path.suffix.lower() or ".png"
+    rel = relative_path(_file_digest(path), suffix)
+    get_backend().put_file(rel, path, content_type(rel))
+    return rel
+
+
+# ----- Garbage collection -----
+@dataclass
+class GCReport:
+    scanned: int = 0
+    removed_empty: int = 0
+    removed_orphaned: int = 0
+    removed_temp: int = 0
+    migrated: int = 0
+    evicted: int = 0
+    reclaimed_bytes: int = 0
+    stored_bytes: int = 0
+
+
+def _scan() -> list[tuple[str, int, float]]:
+    """
+    (image_path, size, mtime) for every stored image (listed from the backend), plus local temp files
+    (as tmp/<name>) and legacy root-level files (blocking).
+    """
+    root = settings.storage_dir
+    out = [(o.key, o.size, o.mtime) for o in get_backend().list(f"{IMAGES_DIR}/")]
+    tmp = root / _TMP_DIR
+    for entry in os.scandir(tmp) if tmp.is_dir() else ():
+        if entry.is_file():
+            st = entry.stat()
+            out.append((f"{_TMP_DIR}/{entry.name}", st.st_size, st.st_mtime))
+    for entry in os.scandir(root):
+        if entry.is_file() and _LEGACY_RE.match(entry.name):
+            st = entry.stat()
+            out.append((entry.name, st.st_size, st.st_mtime))
+    return out
+
+
+def _remove(rel: str) -> None:
+    if rel.startswith(f"{IMAGES_DIR}/"):
+        get_backend().delete(rel)
+    else:
+        (settings.storage_dir / rel).unlink(missing_ok=True)
+
+
+async def collect_garbage(session: AsyncSession) -> GCReport:
+    """
+    One GC pass:
+    - delete empty files, unreferenced images and stale temp files (older than IMAGE_GC_GRACE_MINUTES, so an
+      image generated but not yet saved on its draft survives)
+    - move referenced legacy files into content-addressed storage and repoint their drafts
+    - over IMAGE_STORAGE_QUOTA_MB, drop images of unpublished drafts first, least recently updated first, and
+      only then those of published drafts; images of drafts with a pending scheduled post are kept
+    """
+    report = GCReport()
+    grace_cutoff = time.time() - settings.image_gc_grace_minutes * 60
+    files = await asyncio.to_thread(_scan)
+    report.scanned = len(files)
+    r = await session.execute(select(PostDraft.image_path).where(PostDraft.image_path.is_not(None)).distinct())
+    referenced = {p for p in r.scalars()}
+
+    kept: dict[str, int] = {}
+    for rel, size, mtime in files:
+        if rel.startswith(f"{_TMP_DIR}/"):
+            if mtime < grace_cutoff:
+                await asyncio.to_thread(_remove, rel)
+                report.removed_temp += 1
+                report.reclaimed_bytes += size
+        elif size == 0:
+            await asyncio.to_thread(_remove, rel)
+            report.removed_empty += 1
+            if rel in referenced:
+                await session.execute(update(PostDraft).where(PostDraft.image_path == rel).values(image_path=None))
+        elif rel in referenced:
+            kept[rel] = size
+        elif mtime < grace_cutoff:
+            await asyncio.to_thread(_remove, rel)
+            report.removed_orphaned += 1
+            report.reclaimed_bytes += size
+
+    for rel in [p for p in kept if _LEGACY_RE.match(p)]:
+        new_rel = await asyncio.to_thread(ingest, settings.storage_dir / rel)
+        if new_rel is None:
+            continue
+        # Same image, new location: keep updated_at so the quota's LRU order is unchanged
+        await session.execute(
+            update(PostDraft).where(PostDraft.image_path == rel).values(image_path=new_rel, updated_at=PostDraft.updated_at)
+        )
+        if new_rel in kept:
+            report.reclaimed_bytes += kept[rel]  # duplicate of an image already stored
+        else:
+            kept[new_rel] = kept[rel]
+        del kept[rel]
+        report.migrated += 1
+    await session.commit()
+
+    quota = settings.image_storage_quota_mb * 1024 * 1024
+    total = sum(kept.values())
+    if quota and total > quota:
+        pending = select(ScheduledPost.draft_id).where(ScheduledPost.status == "pending")
+        protected = set((await session.execute(
+            select(PostDraft.image_path).where(PostDraft.id.in_(pending), PostDraft.image_path.is_not(None))
+        )).scalars())
+        # Images no published draft uses go first, then least recently touched (an image shared by drafts
+        # counts as published if any of them is, and as touched by the newest one)
+        published = func.max(case((PostDraft.published_at.is_not(None), 1), else_=0))
+        r = await session.execute(
+            select(PostDraft.image_path, func.max(PostDraft.updated_at))
+            .where(PostDraft.image_path.is_not(None))
+            .group_by(PostDraft.image_path)
+            .order_by(published, func.max(PostDraft.updated_at))
+        )
+        for rel, _ in r.all():
+            if total <= quota:
+                break
+            if rel in protected or rel not in kept:
+                continue
+            await session.execute(update(PostDraft).where(PostDraft.image_path == rel).values(image_path=None))
+            await asyncio.to_thread(_remove, rel)
+            size = kept.pop(rel)
+            total -= size
+            report.reclaimed_bytes += size
+            report.evicted += 1
+        await session.commit()
+    report.stored_bytes = sum(kept.values())
+    IMAGE_STORAGE_BYTES.labels().set(report.stored_bytes)
+    IMAGE_GC_RECLAIMED_BYTES.labels().inc(report.reclaimed_bytes)
+    logger.info("image_gc_done", **asdict(report))
+    return report
+
+
+def run_image_gc() -> None:
+    """Background job (sync): one image GC pass, on the app loop."""
+    run_on_app_loop(_run_image_gc())
+
+
+async def _run_image_gc() -> None:
+    from app.models.db_models import init_db
+
+    factory = init_db()
+    if factory is None:
+        return
+    try:
+        async with factory() as session:
+            await collect_garbage(session)
+    except Exception as e:
+        logger.warning("image_gc_failed", error=str(e))
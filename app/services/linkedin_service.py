@@ -1,29 +1,246 @@
 """LinkedIn OAuth and posting (UGC Posts API)."""
-from datetime import datetime, timezone
-from typing import Any
+import asyncio
+import hashlib
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator
 from urllib.parse import urlencode
 
 import httpx
-from sqlalchemy import select
+from sqlalchemy import or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
 from app.models.db_models import LinkedInAccount
+from app.services import image_store
+from app.services.account_cache import CachedAccount, get_account_cache
+from app.utils.app_loop import on_app_loop, run_on_app_loop
 from app.utils.logging import get_logger
+from app.utils.metrics import LINKEDIN_REQUEST_DURATION, LINKEDIN_RESPONSES, LINKEDIN_TOKEN_REFRESHES
+from app.utils.tracing import KIND_CLIENT, start_span
 
 logger = get_logger(__name__)
 
-LINKEDIN_AUTH_URL = "https://www.linkedin.com/oauth/v2/authorization"
-LINKEDIN_TOKEN_URL = "https://www.linkedin.com/oauth/v2/accessToken"
-LINKEDIN_API_BASE = "https://api.linkedin.com"
+LINKEDIN_AUTH_URL = f"{settings.linkedin_oauth_base.rstrip('/')}/authorization"
+LINKEDIN_TOKEN_URL = f"{settings.linkedin_oauth_base.rstrip('/')}/accessToken"
+LINKEDIN_API_BASE = settings.linkedin_api_base.rstrip("/")
 RESTLI_VERSION = "2.0.0"
 
 
+# One pooled client per event loop: an httpx client is bound to the loop it first ran on. Scheduler jobs
+# share the app loop's (run_on_app_loop); scripts calling asyncio.run get one of their own
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def _client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        limits = httpx.Limits(max_connections=settings.linkedin_max_connections, max_keepalive_connections=settings.linkedin_max_connections)
+        client = _clients[loop] = httpx.AsyncClient(limits=limits)
+    return client
+
+
+async def close_client() -> None:
+    """Close the running loop's pooled client (app shutdown, end of a scheduler job)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+async def _send(endpoint: str, method: str, url: str, **kwargs: Any) -> httpx.Response:
+    """One LinkedIn API call, traced and recording latency and status code (0 = transport error) per endpoint."""
+    start = time.perf_counter()
+    status = 0
+    try:
+        with start_span(f"linkedin.{endpoint}", KIND_CLIENT, {"http.request.method": method, "server.address": httpx.URL(url).host}) as span:
+            resp = await _client().request(method, url, **kwargs)
+            status = resp.status_code
+            span.set_attribute("http.response.status_code", status)
+            return resp
+    finally:
+        LINKEDIN_REQUEST_DURATION.labels(endpoint).observe(time.perf_counter() - start)
+        LINKEDIN_RESPONSES.labels(endpoint, status).inc()
+
+
+async def _fetch_urn_from_userinfo(access_token: str) -> str | None:
+    """Person URN from OpenID Connect userinfo; None on failure."""
+    try:
+        r = await _send(
+            "userinfo",
+            "GET",
+            f"{LINKEDIN_API_BASE}/v2/userinfo",
+            headers={"Authorization": f"Bearer {access_token}"},
+        )
+        r.raise_for_status()
+        data = r.json()
+        sub = data.get("sub")
+        if sub and sub.startswith("urn:"):
+            return sub
+        if sub:
+            return f"urn:li:person:{sub}"
+        return None
+    except Exception as e:
+        logger.warning("linkedin_userinfo_failed", error=str(e))
+        return None
+
+
+# URN per token (keyed by a hash, so tokens are not kept in memory twice); failures are not memoized
+_URN_MEMO_SIZE = 1024
+_urn_memo: "OrderedDict[str, str]" = OrderedDict()
+_urn_memo_lock = threading.Lock()
+# Single-flight: concurrent lookups for the same token on the same loop share one userinfo call
+_urn_inflight: dict[tuple[int, str], asyncio.Future] = {}
+
+
+def _token_key(access_token: str) -> str:
+    return hashlib.sha256(access_token.encode()).hexdigest()
+
+
+def remember_author_urn(access_token: str, urn: str) -> None:
+    """Seed the memo (e.g. with a URN already stored for this token)."""
+    with _urn_memo_lock:
+        _urn_memo[_token_key(access_token)] = urn
+        _urn_memo.move_to_end(_token_key(access_token))
+        while len(_urn_memo) > _URN_MEMO_SIZE:
+            _urn_memo.popitem(last=False)
+
+
+async def resolve_author_urn(access_token: str) -> str | None:
+    """Author URN for a token: memoized, with concurrent callers coalesced onto one userinfo request."""
+    key = _token_key(access_token)
+    with _urn_memo_lock:
+        urn = _urn_memo.get(key)
+    if urn is not None:
+        return urn
+    flight = (id(asyncio.get_running_loop()), key)
+    pending = _urn_inflight.get(flight)
+    if pending is not None:
+        return await asyncio.shield(pending)
+    future = asyncio.ensure_future(_fetch_urn_from_userinfo(access_token))
+    _urn_inflight[flight] = future
+    try:
+        urn = await asyncio.shield(future)
+    finally:
+        _urn_inflight.pop(flight, None)
+    if urn:
+        remember_author_urn(access_token, urn)
+    return urn
+
+
+# ----- Images -----
+IMAGE_RECIPE = "urn:li:digitalmediaRecipe:feedshare-image"
+UPLOAD_CHUNK_BYTES = 256 * 1024
+# Asset URN per (image sha256, account id)
+_ASSET_MEMO_SIZE = 4096
+_asset_memo: "OrderedDict[tuple[str, int], str]" = OrderedDict()
+_asset_memo_lock = threading.Lock()
+# sha256 per (path, size, mtime) for files not named by their hash, so re-publishing doesn't re-read them
+_digests: dict[tuple[str, int, int], str] = {}
+
+
+@dataclass(frozen=True)
+class ImageFile:
+    """A stored image ready for upload."""
+
+    path: Path
+    sha256: str
+    size: int
+    content_type: str
+
+
+def _inspect_image(image_path: str) -> ImageFile | None:
+    """Fetch a draft's image from storage (local file or cache tier) and hash it in chunks (blocking; run in a thread)."""
+    try:
+        path = image_store.local_file(image_path)
+        if path is None:
+            return None
+        st = path.stat()
+    except (ValueError, OSError, httpx.HTTPError):
+        return None
+    if st.st_size == 0:
+        return None
+    key = (str(path), st.st_size, st.st_mtime_ns)
+    digest = image_store.digest_from_path(path) or _digests.get(key)
+    if digest is None:
+        h = hashlib.sha256()
+        with path.open("rb") as f:
+            while chunk := f.read(UPLOAD_CHUNK_BYTES):
+                h.update(chunk)
+        digest = _digests[key] = h.hexdigest()
+    return ImageFile(path, digest, st.st_size, image_store.content_type(image_path))
+
+
+async def load_image(image_path: str | None) -> ImageFile | None:
+    """The draft image stored at `image_path`, or None if missing/empty/outside storage."""
+    if not image_path:
+        return None
+    image = await asyncio.to_thread(_inspect_image, image_path)
+    if image is None:
+        logger.warning("linkedin_image_missing", image_path=image_path)
+    return image
+
+
+async def _file_chunks(path: Path) -> AsyncIterator[bytes]:
+    """Stream a file in UPLOAD_CHUNK_BYTES pieces, reading off the event loop."""
+    f = await asyncio.to_thread(path.open, "rb")
+    try:
+        while chunk := await asyncio.to_thread(f.read, UPLOAD_CHUNK_BYTES):
+            yield chunk
+    finally:
+        await asyncio.to_thread(f.close)
+
+
+def _expires_at(expires_in: Any) -> datetime | None:
+    """Absolute expiry from an OAuth `expires_in` (seconds); None if missing or invalid."""
+    try:
+        return datetime.now(timezone.utc).replace(microsecond=0) + timedelta(seconds=int(expires_in))
+    except (TypeError, ValueError):
+        return None
+
+
+async def refresh_access_token(refresh_token: str) -> dict[str, Any]:
+    """Exchange a refresh token for a new access token. Returns the token response (raises on HTTP errors)."""
+    resp = await _send(
+        "token",
+        "POST",
+        LINKEDIN_TOKEN_URL,
+        data={
+            "grant_type": "refresh_token",
+            "refresh_token": refresh_token,
+            "client_id": settings.linkedin_client_id,
+            "client_secret": settings.linkedin_client_secret,
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    resp.raise_for_status()
+    data = resp.json()
+    if not data.get("access_token"):
+        raise ValueError("No access_token in LinkedIn refresh response")
+    return data
+
+
+def _token_values(data: dict[str, Any], previous_refresh_token: str | None) -> dict[str, Any]:
+    """LinkedInAccount column values from a token response (LinkedIn may omit an unchanged refresh token)."""
+    return {
+        "access_token": data["access_token"],
+        "refresh_token": data.get("refresh_token") or previous_refresh_token,
+        "token_expires_at": _expires_at(data.get("expires_in")),
+    }
+
+
 class LinkedInService:
     """LinkedIn OAuth and post creation."""
 
     def __init__(self, session: AsyncSession):
         self.session = session
+        # Column updates found while posting (resolved URNs, refreshed tokens), written after the concurrent part
+        self._pending_updates: dict[int, dict[str, Any]] = {}
 
     def get_authorization_url(self, state: str, account_type: str = "personal") -> str:
         """Build LinkedIn OAuth authorization URL. Use state to pass account_type if needed."""
@@ -43,18 +260,19 @@ class LinkedInService:
         self, code: str, state: str, account_type: str = "personal", display_name: str = "LinkedIn Account"
     ) -> LinkedInAccount:
         """Exchange authorization code for access token; create or update LinkedInAccount."""
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(
-                LINKEDIN_TOKEN_URL,
-                data={
-                    "grant_type": "authorization_code",
-                    "code": code,
-                    "redirect_uri": settings.linkedin_redirect_uri,
-                    "client_id": settings.linkedin_client_id,
-                    "client_secret": settings.linkedin_client_secret,
-                },
-                headers={"Content-Type": "application/x-www-form-urlencoded"},
-            )
+        resp = await _send(
+            "token",
+            "POST",
+            LINKEDIN_TOKEN_URL,
+            data={
+                "grant_type": "authorization_code",
+                "code": code,
+                "redirect_uri": settings.linkedin_redirect_uri,
+                "client_id": settings.linkedin_client_id,
+                "client_secret": settings.linkedin_client_secret,
+            },
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
         resp.raise_for_status()
         data = resp.json()
         access_token = data.get("access_token")
@@ -63,20 +281,10 @@ class LinkedInService:
         if not access_token:
             raise ValueError("No access_token in LinkedIn response")
 
-        token_expires_at = None
-        if expires_in is not None:
-            try:
-                token_expires_at = datetime.now(timezone.utc).replace(microsecond=0)
-                from datetime import timedelta
-                token_expires_at = token_expires_at + timedelta(seconds=int(expires_in))
-            except (TypeError, ValueError):
-                pass
+        token_expires_at = _expires_at(expires_in)
 
+        # Resolved once here and stored, so publishing never needs userinfo
         linkedin_urn = await self._get_author_urn(access_token, account_type)
-        if not linkedin_urn and data.get("scope"):
-            pass
-        if not linkedin_urn and "openid" in (data.get("scope") or ""):
-            linkedin_urn = await self._get_urn_from_userinfo(access_token)
 
         r = await self.session.execute(
             select(LinkedInAccount).where(LinkedInAccount.account_type == account_type).limit(1)
@@ -86,6 +294,7 @@ class LinkedInService:
             existing.access_token = access_token
             existing.refresh_token = refresh_token
             existing.token_expires_at = token_expires_at
+            existing.token_refresh_failed_at = None
             existing.linkedin_urn = linkedin_urn or existing.linkedin_urn
             existing.updated_at = datetime.now(timezone.utc)
             return existing
@@ -104,24 +313,8 @@ class LinkedInService:
         return account
 
     async def _get_urn_from_userinfo(self, access_token: str) -> str | None:
-        """Get person URN from OpenID Connect userinfo."""
-        try:
-            async with httpx.AsyncClient() as client:
-                r = await client.get(
-                    "https://api.linkedin.com/v2/userinfo",
-                    headers={"Authorization": f"Bearer {access_token}"},
-                )
-            r.raise_for_status()
-            data = r.json()
-            sub = data.get("sub")
-            if sub and sub.startswith("urn:"):
-                return sub
-            if sub:
-                return f"urn:li:person:{sub}"
-            return None
-        except Exception as e:
-            logger.warning("linkedin_userinfo_failed", error=str(e))
-            return None
+        """Get person URN from OpenID Connect userinfo (memoized per token)."""
+        return await resolve_author_urn(access_token)
 
     async def _get_author_urn(self, access_token: str, account_type: str) -> str | None:
         """Resolve author URN for posting (person or organization)."""
@@ -130,51 +323,261 @@ class LinkedInService:
             return urn
         return None
 
-    async def create_ugc_post(self, account_id: int, text: str) -> str | None:
-        """Create a UGC post on LinkedIn. Returns post id (X-RestLi-Id) or None on failure."""
-        r = await self.session.execute(select(LinkedInAccount).where(LinkedInAccount.id == account_id))
-        account = r.scalar_one_or_none()
-        if not account or not account.access_token:
+    async def load_accounts(self, account_ids: list[int]) -> dict[int, CachedAccount]:
+        """Accounts (with tokens) by id, from the account cache; misses are loaded in one query."""
+        return await get_account_cache().get_many(self.session, account_ids)
+
+    async def create_ugc_post(self, account_id: int, text: str, image: ImageFile | None = None) -> str | None:
+        """Create a UGC post on LinkedIn, with `image` if given. Returns post id (X-RestLi-Id) or None on failure."""
+        account = (await self.load_accounts([account_id])).get(account_id)
+        if not account:
             logger.warning("create_ugc_post_no_account", account_id=account_id)
             return None
+        post_id = await self._post_as(account, text, image)
+        await self._flush_pending_updates()
+        return post_id
+
+    async def create_ugc_posts(
+        self, accounts: list[CachedAccount], text: str, image: ImageFile | None = None
+    ) -> dict[int, str | None]:
+        """
+        Post the same text (and image) as every account concurrently over the pooled client.
+        Returns post id (or None on failure) per account id; resolved URNs and refreshed tokens are added to
+        the session for the caller to commit.
+        """
+        post_ids = await asyncio.gather(*(self._post_as(account, text, image) for account in accounts))
+        await self._flush_pending_updates()
+        return {account.id: post_id for account, post_id in zip(accounts, post_ids)}
+
+    async def _flush_pending_updates(self) -> None:
+        for account_id, values in self._pending_updates.items():
+            await self.session.execute(
+                update(LinkedInAccount).where(LinkedInAccount.id == account_id).values(**values, updated_at=datetime.now(timezone.utc))
+            )
+        self._pending_updates.clear()
+
+    async def _ensure_fresh_token(self, account: CachedAccount) -> CachedAccount:
+        """
+        Refresh inline if the token is about to expire (the background refresher normally got there first).
+        Returns the account to post as; the cache entry is replaced on refresh.
+        """
+        if not account.refresh_token or not account.expires_within(300):
+            return account
+        try:
+            data = await refresh_access_token(account.refresh_token)
+        except Exception as e:
+            LINKEDIN_TOKEN_REFRESHES.labels("failed").inc()
+            logger.warning("linkedin_token_refresh_failed", account_id=account.id, error=str(e))
+            return account
+        LINKEDIN_TOKEN_REFRESHES.labels("ok").inc()
+        values = _token_values(data, account.refresh_token)
+        self._pending_updates.setdefault(account.id, {}).update(values, token_refresh_failed_at=None)
+        return get_account_cache().put(replace(account, **values))
+
+    async def _upload_image(self, account: CachedAccount, author_urn: str, image: ImageFile) -> str:
+        """
+        Register an image upload as `author_urn` and stream the file to the upload URL; returns the asset URN.
+        Assets are remembered per (image hash, account), so re-publishing an image skips the upload.
+        """
+        key = (image.sha256, account.id)
+        with _asset_memo_lock:
+            asset = _asset_memo.get(key)
+        if asset is not None:
+            return asset
+        auth = {"Authorization": f"Bearer {account.access_token}"}
+        resp = await _send(
+            "assets_register",
+            "POST",
+            f"{LINKEDIN_API_BASE}/v2/assets?action=registerUpload",
+            json={
+                "registerUploadRequest": {
+                    "recipes": [IMAGE_RECIPE],
+                    "owner": author_urn,
+                    "serviceRelationships": [{"relationshipType": "OWNER", "identifier": "urn:li:userGeneratedContent"}],
+                }
+            },
+            headers={**auth, "Content-Type": "application/json", "X-Restli-Protocol-Version": RESTLI_VERSION},
+        )
+        resp.raise_for_status()
+        value = resp.json()["value"]
+        mechanism = value["uploadMechanism"]["com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest"]
+        upload = await _send(
+            "assets_upload",
+            "PUT",
+            mechanism["uploadUrl"],
+            content=_file_chunks(image.path),
+            headers={
+                **auth,
+                **(mechanism.get("headers") or {}),
+                "Content-Type": image.content_type,
+                "Content-Length": str(image.size),
+            },
+        )
+        upload.raise_for_status()
+        asset = value["asset"]
+        with _asset_memo_lock:
+            _asset_memo[key] = asset
+            while len(_asset_memo) > _ASSET_MEMO_SIZE:
+                _asset_memo.popitem(last=False)
+        return asset
+
+    async def _post_as(self, account: CachedAccount, text: str, image: ImageFile | None = None) -> str | None:
+        """Create one UGC post as `account`, with `image` if given (no session I/O, so safe to run concurrently)."""
+        account_id = account.id
+        if not account.access_token:
+            logger.warning("create_ugc_post_no_account", account_id=account_id)
+            return None
+        account = await self._ensure_fresh_token(account)
         author_urn = account.linkedin_urn
         if not author_urn:
             author_urn = await self._get_urn_from_userinfo(account.access_token)
             if author_urn:
-                account.linkedin_urn = author_urn
-                await self.session.flush()
+                self._pending_updates.setdefault(account_id, {})["linkedin_urn"] = author_urn
+                get_account_cache().put(replace(account, linkedin_urn=author_urn))
         if not author_urn:
             logger.warning("create_ugc_post_no_urn", account_id=account_id)
             return None
 
-        body = {
-            "author": author_urn,
-            "lifecycleState": "PUBLISHED",
-            "specificContent": {
-                "com.linkedin.ugc.ShareContent": {
-                    "shareCommentary": {"text": text},
-                    "shareMediaCategory": "NONE",
-                }
-            },
-            "visibility": {"com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"},
-        }
         try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.post(
-                    f"{LINKEDIN_API_BASE}/v2/ugcPosts",
-                    json=body,
-                    headers={
-                        "Authorization": f"Bearer {account.access_token}",
-                        "Content-Type": "application/json",
-                        "X-Restli-Protocol-Version": RESTLI_VERSION,
-                    },
-                )
+            asset_urn = await self._upload_image(account, author_urn, image) if image is not None else None
+            share: dict[str, Any] = {"shareCommentary": {"text": text}, "shareMediaCategory": "NONE"}
+            if asset_urn:
+                share["shareMediaCategory"] = "IMAGE"
+                share["media"] = [{"status": "READY", "media": asset_urn}]
+            body = {
+                "author": author_urn,
+                "lifecycleState": "PUBLISHED",
+                "specificContent": {"com.linkedin.ugc.ShareContent": share},
+                "visibility": {"com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"},
+            }
+            resp = await _send(
+                "ugc_posts",
+                "POST",
+                f"{LINKEDIN_API_BASE}/v2/ugcPosts",
+                json=body,
+                headers={
+                    "Authorization": f"Bearer {account.access_token}",
+                    "Content-Type": "application/json",
+                    "X-Restli-Protocol-Version": RESTLI_VERSION,
+                },
+            )
             resp.raise_for_status()
             post_id = resp.headers.get("X-RestLi-Id")
             return post_id or ""
         except httpx.HTTPStatusError as e:
+            if e.response.status_code == 401:
+                # Revoked or expired token: reload the account (and any re-authorized token) next time
+                get_account_cache().invalidate(account_id)
             logger.warning("create_ugc_post_failed", account_id=account_id, status=e.response.status_code, body=e.response.text[:500])
             return None
         except Exception as e:
             logger.warning("create_ugc_post_failed", account_id=account_id, error=str(e))
             return None
+
+
+async def refresh_expiring_tokens(session: AsyncSession) -> int:
+    """
+    Refresh tokens of active accounts expiring within TOKEN_REFRESH_AHEAD_HOURS, TOKEN_REFRESH_BATCH_SIZE at a time
+    (concurrently) until none are left, and update the rows and the account cache. A failed account is marked and
+    skipped for TOKEN_REFRESH_RETRY_HOURS, so revoked tokens do not hold up the rest. Returns the number refreshed.
+    """
+    now = datetime.now(timezone.utc)
+    horizon = now + timedelta(hours=settings.token_refresh_ahead_hours)
+    retry_before = now - timedelta(hours=settings.token_refresh_retry_hours)
+    cache = get_account_cache()
+    refreshed = failed = 0
+    last_id = 0  # id order: a refreshed token still inside the horizon is not picked up again in this run
+    while True:
+        r = await session.execute(
+            select(LinkedInAccount)
+            .where(
+                LinkedInAccount.is_active == True,  # noqa: E712
+                LinkedInAccount.refresh_token.is_not(None),
+                LinkedInAccount.token_expires_at.is_not(None),
+                LinkedInAccount.token_expires_at <= horizon,
+                or_(
+                    LinkedInAccount.token_refresh_failed_at.is_(None),
+                    LinkedInAccount.token_refresh_failed_at < retry_before,
+                ),
+                LinkedInAccount.id > last_id,
+            )
+            .order_by(LinkedInAccount.id)
+            .limit(settings.token_refresh_batch_size)
+        )
+        accounts = [CachedAccount.from_row(row) for row in r.scalars()]
+        if not accounts:
+            break
+        last_id = accounts[-1].id
+        results = await asyncio.gather(*(refresh_access_token(a.refresh_token) for a in accounts), return_exceptions=True)
+        now = datetime.now(timezone.utc)
+        for account, result in zip(accounts, results):
+            if isinstance(result, BaseException):
+                LINKEDIN_TOKEN_REFRESHES.labels("failed").inc()
+                logger.warning("linkedin_token_refresh_failed", account_id=account.id, error=str(result))
+                await session.execute(
+                    update(LinkedInAccount).where(LinkedInAccount.id == account.id).values(token_refresh_failed_at=now)
+                )
+                failed += 1
+                continue
+            values = _token_values(result, account.refresh_token)
+            await session.execute(
+                update(LinkedInAccount)
+                .where(LinkedInAccount.id == account.id)
+                .values(**values, token_refresh_failed_at=None, updated_at=now)
+            )
+            cache.put(replace(account, **values))
+            LINKEDIN_TOKEN_REFRESHES.labels("ok").inc()
+            refreshed += 1
+        await session.commit()
+    if refreshed or failed:
+        logger.info("linkedin_tokens_refreshed", refreshed=refreshed, failed=failed)
+    return refreshed
+
+
+async def backfill_author_urns(session: AsyncSession) -> int:
+    """Resolve and store URNs for active accounts connected without one, so their publishes skip userinfo."""
+    r = await session.execute(
+        select(LinkedInAccount.id, LinkedInAccount.access_token)
+        .where(
+            LinkedInAccount.is_active == True,  # noqa: E712
+            LinkedInAccount.linkedin_urn.is_(None),
+            LinkedInAccount.access_token.is_not(None),
+        )
+        .limit(settings.token_refresh_batch_size)
+    )
+    rows = r.all()
+    if not rows:
+        return 0
+    urns = await asyncio.gather(*(resolve_author_urn(token) for _, token in rows))
+    cache = get_account_cache()
+    resolved = 0
+    for (account_id, _), urn in zip(rows, urns):
+        if urn:
+            await session.execute(update(LinkedInAccount).where(LinkedInAccount.id == account_id).values(linkedin_urn=urn))
+            cache.invalidate(account_id)
+            resolved += 1
+    await session.commit()
+    logger.info("linkedin_urns_backfilled", resolved=resolved, missing=len(rows) - resolved)
+    return resolved
+
+
+def run_token_refresh() -> None:
+    """Background job (sync): refresh tokens that expire soon and fill in missing author URNs (on the app loop)."""
+    run_on_app_loop(_run_token_refresh())
+
+
+async def _run_token_refresh() -> None:
+    from app.models.db_models import init_db
+
+    factory = init_db()
+    if factory is None:
+        return
+    try:
+        async with factory() as session:
+            await refresh_expiring_tokens(session)
+            await backfill_author_urns(session)
+    except Exception as e:
+        logger.warning("linkedin_token_refresh_job_failed", error=str(e))
+    finally:
+        if not on_app_loop():  # a client opened on a loop of its own would outlive it
+            await close_client()
@@ -0,0 +1,274 @@
+"""
+LLM token and cost accounting: every Gemini call is recorded (tokens from usage_metadata, latency, model,
+account) into an in-memory buffer that a background task writes to the append-only llm_usage table in
+batches. Also tracks each account's spend for the current UTC day so budgets can be enforced cheaply.
+"""
+import asyncio
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.db_models import LLMUsage, init_db
+from app.utils.logging import get_logger
+from app.utils.metrics import LLM_COST_USD, LLM_USAGE_DROPPED
+
+logger = get_logger(__name__)
+
+# USD per 1M tokens (input, cached input, output) and per generated image; list prices at the time of
+# writing, override or extend with LLM_PRICES (JSON). Models missing here are recorded with cost 0.
+DEFAULT_PRICES: dict[str, dict[str, float]] = {
+    "gemini-3-flash-preview": {"input": 0.50, "cached_input": 0.05, "output": 3.00},
+    "gemini-2.5-flash": {"input": 0.30, "cached_input": 0.03, "output": 2.50},
+    "gemini-2.5-flash-lite": {"input": 0.10, "cached_input": 0.01, "output": 0.40},
+    "gemini-2.5-pro": {"input": 1.25, "cached_input": 0.125, "output": 10.00},
+    "gemini-2.5-flash-image": {"input": 0.30, "output": 30.00},
+    "gemini-3-pro-image-preview": {"input": 2.00, "output": 120.00},
+    "imagen-4.0-generate-001": {"image": 0.04},
+    "imagen-4.0-fast-generate-001": {"image": 0.02},
+    "imagen-4.0-ultra-generate-001": {"image": 0.06},
+}
+
+
+def cost_usd(model: str, input_tokens: int, cached_tokens: int, output_tokens: int, images: int) -> float:
+    price = settings.llm_prices.get(model) or DEFAULT_PRICES.get(model) or {}
+    per_token = (
+        input_tokens * price.get("input", 0.0)
+        + cached_tokens * price.get("cached_input", price.get("input", 0.0))
+        + output_tokens * price.get("output", 0.0)
+    ) / 1_000_000
+    # Image models priced per token already include the image in output tokens
+    return per_token + (images * price.get("image", 0.0))
+
+
+@dataclass(frozen=True)
+class UsageScope:
+    """Who a Gemini call is made for; set by routes, read in gemini_service (carried into worker threads)."""
+
+    account_id: int | None = None
+    downgrade: bool = False  # budget exceeded: use the budget models
+
+
+_scope: ContextVar[UsageScope] = ContextVar("llm_usage_scope", default=UsageScope())
+
+
+def current_scope() -> UsageScope:
+    return _scope.get()
+
+
+@contextmanager
+def usage_scope(scope: UsageScope) -> Iterator[UsageScope]:
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+class UsageRecorder:
+    """Buffer of usage rows (thread-safe appends) plus running spend per account for the current UTC day."""
+
+    def __init__(self, max_buffer: int, batch_size: int):
+        self.max_buffer = max_buffer
+        self.batch_size = batch_size
+        self._rows: deque[dict[str, Any]] = deque()
+        self._lock = threading.Lock()
+        self._write_lock = asyncio.Lock()  # held while a batch moves from the buffer to the table
+        self._day = _today()
+        self._spent: dict[int, float] = {}  # account id -> spend today, once loaded from the table
+        self._wake: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def record(
+        self,
+        model: str,
+        operation: str,
+        input_tokens: int,
+        cached_tokens: int,
+        output_tokens: int,
+        images: int,
+        latency_seconds: float,
+    ) -> float:
+        """Queue one call's usage for the current scope's account; returns its cost."""
+        scope = current_scope()
+        cost = cost_usd(model, input_tokens, cached_tokens, output_tokens, images)
+        row = {
+            "created_at": datetime.now(timezone.utc),
+            "account_id": scope.account_id,
+            "model": model,
+            "operation": operation,
+            "input_tokens": input_tokens,
+            "cached_tokens": cached_tokens,
+            "output_tokens": output_tokens,
+            "images": images,
+            "latency_ms": int(latency_seconds * 1000),
+            "cost_usd": cost,
+        }
+        with self._lock:
+            self._roll_day()
+            if scope.account_id in self._spent:
+                self._spent[scope.account_id] += cost
+            dropped = len(self._rows) >= self.max_buffer
+            if not dropped:
+                self._rows.append(row)
+            full = len(self._rows) >= self.batch_size
+        LLM_COST_USD.labels(model).inc(cost)
+        if dropped:
+            LLM_USAGE_DROPPED.labels().inc()
+            return cost
+        if full and self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        return cost
+
+    def _roll_day(self) -> None:
+        today = _today()
+        if today != self._day:
+            self._day, self._spent = today, {}
+
+    async def spent_today(self, session: AsyncSession, account_id: int) -> float:
+        """Account spend for the current UTC day: summed from the table once per day, then kept in memory."""
+        with self._lock:
+            self._roll_day()
+            if account_id in self._spent:
+                return self._spent[account_id]
+            day = self._day
+        start = datetime.fromisoformat(day).replace(tzinfo=timezone.utc)
+        # Every row is in exactly one of the table and the buffer only while no batch is being written
+        async with self._write_lock:
+            stored = (
+                await session.execute(
+                    select(func.coalesce(func.sum(LLMUsage.cost_usd), 0.0)).where(
+                        LLMUsage.account_id == account_id, LLMUsage.created_at >= start
+                    )
+                )
+            ).scalar_one()
+            with self._lock:
+                if self._day == day and account_id not in self._spent:
+                    # Rows this process recorded but has not written yet are not in the sum
+                    pending = sum(r["cost_usd"] for r in self._rows if r["account_id"] == account_id)
+                    self._spent[account_id] = float(stored) + pending
+                return self._spent.get(account_id, float(stored))
+
+    def _drain(self) -> list[dict[str, Any]]:
+        with self._lock:
+            batch = [self._rows.popleft() for _ in range(min(len(self._rows), self.batch_size))]
+        return batch
+
+    async def flush(self) -> int:
+        """Write everything buffered, one multi-row INSERT per batch. Returns rows written."""
+        if not self._rows:
+            return 0
+        factory = init_db()
+        if factory is None:
+            return 0
+        written = 0
+        while True:
+            async with self._write_lock:
+                batch = self._drain()
+                if not batch:
+                    return written
+                try:
+                    async with factory() as session:
+                        await session.execute(insert(LLMUsage), batch)
+                        await session.commit()
+                except Exception as e:
+                    logger.warning("llm_usage_write_failed", rows=len(batch), error=str(e))
+                    with self._lock:  # keep them for the next flush, oldest first
+                        self._rows.extendleft(reversed(batch))
+                    return written
+            written += len(batch)
+
+    async def run(self, interval: float) -> None:
+        """Background writer: flush every `interval` seconds, or as soon as a batch is full."""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                await self.flush()
+        finally:
+            self._loop = self._wake = None
+
+
+_recorder: UsageRecorder | None = None
+_recorder_lock = threading.Lock()
+
+
+def get_usage_recorder() -> UsageRecorder:
+    """Process-wide usage recorder."""
+    global _recorder
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                _recorder = UsageRecorder(settings.llm_usage_max_buffer, settings.llm_usage_batch_size)
+    return _recorder
+
+
+def record_usage(
+    model: str,
+    operation: str,
+    usage: Any = None,
+    latency_seconds: float = 0.0,
+    images: int = 0,
+) -> None:
+    """Record one Gemini call from its usage_metadata (None when the API reports none, e.g. Imagen)."""
+    prompt = (usage.prompt_token_count or 0) if usage is not None else 0
+    cached = (usage.cached_content_token_count or 0) if usage is not None else 0
+    output = (usage.candidates_token_count or 0) if usage is not None else 0
+    get_usage_recorder().record(model, operation, max(0, prompt - cached), cached, output, images, latency_seconds)
+
+
+async def usage_writer() -> None:
+    """Lifespan task: batched writes of recorded usage."""
+    await get_usage_recorder().run(settings.llm_usage_flush_seconds)
+
+
+async def flush_usage() -> None:
+    """Write what is still buffered (shutdown)."""
+    written = await get_usage_recorder().flush()
+    if written:
+        logger.info("llm_usage_flushed", rows=written)
+
+
+async def usage_report(session: AsyncSession, days: int, account_id: int | None = None) -> list[dict[str, Any]]:
+    """Calls, tokens and cost per UTC day, account and model over the last `days` days (newest first)."""
+    day = func.date(LLMUsage.created_at)
+    query = (
+        select(
+            day.label("day"),
+            LLMUsage.account_id,
+            LLMUsage.model,
+            func.count().label("calls"),
+            func.sum(LLMUsage.input_tokens).label("input_tokens"),
+            func.sum(LLMUsage.cached_tokens).label("cached_tokens"),
+            func.sum(LLMUsage.output_tokens).label("output_tokens"),
+            func.sum(LLMUsage.images).label("images"),
+            func.sum(LLMUsage.cost_usd).label("cost_usd"),
+        )
+        .where(LLMUsage.created_at >= datetime.now(timezone.utc) - timedelta(days=days))
+        .group_by(day, LLMUsage.account_id, LLMUsage.model)
+        .order_by(day.desc(), func.sum(LLMUsage.cost_usd).desc())
+    )
+    if account_id is not None:
+        query = query.where(LLMUsage.account_id == account_id)
+    rows = (await session.execute(query)).mappings().all()
+    return [{**r, "day": str(r["day"]), "cost_usd": round(float(r["cost_usd"] or 0.0), 6)} for r in rows]
+
+
+def budget_exceeded(spent: float, budget: float | None) -> bool:
+    return budget is not None and budget > 0 and spent >= budget
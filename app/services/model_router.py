@@ -0,0 +1,205 @@
+"""
+Routing of Gemini calls over a preference-ordered model chain: rolling latency and error estimates per model,
+a hedged request to the next model once the current one runs past its p95, and circuit breakers that take
+failing models out of rotation for a cooldown. Blocking; called from worker threads.
+"""
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, TypeVar
+
+from app.config import settings
+from app.utils.logging import get_logger
+from app.utils.metrics import GEMINI_CIRCUIT_OPEN, GEMINI_FALLBACKS, GEMINI_HEDGED_REQUESTS, GEMINI_MODEL_ERROR_RATE
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+_CLOSED, _OPEN, _HALF_OPEN = "closed", "open", "half_open"
+
+
+class ModelsUnavailableError(RuntimeError):
+    """Every model in the chain has its circuit open."""
+
+
+class CallCancelled(Exception):
+    """Raised by an attempt that noticed its cancel event (it lost a hedge race)."""
+
+
+@dataclass
+class _ModelState:
+    latencies: deque = field(default_factory=lambda: deque(maxlen=settings.gemini_latency_window))
+    error_rate: float = 0.0  # EWMA of failures (1) and successes (0)
+    failures: int = 0  # consecutive
+    state: str = _CLOSED
+    opened_at: float = 0.0  # monotonic
+    trial_in_flight: bool = False
+
+
+class ModelRouter:
+    def __init__(
+        self,
+        hedge_default_seconds: float,
+        hedge_min_seconds: float,
+        breaker_failures: int,
+        breaker_cooldown_seconds: float,
+        max_workers: int,
+    ):
+        self.hedge_default = hedge_default_seconds
+        self.hedge_min = hedge_min_seconds
+        self.breaker_failures = breaker_failures
+        self.breaker_cooldown = breaker_cooldown_seconds
+        self._models: dict[str, _ModelState] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gemini")
+
+    def _state(self, model: str) -> _ModelState:
+        st = self._models.get(model)
+        if st is None:
+            st = self._models.setdefault(model, _ModelState())
+        return st
+
+    def hedge_delay(self, model: str) -> float:
+        """Seconds to wait on `model` before hedging: its rolling p95, or the default until enough samples."""
+        with self._lock:
+            samples = sorted(self._state(model).latencies)
+        if len(samples) < 20:
+            return self.hedge_default
+        return max(self.hedge_min, samples[min(len(samples) - 1, int(len(samples) * 0.95))])
+
+    def _acquire(self, model: str) -> bool:
+        """Whether `model` may take a call now (closed, or the single trial call of a half-open breaker)."""
+        with self._lock:
+            st = self._state(model)
+            if st.state == _OPEN and time.monotonic() - st.opened_at >= self.breaker_cooldown:
+                st.state = _HALF_OPEN
+            if st.state == _CLOSED:
+                return True
+            if st.state == _HALF_OPEN and not st.trial_in_flight:
+                st.trial_in_flight = True
+                return True
+            return False
+
+    def _record(self, model: str, seconds: float, ok: bool | None) -> None:
+        """ok=None: cancelled after `seconds` (a lower bound on its latency, kept so p95 doesn't drift down)."""
+        with self._lock:
+            st = self._state(model)
+            st.latencies.append(seconds)
+            st.trial_in_flight = False
+            if ok is None:
+                if st.state == _HALF_OPEN:
+                    st.state, st.opened_at = _OPEN, time.monotonic() - self.breaker_cooldown  # retry the trial
+                return
+            st.error_rate = st.error_rate * 0.9 + (0.0 if ok else 0.1)
+            if ok:
+                st.failures = 0
+                if st.state != _CLOSED:
+                    logger.info("gemini_circuit_closed", model=model)
+                st.state = _CLOSED
+            else:
+                st.failures += 1
+                if st.state == _HALF_OPEN or st.failures >= self.breaker_failures:
+                    if st.state != _OPEN:
+                        logger.warning("gemini_circuit_opened", model=model, failures=st.failures)
+                    st.state, st.opened_at = _OPEN, time.monotonic()
+            GEMINI_CIRCUIT_OPEN.labels(model).set(1 if st.state == _OPEN else 0)
+            GEMINI_MODEL_ERROR_RATE.labels(model).set(st.error_rate)
+
+    def _attempt(self, model: str, fn: Callable[[str, threading.Event], T], cancel: threading.Event) -> T:
+        start = time.monotonic()
+        try:
+            result = fn(model, cancel)
+        except CallCancelled:
+            self._record(model, time.monotonic() - start, None)
+            raise
+        except Exception:
+            self._record(model, time.monotonic() - start, None if cancel.is_set() else False)
+            raise
+        self._record(model, time.monotonic() - start, None if cancel.is_set() else True)
+        return result
+
+    def call(self, operation: str, models: list[str], fn: Callable[[str, threading.Event], T], hedge: bool = True) -> tuple[str, T]:
+        """
+        Run fn(model, cancel) on the first available model; on failure move straight to the next one, and with
+        `hedge`, also start the next one when the running call exceeds its model's p95. The first success wins,
+        the other attempt gets its cancel event set. Returns (model, result); raises the last error when every
+        model failed, or ModelsUnavailableError when every circuit is open.
+        """
+        pending = list(dict.fromkeys(m for m in models if m))
+        running: dict[Future, tuple[str, threading.Event]] = {}
+        last_error: Exception | None = None
+        first = True
+
+        def start_next() -> bool:
+            nonlocal first
+            while pending:
+                model = pending.pop(0)
+                if not self._acquire(model):
+                    continue
+                if not first:
+                    GEMINI_FALLBACKS.labels(operation, model).inc()
+                first = False
+                cancel = threading.Event()
+                # Carry the caller's context (usage scope, trace) into the worker thread
+                ctx = contextvars.copy_context()
+                running[self._executor.submit(ctx.run, self._attempt, model, fn, cancel)] = (model, cancel)
+                return True
+            return False
+
+        if not start_next():
+            raise ModelsUnavailableError(f"No {operation} model available (circuits open: {', '.join(models)})")
+        try:
+            while running:
+                primary = next(iter(running.values()))[0]
+                timeout = self.hedge_delay(primary) if hedge and len(running) == 1 and pending else None
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:  # past p95: hedge with the next model
+                    if start_next():
+                        logger.info("gemini_hedged", operation=operation, slow=primary, hedge=next(reversed(running.values()))[0])
+                    continue
+                for future in done:
+                    model, _ = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        last_error = e
+                        logger.warning("gemini_model_failed", operation=operation, model=model, error=str(e)[:200])
+                        continue
+                    if running:
+                        GEMINI_HEDGED_REQUESTS.labels(operation, "hedge" if model != primary else "primary").inc()
+                    return model, result
+                if not running:
+                    start_next()
+        finally:
+            for _, cancel in running.values():  # losers: stop reading their responses
+                cancel.set()
+        raise last_error or ModelsUnavailableError(f"No {operation} model available")
+
+
+def model_chain(primary: str, fallbacks: str) -> list[str]:
+    """Preference-ordered models: the configured one, then the comma-separated fallbacks."""
+    return list(dict.fromkeys(m.strip() for m in [primary, *fallbacks.split(",")] if m.strip()))
+
+
+_router: ModelRouter | None = None
+_router_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    """Process-wide model router."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ModelRouter(
+                    hedge_default_seconds=settings.gemini_hedge_default_ms / 1000,
+                    hedge_min_seconds=settings.gemini_hedge_min_ms / 1000,
+                    breaker_failures=settings.gemini_breaker_failures,
+                    breaker_cooldown_seconds=settings.gemini_breaker_cooldown_seconds,
+                    max_workers=settings.gemini_router_workers,
+                )
+    return _router
@@ -0,0 +1,79 @@
+"""
+Generation provenance: the performance insights and strategy each draft was generated from, stored once per
+distinct content in insights_snapshots / strategy_decisions (keyed by the sha256 of their canonical JSON) and
+referenced from post_drafts by id, instead of a JSON copy on every draft.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.db_models import InsightsSnapshot, StrategyDecision
+
+Snapshot = type[InsightsSnapshot] | type[StrategyDecision]
+
+# (table, content hash) -> row id, for rows read back from the table (so never for a rolled-back insert)
+_MEMO_SIZE = 512
+_memo: "OrderedDict[tuple[str, str], int]" = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def canonical_json(payload: Any) -> str:
+    """Key-sorted, whitespace-free JSON: equal payloads give equal text (and hash)."""
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _insert_ignoring_duplicates(session: AsyncSession, model: Snapshot):
+    """INSERT that leaves an existing row with the same hash alone (a concurrent writer may have added it)."""
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return insert(model)
+    return dialect_insert(model).on_conflict_do_nothing(index_elements=["content_hash"])
+
+
+async def intern_payload(session: AsyncSession, model: Snapshot, payload: dict | None) -> int | None:
+    """Id of the row holding `payload` (created in the caller's transaction if new); None for an empty payload."""
+    if not payload:
+        return None
+    text = canonical_json(payload)
+    digest = content_hash(text)
+    key = (model.__tablename__, digest)
+    with _memo_lock:
+        row_id = _memo.get(key)
+        if row_id is not None:
+            _memo.move_to_end(key)
+            return row_id
+    lookup = select(model.id).where(model.content_hash == digest)
+    row_id = (await session.execute(lookup)).scalar_one_or_none()
+    if row_id is None:
+        now = datetime.now(timezone.utc)
+        await session.execute(
+            _insert_ignoring_duplicates(session, model).values(content_hash=digest, payload=text, created_at=now)
+        )
+        return (await session.execute(lookup)).scalar_one()
+    with _memo_lock:
+        _memo[key] = row_id
+        while len(_memo) > _MEMO_SIZE:
+            _memo.popitem(last=False)
+    return row_id
+
+
+async def intern_provenance(session: AsyncSession, insights: dict | None, strategy: dict | None) -> tuple[int | None, int | None]:
+    """(insights_id, strategy_id) for a generation result."""
+    return (
+        await intern_payload(session, InsightsSnapshot, insights),
+        await intern_payload(session, StrategyDecision, strategy),
+    )
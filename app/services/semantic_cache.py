@@ -0,0 +1,161 @@
+"""Semantic cache in front of post generation: hashed n-gram embeddings + NumPy nearest-neighbour lookup."""
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+from app.config import settings
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+EMBED_DIM = 1024
+CHAR_NGRAMS = (3, 4)
+WORD_WEIGHT = 2.0
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_WS_RE = re.compile(r"\s+")
+# Function words and instruction verbs carry no topic signal ("write about X" ~ "X")
+_STOPWORDS = frozenset(
+    "a an the and or but of in on for to with about into from by at as is are was were be been it its "
+    "this that these those i we you my our your me us write post draft make create linkedin please some something".split()
+)
+
+
+def normalize_prompt(text: str) -> str:
+    """Lowercase, drop punctuation, collapse whitespace."""
+    return _WS_RE.sub(" ", _PUNCT_RE.sub(" ", (text or "").lower())).strip()
+
+
+def embed(text: str) -> np.ndarray:
+    """
+    CPU-only local embedding: signed feature hashing of content words plus their char n-grams
+    (so "production"/"producing" overlap), L2-normalized so a dot product is cosine similarity.
+    Zero vector for empty text.
+    """
+    vec = np.zeros(EMBED_DIM, dtype=np.float32)
+    words = normalize_prompt(text).split()
+    words = [w for w in words if w not in _STOPWORDS] or words
+    if not words:
+        return vec
+    features: list[str] = []
+    weights: list[float] = []
+    for w in words:
+        features.append(f"w:{w}")
+        weights.append(WORD_WEIGHT)
+        padded = f"<{w}>"
+        for n in CHAR_NGRAMS:
+            grams = [padded[i:i + n] for i in range(len(padded) - n + 1)]
+            if not grams:
+                continue
+            features.extend(grams)
+            weights.extend([1.0 / len(grams)] * len(grams))
+    hashes = np.fromiter((zlib.crc32(f.encode()) for f in features), dtype=np.uint32, count=len(features))
+    signed = np.where(hashes & 0x80000000, -1.0, 1.0) * np.asarray(weights)
+    np.add.at(vec, (hashes % EMBED_DIM).astype(np.intp), signed.astype(np.float32))
+    n = float(np.linalg.norm(vec))
+    return vec / n if n else vec
+
+
+def strategy_scope(strategy: dict[str, Any] | None) -> int:
+    """Cache partition key: prompts only match when the strategy that shapes the post is the same."""
+    s = strategy or {}
+    key = "|".join(str(s.get(k, "")) for k in ("post_type", "tone", "cta_type", "hook_structure", "brand"))
+    return zlib.crc32(key.encode())
+
+
+@dataclass
+class CacheHit:
+    """Nearest cached prompt above the similarity threshold."""
+
+    draft_id: int
+    similarity: float
+    post: dict[str, Any]
+
+
+class SemanticCache:
+    """
+    Fixed-capacity matrix of prompt embeddings. Lookup is one matrix-vector product over live rows;
+    entries expire after ttl_seconds, and the oldest entry is evicted when full.
+    """
+
+    def __init__(self, capacity: int, ttl_seconds: float, threshold: float):
+        self.capacity = capacity
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self._vectors = np.zeros((capacity, EMBED_DIM), dtype=np.float32)
+        self._created = np.zeros(capacity, dtype=np.float64)  # 0 = empty slot
+        self._scopes = np.zeros(capacity, dtype=np.uint32)
+        self._values: list[tuple[int, dict[str, Any]] | None] = [None] * capacity
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._created))
+
+    def _live_mask(self, now: float) -> np.ndarray:
+        return (self._created > 0) & (self._created >= now - self.ttl_seconds)
+
+    def lookup(self, prompt: str, strategy: dict[str, Any] | None) -> CacheHit | None:
+        """Most similar live entry in the same strategy scope, if similarity >= threshold."""
+        q = embed(prompt)
+        if not q.any():
+            return None
+        now = time.time()
+        with self._lock:
+            mask = self._live_mask(now) & (self._scopes == strategy_scope(strategy))
+            if not mask.any():
+                return None
+            sims = np.where(mask, self._vectors @ q, -1.0)
+            best = int(np.argmax(sims))
+            sim = float(sims[best])
+            value = self._values[best]
+        if sim < self.threshold or value is None:
+            return None
+        return CacheHit(draft_id=value[0], similarity=sim, post=value[1])
+
+    def add(self, prompt: str, strategy: dict[str, Any] | None, draft_id: int, post: dict[str, Any]) -> None:
+        """Store a generated post; reuses an expired/empty slot or evicts the oldest entry."""
+        q = embed(prompt)
+        if not q.any():
+            return
+        now = time.time()
+        with self._lock:
+            live = self._live_mask(now)
+            free = np.flatnonzero(~live)
+            slot = int(free[0]) if free.size else int(np.argmin(self._created))
+            self._vectors[slot] = q
+            self._created[slot] = now
+            self._scopes[slot] = strategy_scope(strategy)
+            self._values[slot] = (draft_id, dict(post))
+
+    def discard(self, draft_id: int) -> None:
+        """Drop entries pointing at a draft (e.g. it was deleted)."""
+        with self._lock:
+            for i, value in enumerate(self._values):
+                if value is not None and value[0] == draft_id:
+                    self._values[i] = None
+                    self._created[i] = 0.0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._created[:] = 0.0
+            self._values = [None] * self.capacity
+
+
+_cache: SemanticCache | None = None
+
+
+def get_semantic_cache() -> SemanticCache:
+    """Process-wide semantic cache sized from settings."""
+    global _cache
+    if _cache is None:
+        _cache = SemanticCache(
+            capacity=settings.semantic_cache_max_entries,
+            ttl_seconds=settings.semantic_cache_ttl_seconds,
+            threshold=settings.semantic_cache_threshold,
+        )
+    return _cache
@@ -0,0 +1,389 @@
+"""
+Where stored files (generated images) live: local disk, or an S3-compatible bucket (AWS S3, MinIO, R2, ...)
+with a size-bounded local read-through cache. STORAGE_BACKEND selects the driver.
+
+All methods block (disk or network); call them via asyncio.to_thread. Keys are relative paths such as
+images/ab/cd/<sha256>.png (the value stored in post_drafts.image_path).
+"""
+import hashlib
+import hmac
+import os
+import threading
+import uuid
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path, PurePosixPath
+from typing import Iterator
+from urllib.parse import quote
+
+import httpx
+
+from app.config import settings
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Content-addressed objects never change, so caches may keep them forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def validate_key(key: str) -> str:
+    """Reject keys that could escape the storage root (absolute, backslashes, '..')."""
+    if not key or key.startswith("/") or "\\" in key or ".." in PurePosixPath(key).parts:
+        raise ValueError(f"Invalid storage key: {key!r}")
+    return key
+
+
+@dataclass
+class StoredObject:
+    key: str
+    size: int
+    mtime: float  # epoch seconds
+
+
+class StorageBackend:
+    """Driver interface."""
+
+    name = ""
+
+    def put_file(self, key: str, path: Path, content_type: str) -> None:
+        """Store the file at `path` under `key` unless the key already exists; `path` is consumed (moved or removed)."""
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def local_path(self, key: str) -> Path | None:
+        """A local file with the object's bytes (downloaded into the cache tier if needed), or None if missing."""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def list(self, prefix: str) -> Iterator[StoredObject]:
+        raise NotImplementedError
+
+    def url(self, key: str) -> str | None:
+        """A URL clients can fetch the object from directly (e.g. presigned), or None to serve it from the app."""
+        return None
+
+
+class LocalBackend(StorageBackend):
+    """Files under a local directory (single replica, or a shared volume)."""
+
+    name = "local"
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def _path(self, key: str) -> Path:
+        return self.root / validate_key(key)
+
+    def put_file(self, key: str, path: Path, content_type: str) -> None:
+        target = self._path(key)
+        if target.exists():
+            path.unlink(missing_ok=True)
+            os.utime(target)  # fresh mtime: the GC grace period covers the window until a draft references it
+            return
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(path, target)
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    def local_path(self, key: str) -> Path | None:
+        p = self._path(key)
+        return p if p.is_file() else None
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+    def list(self, prefix: str) -> Iterator[StoredObject]:
+        for dirpath, _, names in os.walk(self.root / prefix):
+            for name in names:
+                p = Path(dirpath) / name
+                try:
+                    st = p.stat()
+                except FileNotFoundError:
+                    continue
+                yield StoredObject(p.relative_to(self.root).as_posix(), st.st_size, st.st_mtime)
+
+
+class DiskCache:
+    """
+    Read-through cache tier for remote backends: files under `root`, evicted least recently used first
+    (access refreshes mtime) once the total exceeds max_bytes.
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total: int | None = None  # computed on first add
+
+    def _path(self, key: str) -> Path:
+        return self.root / validate_key(key)
+
+    def get(self, key: str) -> Path | None:
+        p = self._path(key)
+        try:
+            os.utime(p)
+        except FileNotFoundError:
+            return None
+        return p
+
+    def temp_path(self) -> Path:
+        d = self.root / ".tmp"
+        d.mkdir(parents=True, exist_ok=True)
+        return d / uuid.uuid4().hex
+
+    def add(self, key: str, path: Path) -> Path:
+        """Move `path` into the cache as `key` and evict if over budget."""
+        target = self._path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        size = path.stat().st_size
+        with self._lock:
+            try:
+                size -= target.stat().st_size  # same key again (content-addressed: same bytes)
+            except FileNotFoundError:
+                pass
+            os.replace(path, target)
+            if self._total is None:
+                self._total = sum(o.size for o in self._files())
+            else:
+                self._total += size
+            if self._total > self.max_bytes:
+                self._evict(keep=target)
+        return target
+
+    def discard(self, key: str) -> None:
+        p = self._path(key)
+        try:
+            size = p.stat().st_size
+            p.unlink()
+        except FileNotFoundError:
+            return
+        with self._lock:
+            if self._total is not None:
+                self._total -= size
+
+    def _files(self) -> list[StoredObject]:
+        out = []
+        for dirpath, dirnames, names in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d != ".tmp"]
+            for name in names:
+                p = Path(dirpath) / name
+                try:
+                    st = p.stat()
+                except FileNotFoundError:
+                    continue
+                out.append(StoredObject(str(p), st.st_size, st.st_mtime))
+        return out
+
+    def _evict(self, keep: Path) -> None:
+        """Drop oldest files until at 90% of budget (hysteresis, so a full cache doesn't rescan on every add)."""
+        files = sorted(self._files(), key=lambda o: o.mtime)
+        total = sum(o.size for o in files)
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for o in files:
+            if total <= target:
+                break
+            if o.key == str(keep):
+                continue
+            Path(o.key).unlink(missing_ok=True)
+            total -= o.size
+            evicted += 1
+        self._total = total
+        logger.info("storage_cache_evicted", files=evicted, bytes=total)
+
+
+class S3Backend(StorageBackend):
+    """
+    S3-compatible bucket over plain HTTPS with SigV4 signing (path-style addressing, so MinIO and other
+    S3-compatible servers work). Reads go through a local DiskCache; url() returns presigned GET URLs.
+    """
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: str,
+        region: str,
+        access_key_id: str,
+        secret_access_key: str,
+        prefix: str,
+        presign_seconds: int,
+        cache: DiskCache,
+    ):
+        self.bucket = bucket
+        self.endpoint = (endpoint_url or f"https://s3.{region}.amazonaws.com").rstrip("/")
+        self.region = region
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.presign_seconds = presign_seconds
+        self.cache = cache
+        self._client = httpx.Client(timeout=httpx.Timeout(30.0, connect=5.0))
+
+    # ----- SigV4 -----
+    def _object_path(self, key: str) -> str:
+        return "/" + quote(f"{self.bucket}/{self.prefix}{validate_key(key)}", safe="/-_.~")
+
+    def _signing_key(self, datestamp: str) -> bytes:
+        k = hmac.new(f"AWS4{self.secret_access_key}".encode(), datestamp.encode(), hashlib.sha256).digest()
+        for part in (self.region, "s3", "aws4_request"):
+            k = hmac.new(k, part.encode(), hashlib.sha256).digest()
+        return k
+
+    @staticmethod
+    def _canonical_query(params: dict[str, str]) -> str:
+        return "&".join(f"{quote(k, safe='-_.~')}={quote(v, safe='-_.~')}" for k, v in sorted(params.items()))
+
+    def _signature(self, method: str, path: str, query: str, headers: dict[str, str], payload_hash: str, now: datetime) -> tuple[str, str]:
+        """(signature, credential scope) for a canonical request; `headers` are the signed headers, lowercased."""
+        signed = ";".join(sorted(headers))
+        canonical = "\n".join([
+            method, path, query, "".join(f"{k}:{headers[k].strip()}\n" for k in sorted(headers)), signed, payload_hash,
+        ])
+        scope = f"{now:%Y%m%d}/{self.region}/s3/aws4_request"
+        to_sign = "\n".join(["AWS4-HMAC-SHA256", f"{now:%Y%m%dT%H%M%SZ}", scope, hashlib.sha256(canonical.encode()).hexdigest()])
+        return hmac.new(self._signing_key(f"{now:%Y%m%d}"), to_sign.encode(), hashlib.sha256).hexdigest(), scope
+
+    def _host(self) -> str:
+        url = httpx.URL(self.endpoint)
+        return f"{url.host}:{url.port}" if url.port else url.host
+
+    def _signed(self, method: str, path: str, params: dict[str, str] | None, headers: dict[str, str] | None) -> tuple[str, dict[str, str]]:
+        """(url, headers with Authorization) for a request; the payload is sent unsigned."""
+        now = datetime.now(timezone.utc)
+        query = self._canonical_query(params or {})
+        signed = {"host": self._host(), "x-amz-date": f"{now:%Y%m%dT%H%M%SZ}", "x-amz-content-sha256": "UNSIGNED-PAYLOAD"}
+        signed.update({k.lower(): v for k, v in (headers or {}).items() if k.lower().startswith("x-amz-")})
+        signature, scope = self._signature(method, path, query, signed, "UNSIGNED-PAYLOAD", now)
+        all_headers = {**(headers or {}), **signed}
+        all_headers["authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key_id}/{scope}, "
+            f"SignedHeaders={';'.join(sorted(signed))}, Signature={signature}"
+        )
+        del all_headers["host"]  # httpx sets the same value
+        return f"{self.endpoint}{path}" + (f"?{query}" if query else ""), all_headers
+
+    def _request(self, method: str, path: str, params: dict[str, str] | None = None, headers: dict[str, str] | None = None, **kwargs) -> httpx.Response:
+        url, all_headers = self._signed(method, path, params, headers)
+        return self._client.request(method, url, headers=all_headers, **kwargs)
+
+    def url(self, key: str) -> str | None:
+        now = datetime.now(timezone.utc)
+        path = self._object_path(key)
+        params = {
+            "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+            "X-Amz-Credential": f"{self.access_key_id}/{now:%Y%m%d}/{self.region}/s3/aws4_request",
+            "X-Amz-Date": f"{now:%Y%m%dT%H%M%SZ}",
+            "X-Amz-Expires": str(self.presign_seconds),
+            "X-Amz-SignedHeaders": "host",
+        }
+        query = self._canonical_query(params)
+        signature, _ = self._signature("GET", path, query, {"host": self._host()}, "UNSIGNED-PAYLOAD", now)
+        return f"{self.endpoint}{path}?{query}&X-Amz-Signature={signature}"
+
+    # ----- Operations -----
+    def exists(self, key: str) -> bool:
+        resp = self._request("HEAD", self._object_path(key))
+        if resp.status_code == 404:
+            return False
+        resp.raise_for_status()
+        return True
+
+    def put_file(self, key: str, path: Path, content_type: str) -> None:
+        if not self.exists(key):
+            size = path.stat().st_size
+            with path.open("rb") as f:
+                resp = self._request(
+                    "PUT",
+                    self._object_path(key),
+                    headers={"Content-Type": content_type, "Content-Length": str(size), "Cache-Control": IMMUTABLE_CACHE_CONTROL},
+                    content=f,
+                )
+            resp.raise_for_status()
+        # The bytes are local already: seed the cache instead of throwing them away
+        self.cache.add(key, path)
+
+    def local_path(self, key: str) -> Path | None:
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        tmp = self.cache.temp_path()
+        try:
+            url, headers = self._signed("GET", self._object_path(key), None, None)
+            with self._client.stream("GET", url, headers=headers) as resp:
+                if resp.status_code == 404:
+                    return None
+                resp.raise_for_status()
+                with tmp.open("wb") as f:
+                    for chunk in resp.iter_bytes(256 * 1024):
+                        f.write(chunk)
+            return self.cache.add(key, tmp)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    def delete(self, key: str) -> None:
+        resp = self._request("DELETE", self._object_path(key))
+        if resp.status_code != 404:
+            resp.raise_for_status()
+        self.cache.discard(key)
+
+    def list(self, prefix: str) -> Iterator[StoredObject]:
+        token = None
+        while True:
+            params = {"list-type": "2", "prefix": f"{self.prefix}{prefix}"}
+            if token:
+                params["continuation-token"] = token
+            resp = self._request("GET", f"/{quote(self.bucket, safe='-_.~')}", params=params)
+            resp.raise_for_status()
+            root = ET.fromstring(resp.content)
+            ns = root.tag[: root.tag.index("}") + 1] if root.tag.startswith("{") else ""
+            for item in root.iter(f"{ns}Contents"):
+                key = item.findtext(f"{ns}Key", "")[len(self.prefix):]
+                modified = datetime.fromisoformat(item.findtext(f"{ns}LastModified", "").replace("Z", "+00:00"))
+                yield StoredObject(key, int(item.findtext(f"{ns}Size", "0")), modified.timestamp())
+            if root.findtext(f"{ns}IsTruncated") != "true":
+                return
+            token = root.findtext(f"{ns}NextContinuationToken")
+
+
+_backend: StorageBackend | None = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> StorageBackend:
+    """The configured storage driver (process-wide)."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _create_backend()
+    return _backend
+
+
+def _create_backend() -> StorageBackend:
+    kind = settings.storage_backend.strip().lower()
+    if kind == "local":
+        return LocalBackend(settings.storage_dir)
+    if kind == "s3":
+        if not settings.s3_bucket:
+            raise ValueError("STORAGE_BACKEND=s3 requires S3_BUCKET")
+        cache_dir = Path(settings.storage_cache_dir) if settings.storage_cache_dir else settings.storage_dir / "cache"
+        return S3Backend(
+            bucket=settings.s3_bucket,
+            endpoint_url=settings.s3_endpoint_url,
+            region=settings.s3_region,
+            access_key_id=settings.s3_access_key_id,
+            secret_access_key=settings.s3_secret_access_key,
+            prefix=settings.s3_prefix,
+            presign_seconds=settings.s3_presign_seconds,
+            cache=DiskCache(cache_dir, settings.storage_cache_max_mb * 1024 * 1024),
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND {settings.storage_backend!r} (use local or s3)")
@@ -0,0 +1,179 @@
+"""
+Strategy selection by Thompson sampling. Each strategy dimension (post_type, tone, cta_type, hook_structure)
+is its own bandit: per option a Beta posterior over "a post with this option reaches the engagement target",
+kept per account and pooled over all accounts. Posteriors live in memory (rebuilt from post_history at startup,
+updated when metrics arrive), so a decision is a few random draws and no I/O.
+"""
+import random
+import threading
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.db_models import PostHistory, StrategyDecision
+from app.utils.helpers import safe_json_loads
+from app.utils.logging import get_logger
+from app.utils.metrics import STRATEGY_CHOICES
+
+logger = get_logger(__name__)
+
+# Options per dimension; the first is the default while nothing has been learned
+STRATEGY_OPTIONS: dict[str, tuple[str, ...]] = {
+    "post_type": ("founder_pov", "story", "data_driven", "how_to"),
+    "tone": ("conversational", "bold", "reflective"),
+    "cta_type": ("question", "opinion", "resource"),
+    "hook_structure": ("story_open", "question", "stat", "bold_claim"),
+}
+# post_history.hook_style (app.utils.post_features) -> hook_structure, for posts published without a strategy
+HOOK_STYLE_STRUCTURE = {"question": "question", "stat": "stat", "story": "story_open", "statement": "bold_claim"}
+
+# Pooled posterior (all accounts)
+_ALL = None
+# Metric children bound once per (dimension, option)
+_CHOICE_COUNTERS = {
+    (dim, option): STRATEGY_CHOICES.labels(dim, option) for dim, options in STRATEGY_OPTIONS.items() for option in options
+}
+
+
+def engagement_reward(engagement_rate: float | None, target: float) -> float | None:
+    """Fractional Bernoulli reward in [0, 1]: 1.0 at or above the target engagement rate."""
+    if engagement_rate is None or target <= 0:
+        return None
+    return min(1.0, max(0.0, engagement_rate / target))
+
+
+def history_arms(strategy: dict[str, Any] | None, hook_style: str | None) -> dict[str, str]:
+    """Options a published post used: its strategy if it came from a draft, else the hook structure it shows."""
+    arms = {dim: strategy[dim] for dim in STRATEGY_OPTIONS if strategy and strategy.get(dim) in STRATEGY_OPTIONS[dim]}
+    if "hook_structure" not in arms and hook_style in HOOK_STYLE_STRUCTURE:
+        arms["hook_structure"] = HOOK_STYLE_STRUCTURE[hook_style]
+    return arms
+
+
+class StrategyBandit:
+    """Beta(1 + successes, 1 + failures) per (dimension, option), per account and pooled."""
+
+    def __init__(self, target_rate: float, min_account_posts: int, hint_weight: float):
+        self.target_rate = target_rate
+        self.min_account_posts = min_account_posts
+        self.hint_weight = hint_weight
+        # account id (None = pooled) -> (dimension, option) -> [successes, failures]
+        self._stats: dict[int | None, dict[tuple[str, str], list[float]]] = {}
+        self._posts: dict[int | None, float] = {}  # observations per account
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._posts.clear()
+
+    def observe(self, account_id: int | None, arms: dict[str, str], reward: float, weight: float = 1.0) -> None:
+        """Credit one post's reward to the options it used; weight=-1 takes an earlier observation back."""
+        if not arms:
+            return
+        with self._lock:
+            for key in {account_id, _ALL}:
+                stats = self._stats.setdefault(key, {})
+                for dim, option in arms.items():
+                    s = stats.setdefault((dim, option), [0.0, 0.0])
+                    s[0] = max(0.0, s[0] + weight * reward)
+                    s[1] = max(0.0, s[1] + weight * (1.0 - reward))
+                self._posts[key] = max(0.0, self._posts.get(key, 0.0) + weight)
+
+    def observe_metrics(
+        self, account_id: int | None, arms: dict[str, str], old_rate: float | None, new_rate: float | None
+    ) -> None:
+        """Replace a post's previous engagement (if it had one) with the new figure."""
+        old = engagement_reward(old_rate, self.target_rate)
+        if old is not None:
+            self.observe(account_id, arms, old, weight=-1.0)
+        new = engagement_reward(new_rate, self.target_rate)
+        if new is not None:
+            self.observe(account_id, arms, new)
+
+    def _posterior(self, account_id: int | None) -> dict[tuple[str, str], list[float]]:
+        """The account's own posterior once it has enough posts, else the pooled one (copied under the lock)."""
+        with self._lock:
+            key = account_id if self._posts.get(account_id, 0.0) >= self.min_account_posts else _ALL
+            return {arm: list(s) for arm, s in self._stats.get(key, {}).items()}
+
+    def choose(
+        self, account_id: int | None, hints: dict[str, str] | None = None, explore: bool = True
+    ) -> dict[str, str]:
+        """
+        One option per dimension: the highest draw from each posterior (explore) or the highest posterior mean.
+        `hints` (options the request asks for explicitly) start with hint_weight extra successes.
+        """
+        stats = self._posterior(account_id)
+        hints = hints or {}
+        choice: dict[str, str] = {}
+        for dim, options in STRATEGY_OPTIONS.items():
+            best, best_value = options[0], -1.0
+            for option in options:
+                wins, losses = stats.get((dim, option), (0.0, 0.0))
+                alpha = 1.0 + wins + (self.hint_weight if hints.get(dim) == option else 0.0)
+                beta = 1.0 + losses
+                value = random.betavariate(alpha, beta) if explore else alpha / (alpha + beta)
+                if value > best_value:
+                    best, best_value = option, value
+            choice[dim] = best
+            _CHOICE_COUNTERS[dim, best].inc()
+        return choice
+
+    def summary(self, account_id: int | None = None) -> dict[str, Any]:
+        """Posterior mean and evidence (posts) per option, for inspection."""
+        with self._lock:
+            stats = {arm: tuple(s) for arm, s in self._stats.get(account_id, {}).items()}
+            posts = self._posts.get(account_id, 0.0)
+
+        def arm(dim: str, option: str) -> dict[str, float]:
+            wins, losses = stats.get((dim, option), (0.0, 0.0))
+            return {"posts": round(wins + losses, 3), "mean": round((1.0 + wins) / (2.0 + wins + losses), 4)}
+
+        return {
+            "account_id": account_id,
+            "posts": round(posts, 3),
+            "uses_own_posterior": account_id is None or posts >= self.min_account_posts,
+            "dimensions": {dim: {o: arm(dim, o) for o in options} for dim, options in STRATEGY_OPTIONS.items()},
+        }
+
+
+_bandit: StrategyBandit | None = None
+_bandit_lock = threading.Lock()
+
+
+def get_strategy_bandit() -> StrategyBandit:
+    """Process-wide strategy bandit."""
+    global _bandit
+    if _bandit is None:
+        with _bandit_lock:
+            if _bandit is None:
+                _bandit = StrategyBandit(
+                    target_rate=settings.strategy_target_engagement_rate,
+                    min_account_posts=settings.strategy_min_account_posts,
+                    hint_weight=settings.strategy_hint_weight,
+                )
+    return _bandit
+
+
+async def rebuild_strategy_bandit(session: AsyncSession) -> int:
+    """Load every post with engagement metrics into the posteriors. Returns posts observed."""
+    bandit = get_strategy_bandit()
+    bandit.clear()
+    result = await session.stream(
+        select(PostHistory.account_id, PostHistory.engagement_rate, PostHistory.hook_style, StrategyDecision.payload)
+        .outerjoin(StrategyDecision, PostHistory.strategy_id == StrategyDecision.id)
+        .where(PostHistory.engagement_rate.is_not(None))
+        .execution_options(yield_per=1000)
+    )
+    observed = 0
+    async for account_id, rate, hook_style, payload in result:
+        arms = history_arms(safe_json_loads(payload), hook_style)
+        reward = engagement_reward(rate, bandit.target_rate)
+        if arms and reward is not None:
+            bandit.observe(account_id, arms, reward)
+            observed += 1
+    logger.info("strategy_bandit_rebuilt", posts=observed)
+    return observed
@@ -0,0 +1,94 @@
+"""
+Cheap local ranking of post variants: hook length, hook style (weighted by how that style performed in
+post_history) and similarity to the best-performing published posts. No model calls.
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.db_models import PostHistory
+from app.services.semantic_cache import EMBED_DIM, embed
+from app.utils.post_features import HOOK_STYLES, classify_hook
+
+# Hooks are cut at "...see more" after ~2 lines; within this many characters scores full marks
+HOOK_CHARS_IDEAL = (60, 140)
+HOOK_CHARS_MAX = 300
+TOP_POSTS = 20
+WEIGHTS = {"hook_length": 0.3, "hook_style": 0.3, "similarity": 0.4}
+# Style prior until history has engagement per hook style
+DEFAULT_STYLE_LIFT = {"question": 1.0, "stat": 1.0, "story": 0.8, "emoji": 0.6, "statement": 0.6}
+
+
+@dataclass
+class RankingReference:
+    """What the ranking learns from history: per-style lift (0-1) and the centroid of top posts."""
+
+    style_lift: dict[str, float] = field(default_factory=lambda: dict(DEFAULT_STYLE_LIFT))
+    centroid: np.ndarray | None = None  # engagement-weighted, L2-normalized; None without history
+
+
+async def load_reference(session: AsyncSession) -> RankingReference:
+    """Two small queries: mean engagement per hook style and the top posts by engagement rate."""
+    ref = RankingReference()
+    rows = (
+        await session.execute(
+            select(PostHistory.hook_style, func.avg(PostHistory.engagement_rate))
+            .where(PostHistory.hook_style.is_not(None), PostHistory.engagement_rate.is_not(None))
+            .group_by(PostHistory.hook_style)
+        )
+    ).all()
+    means = {style: float(mean or 0.0) for style, mean in rows if style in HOOK_STYLES}
+    best = max(means.values(), default=0.0)
+    if best > 0:
+        ref.style_lift = {s: means.get(s, 0.0) / best for s in HOOK_STYLES}
+
+    top = (
+        await session.execute(
+            select(PostHistory.content_text, PostHistory.engagement_rate)
+            .where(PostHistory.engagement_rate > 0)
+            .order_by(PostHistory.engagement_rate.desc())
+            .limit(TOP_POSTS)
+        )
+    ).all()
+    if top:
+        centroid = np.zeros(EMBED_DIM, dtype=np.float32)
+        for text, rate in top:
+            centroid += embed(text or "") * float(rate)
+        norm = float(np.linalg.norm(centroid))
+        ref.centroid = centroid / norm if norm else None
+    return ref
+
+
+def _hook_length_score(hook: str) -> float:
+    n = len(hook.strip())
+    lo, hi = HOOK_CHARS_IDEAL
+    if lo <= n <= hi:
+        return 1.0
+    if n < lo:
+        return n / lo
+    return max(0.0, 1.0 - (n - hi) / (HOOK_CHARS_MAX - hi))
+
+
+def score_variant(post: dict[str, str], ref: RankingReference) -> dict[str, float]:
+    """Component scores (0-1) and their weighted total under "score"."""
+    hook = post.get("hook") or ""
+    parts = {
+        "hook_length": _hook_length_score(hook),
+        "hook_style": ref.style_lift.get(classify_hook(hook), 0.0),
+    }
+    weights = dict(WEIGHTS)
+    if ref.centroid is not None:
+        text = f"{hook}\n{post.get('body') or ''}"
+        parts["similarity"] = max(0.0, float(embed(text) @ ref.centroid))
+    else:
+        weights.pop("similarity")
+    total = sum(weights.values())
+    parts["score"] = round(sum(parts[k] * w for k, w in weights.items()) / total, 4)
+    return parts
+
+
+def rank_scores(posts: list[dict[str, str]], ref: RankingReference) -> list[float]:
+    """Score of each post, in input order."""
+    return [score_variant(p, ref)["score"] for p in posts]
@@ -0,0 +1,55 @@
+"""The server's event loop, for background jobs that start in other threads (APScheduler).
+
+Jobs run their coroutines on this loop rather than on a loop of their own, so they share the app's DB
+engine and HTTP clients: asyncpg and httpx connections belong to the loop that opened them.
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, TypeVar
+
+T = TypeVar("T")
+
+_loop: asyncio.AbstractEventLoop | None = None
+_pending: set[Future] = set()  # jobs waiting on the loop
+_pending_lock = threading.Lock()
+
+
+def set_app_loop(loop: asyncio.AbstractEventLoop | None) -> None:
+    """Register the server loop (app startup); None on shutdown, which cancels jobs still running on it."""
+    global _loop
+    _loop = loop
+    if loop is None:
+        with _pending_lock:
+            pending = list(_pending)
+        for future in pending:  # their threads would otherwise wait on a loop that is about to stop
+            future.cancel()
+
+
+def on_app_loop() -> bool:
+    """Whether the calling coroutine runs on the server loop."""
+    try:
+        return asyncio.get_running_loop() is _loop
+    except RuntimeError:
+        return False
+
+
+def run_on_app_loop(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Run `coro` on the server loop and wait for its result; call from a worker thread, never from the loop.
+    Without a running server (scripts, after shutdown) it runs on a fresh loop instead.
+    """
+    loop = _loop
+    if loop is None or loop.is_closed() or not loop.is_running():
+        return asyncio.run(coro)
+    if on_app_loop():
+        coro.close()
+        raise RuntimeError("run_on_app_loop called from the app loop; await the coroutine instead")
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    with _pending_lock:
+        _pending.add(future)
+    try:
+        return future.result()
+    finally:
+        with _pending_lock:
+            _pending.discard(future)
@@ -0,0 +1,100 @@
+"""
+Open-file cache for served images (in the spirit of nginx open_file_cache): stat results, validators and, for
+small files, the bytes themselves, so hot images are served without touching the disk or a worker thread.
+Entries are revalidated with a fresh stat after `valid_seconds`.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from email.utils import formatdate
+from pathlib import Path
+
+from app.utils.metrics import IMAGE_FILE_CACHE_BYTES, IMAGE_FILE_CACHE_REQUESTS
+
+
+@dataclass(frozen=True)
+class CachedFile:
+    path: Path
+    size: int
+    mtime_ns: int
+    etag: str
+    last_modified: str
+    body: bytes | None  # None: too large to keep in memory, stream from path
+    checked_at: float  # monotonic time of the last stat
+
+
+def _etag(path: Path, size: int, mtime_ns: int) -> str:
+    stem = path.stem
+    if len(stem) == 64 and all(c in "0123456789abcdef" for c in stem):
+        return f'"{stem}"'  # content-addressed: the name is the content hash
+    return '"' + hashlib.md5(f"{path}:{size}:{mtime_ns}".encode(), usedforsecurity=False).hexdigest() + '"'
+
+
+class OpenFileCache:
+    """LRU of CachedFile by key; bodies count against max_body_bytes. Thread-safe (loads run in worker threads)."""
+
+    def __init__(self, max_entries: int, max_body_bytes: int, max_file_bytes: int, valid_seconds: float):
+        self.max_entries = max_entries
+        self.max_body_bytes = max_body_bytes
+        self.max_file_bytes = max_file_bytes
+        self.valid_seconds = valid_seconds
+        self._entries: "OrderedDict[str, CachedFile]" = OrderedDict()
+        self._body_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> CachedFile | None:
+        """The entry if it was validated within valid_seconds (no filesystem access)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry.checked_at > self.valid_seconds:
+                IMAGE_FILE_CACHE_REQUESTS.labels("miss").inc()
+                return None
+            self._entries.move_to_end(key)
+        IMAGE_FILE_CACHE_REQUESTS.labels("hit").inc()
+        return entry
+
+    def load(self, key: str, path: Path) -> CachedFile:
+        """Stat (and, if small, read) `path` and cache it under `key` (blocking; run in a thread). Raises OSError."""
+        st = os.stat(path)
+        with self._lock:
+            old = self._entries.get(key)
+        if old is not None and old.path == path and (old.size, old.mtime_ns) == (st.st_size, st.st_mtime_ns):
+            body = old.body  # unchanged: keep the bytes already read
+        elif 0 < st.st_size <= self.max_file_bytes and st.st_size <= self.max_body_bytes:
+            body = path.read_bytes()
+            if len(body) != st.st_size:  # replaced while reading; serve from disk this time
+                body = None
+        else:
+            body = None
+        entry = CachedFile(
+            path=path,
+            size=st.st_size,
+            mtime_ns=st.st_mtime_ns,
+            etag=_etag(path, st.st_size, st.st_mtime_ns),
+            last_modified=formatdate(st.st_mtime, usegmt=True),
+            body=body,
+            checked_at=time.monotonic(),
+        )
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = entry
+            self._body_bytes += len(body or b"")
+            while self._entries and (len(self._entries) > self.max_entries or self._body_bytes > self.max_body_bytes):
+                self._drop(next(iter(self._entries)))
+            IMAGE_FILE_CACHE_BYTES.labels().set(self._body_bytes)
+        return entry
+
+    def invalidate(self, key: str | None = None) -> None:
+        """Drop one entry, or all of them."""
+        with self._lock:
+            for k in [key] if key is not None else list(self._entries):
+                self._drop(k)
+            IMAGE_FILE_CACHE_BYTES.labels().set(self._body_bytes)
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._body_bytes -= len(entry.body or b"")
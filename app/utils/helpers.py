@@ -22,3 +22,4 @@ def safe_json_dumps(obj: dict | None) -> str | None:
         return json.dumps(obj)
     except (TypeError, ValueError):
         return None
+
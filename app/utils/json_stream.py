@@ -0,0 +1,117 @@
+"""
+Tolerant incremental parser for a flat JSON object, as returned by an LLM: text before the first '{' (prose,
+``` fences) is skipped, and fields are available as soon as their value is complete, so output that is cut off
+mid-stream still yields every finished field.
+"""
+import json
+
+_SEEK_OBJECT, _SEEK_KEY, _IN_KEY, _SEEK_COLON, _SEEK_VALUE, _IN_STRING, _IN_RAW, _AFTER_VALUE, _DONE = range(9)
+
+
+def _decode_string(raw: str) -> str:
+    try:
+        return json.loads(f'"{raw}"', strict=False)  # strict=False: models emit literal newlines in strings
+    except json.JSONDecodeError:
+        return raw
+
+
+def _decode_raw(raw: str) -> str | None:
+    """Non-string value as text: arrays are joined with spaces (e.g. hashtags as a list), null dropped."""
+    try:
+        value = json.loads(raw)
+    except json.JSONDecodeError:
+        return None
+    if value is None:
+        return None
+    if isinstance(value, list):
+        return " ".join(str(v) for v in value)
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+class ObjectFieldParser:
+    """Feed text chunks with feed(); `fields` maps each completed key to its value as a string."""
+
+    def __init__(self) -> None:
+        self.fields: dict[str, str] = {}
+        self._state = _SEEK_OBJECT
+        self._buf: list[str] = []
+        self._key = ""
+        self._escape = False
+        self._depth = 0  # nesting inside a non-string value
+        self._raw_in_string = False
+
+    @property
+    def done(self) -> bool:
+        """True once the object's closing brace was seen."""
+        return self._state == _DONE
+
+    def feed(self, chunk: str) -> None:
+        for ch in chunk:
+            if self._state == _DONE:
+                return
+            self._step(ch)
+
+    def _step(self, ch: str) -> None:
+        state = self._state
+        if state == _SEEK_OBJECT:
+            if ch == "{":
+                self._state = _SEEK_KEY
+        elif state in (_SEEK_KEY, _AFTER_VALUE):
+            if ch == '"' and state == _SEEK_KEY:
+                self._buf, self._state = [], _IN_KEY
+            elif ch == ",":
+                self._state = _SEEK_KEY
+            elif ch == "}":
+                self._state = _DONE
+        elif state in (_IN_KEY, _IN_STRING):
+            if self._escape:
+                self._buf.append(ch)
+                self._escape = False
+            elif ch == "\\":
+                self._buf.append(ch)
+                self._escape = True
+            elif ch == '"':
+                text = _decode_string("".join(self._buf))
+                if state == _IN_KEY:
+                    self._key, self._state = text, _SEEK_COLON
+                else:
+                    self.fields[self._key] = text
+                    self._state = _AFTER_VALUE
+            else:
+                self._buf.append(ch)
+        elif state == _SEEK_COLON:
+            if ch == ":":
+                self._state = _SEEK_VALUE
+        elif state == _SEEK_VALUE:
+            if ch == '"':
+                self._buf, self._state = [], _IN_STRING
+            elif not ch.isspace():
+                self._buf, self._state = [ch], _IN_RAW
+                self._depth = 1 if ch in "[{" else 0
+                self._raw_in_string = False
+        elif state == _IN_RAW:
+            self._step_raw(ch)
+
+    def _step_raw(self, ch: str) -> None:
+        if self._raw_in_string:
+            self._buf.append(ch)
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._raw_in_string = False
+            return
+        if self._depth == 0 and ch in ",}":
+            value = _decode_raw("".join(self._buf).strip())
+            if value is not None:
+                self.fields[self._key] = value
+            self._state = _SEEK_KEY if ch == "," else _DONE
+            return
+        self._buf.append(ch)
+        if ch == '"':
+            self._raw_in_string = True
+        elif ch in "[{":
+            self._depth += 1
+        elif ch in "]}":
+            self._depth -= 1
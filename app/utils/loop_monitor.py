@@ -0,0 +1,141 @@
+"""Event-loop stall detector: heartbeat coroutine measures lag, watchdog thread attributes stalls.
+
+The heartbeat sleeps `interval` and records how late it woke up (event_loop_lag_seconds). A watchdog
+thread notices when the heartbeat is overdue by more than the threshold and, while the loop is still
+blocked, captures the loop thread's stack and the asyncio task running on it. When the loop recovers,
+the stall is logged once (event_loop_stall) with its duration, task and stack, and counted in
+event_loop_stalls_total{task}. A stall caught while the loop sits in select is reported as
+task "<gil-wait>": the loop was ready but another thread held the GIL.
+"""
+import asyncio
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any
+
+from app.config import settings
+from app.utils.logging import get_logger
+from app.utils.metrics import EVENT_LOOP_LAG, EVENT_LOOP_STALLS
+from app.utils.profiler import collapse_frame, is_idle_frame
+
+logger = get_logger(__name__)
+
+STACK_LOG_FRAMES = 12  # innermost frames included in the log event
+
+
+def _task_name(task: asyncio.Task | None) -> str:
+    """'coroutine qualname' of the task holding the loop, or '<callback>' for plain loop callbacks."""
+    if task is None:
+        return "<callback>"
+    coro = task.get_coro()
+    return getattr(coro, "__qualname__", None) or task.get_name()
+
+
+class LoopMonitor:
+    """Watches one running event loop. start()/stop() must be called from the loop thread."""
+
+    def __init__(self, interval: float, threshold: float):
+        self.interval = interval
+        self.threshold = threshold
+        self.stalls: deque[dict[str, Any]] = deque(maxlen=100)  # most recent stalls, for checks/debugging
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id = 0
+        self._last_beat = 0.0
+        self._captured: tuple[float, str, str] | None = None  # (beat it belongs to, task, stack)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._task = self._loop.create_task(self._heartbeat(), name="loop-monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1.0)
+
+    async def _heartbeat(self) -> None:
+        lag_child = EVENT_LOOP_LAG.labels()
+        while True:
+            due = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - due)
+            lag_child.observe(lag)
+            with self._lock:
+                beat, self._last_beat = self._last_beat, now
+                captured, self._captured = self._captured, None
+            if lag >= self.threshold:
+                self._report(lag, captured if captured and captured[0] == beat else None)
+
+    def _watch(self) -> None:
+        # Check a few times per threshold so the stack is taken while the loop is still blocked
+        poll = max(0.005, self.threshold / 4)
+        while not self._stop.wait(poll):
+            with self._lock:
+                beat = self._last_beat
+                if self._captured is not None and self._captured[0] == beat:
+                    continue
+            if time.monotonic() - beat < self.interval + self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = collapse_frame(frame)
+            # Private but stable since 3.7: the task currently stepping on each loop
+            current = getattr(asyncio.tasks, "_current_tasks", {}).get(self._loop)
+            if current is None and is_idle_frame(frame):
+                # Loop is parked in select yet late: another thread is holding the GIL (e.g. a cold import)
+                task = "<gil-wait>"
+            else:
+                task = _task_name(current)
+            del frame
+            with self._lock:
+                if self._last_beat == beat:
+                    self._captured = (beat, task, stack)
+
+    def _report(self, lag: float, captured: tuple[float, str, str] | None) -> None:
+        task = captured[1] if captured else "<unknown>"
+        stack = captured[2] if captured else ""
+        EVENT_LOOP_STALLS.labels(task).inc()
+        stall = {"lag_ms": round(lag * 1000, 1), "task": task, "stack": stack}
+        self.stalls.append(stall)
+        logger.warning(
+            "event_loop_stall",
+            lag_ms=stall["lag_ms"],
+            task=task,
+            stack=stack.split(";")[-STACK_LOG_FRAMES:] if stack else None,
+        )
+
+
+_monitor: LoopMonitor | None = None
+
+
+def start_loop_monitor() -> LoopMonitor | None:
+    """Start watching the running loop (no-op if disabled or already running)."""
+    global _monitor
+    if not settings.loop_monitor_enabled or _monitor is not None:
+        return _monitor
+    _monitor = LoopMonitor(settings.loop_monitor_interval_ms / 1000, settings.loop_stall_threshold_ms / 1000)
+    _monitor.start()
+    return _monitor
+
+
+def stop_loop_monitor() -> None:
+    global _monitor
+    if _monitor is not None:
+        _monitor.stop()
+        _monitor = None
+
+
+def get_loop_monitor() -> LoopMonitor | None:
+    return _monitor
@@ -0,0 +1,310 @@
+"""In-process Prometheus-style metrics (text exposition format) with pre-bound label sets.
+
+Hot paths hold on to the child returned by `.labels(...)` (created once per label set) so an
+observation is a bisect plus two in-place adds: no dict building, no per-call allocation.
+"""
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+# Latency buckets in seconds: covers sub-ms DB waits up to slow LLM/image calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("value", "fn")
+
+    def __init__(self):
+        self.value = 0.0
+        self.fn: Callable[[], float] | None = None
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set_function(self, fn: Callable[[], float]) -> None:
+        """Compute the value at scrape time instead of on the hot path."""
+        self.fn = fn
+
+    def get(self) -> float:
+        if self.fn is not None:
+            try:
+                return float(self.fn())
+            except Exception:
+                return float("nan")
+        return self.value
+
+
+class _HistogramChild:
+    __slots__ = ("upper", "counts", "sum")
+
+    def __init__(self, upper: tuple[float, ...]):
+        self.upper = upper
+        self.counts = [0] * (len(upper) + 1)  # last slot = +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.upper, value)] += 1
+        self.sum += value
+
+    def time(self) -> "_Timer":
+        """Context manager observing elapsed seconds."""
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("child", "start")
+
+    def __init__(self, child: _HistogramChild):
+        self.child = child
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.child.observe(time.perf_counter() - self.start)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], object] = {}
+        REGISTRY.append(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """Child for this label set, created on first use. Keep the reference on hot paths."""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self._children.items()):
+            lines.extend(self._render_child(key, child))
+        return lines
+
+    def _render_child(self, key: tuple[str, ...], child) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def _render_child(self, key, child):
+        return [f"{self.name}{_fmt_labels(self.labelnames, key)} {_fmt_value(child.value)}"]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def _render_child(self, key, child):
+        return [f"{self.name}{_fmt_labels(self.labelnames, key)} {_fmt_value(child.get())}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _render_child(self, key, child):
+        lines = []
+        cumulative = 0
+        counts = list(child.counts)
+        for le, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le_label = 'le="' + _fmt_value(le) + '"'
+            lines.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, key, le_label)} {cumulative}")
+        lines.append(f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {_fmt_value(child.sum)}")
+        lines.append(f"{self.name}_count{_fmt_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+REGISTRY: list[_Metric] = []
+
+
+def render_metrics() -> str:
+    """All registered metrics in Prometheus text exposition format (0.0.4)."""
+    lines: list[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ----- Application metrics -----
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status")
+)
+GRAPH_NODE_DURATION = Histogram(
+    "graph_node_duration_seconds", "Duration of each post-generation LangGraph node.", ("node",)
+)
+GEMINI_REQUEST_DURATION = Histogram(
+    "gemini_request_duration_seconds", "Gemini API call latency.", ("model", "operation")
+)
+GEMINI_ERRORS = Counter("gemini_errors_total", "Failed Gemini API calls.", ("model", "operation"))
+GEMINI_TOKENS = Counter(
+    "gemini_tokens_total",
+    "Gemini tokens from usage metadata: input (billed at full rate) | cached_input (served from a context cache) | output.",
+    ("model", "kind"),
+)
+GEMINI_PREFIX_DURATION = Histogram(
+    "gemini_prefixed_call_duration_seconds",
+    "Post text call latency by how the static prompt prefix was sent (context_cache | system_instruction).",
+    ("model", "prefix"),
+)
+GEMINI_CONTEXT_CACHE_EVENTS = Counter(
+    "gemini_context_cache_events_total",
+    "Context cache lookups and lifecycle: hit | created | refreshed | unavailable.",
+    ("model", "event"),
+)
+GEMINI_STRUCTURED_OUTPUTS = Counter(
+    "gemini_structured_outputs_total",
+    "Structured (JSON schema) generations by outcome: ok | repaired (missing fields re-requested) | incomplete "
+    "(optional fields left empty) | failed.",
+    ("model", "outcome"),
+)
+GEMINI_HEDGED_REQUESTS = Counter(
+    "gemini_hedged_requests_total",
+    "Calls that raced a hedge request to the next model, by which attempt won (primary | hedge).",
+    ("operation", "winner"),
+)
+GEMINI_FALLBACKS = Counter(
+    "gemini_fallbacks_total", "Attempts sent to a model further down the chain (hedge or after a failure).", ("operation", "model")
+)
+GEMINI_CIRCUIT_OPEN = Gauge("gemini_circuit_open", "1 while the model's circuit breaker is open.", ("model",))
+GEMINI_MODEL_ERROR_RATE = Gauge("gemini_model_error_rate", "Moving average of the model's call failure rate.", ("model",))
+STRATEGY_CHOICES = Counter(
+    "strategy_choices_total", "Strategy options chosen by the bandit, per dimension.", ("dimension", "option")
+)
+LLM_COST_USD = Counter("llm_cost_usd_total", "Estimated Gemini spend in USD (llm_usage price table).", ("model",))
+LLM_USAGE_DROPPED = Counter("llm_usage_dropped_total", "Usage records dropped because the write buffer was full.")
+LLM_BUDGET_ACTIONS = Counter(
+    "llm_budget_actions_total", "Requests over an account's daily Gemini budget, by action (downgrade | block).", ("action",)
+)
+LINKEDIN_REQUEST_DURATION = Histogram(
+    "linkedin_request_duration_seconds", "LinkedIn API call latency.", ("endpoint",)
+)
+LINKEDIN_RESPONSES = Counter(
+    "linkedin_responses_total", "LinkedIn API responses by status code (0 = transport error).", ("endpoint", "status")
+)
+LINKEDIN_TOKEN_REFRESHES = Counter(
+    "linkedin_token_refreshes_total", "LinkedIn OAuth token refreshes by result (ok | failed).", ("result",)
+)
+ACCOUNT_CACHE_REQUESTS = Counter(
+    "account_cache_requests_total", "Account/token cache lookups by result (hit | miss).", ("result",)
+)
+IMAGE_STORAGE_BYTES = Gauge("image_storage_bytes", "Bytes of images referenced by drafts (as of the last GC pass).")
+IMAGE_GC_RECLAIMED_BYTES = Counter("image_gc_reclaimed_bytes_total", "Bytes freed by the image garbage collector.")
+IMAGE_FILE_CACHE_REQUESTS = Counter(
+    "image_file_cache_requests_total", "Served-image metadata/body cache lookups by result (hit | miss).", ("result",)
+)
+IMAGE_FILE_CACHE_BYTES = Gauge("image_file_cache_bytes", "Image bytes held in memory by the served-image cache.")
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled DB connection.",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "SQL statement execution time (cursor execute to result).",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+SCHEDULER_QUEUE_DEPTH = Gauge("scheduler_queue_depth", "Jobs waiting in the APScheduler queue.")
+THREADPOOL_QUEUE_DEPTH = Gauge("threadpool_queue_depth", "Work items waiting for a thread in the asyncio default executor.")
+THREADPOOL_MAX_WORKERS = Gauge("threadpool_max_workers", "Size of the asyncio default executor (asyncio.to_thread).")
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "Delay between when the loop heartbeat was due and when it ran.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+EVENT_LOOP_STALLS = Counter(
+    "event_loop_stalls_total", "Event loop stalls over the threshold, by the task that held the loop.", ("task",)
+)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording http_request_duration_seconds per route template."""
+
+    def __init__(self, app):
+        self.app = app
+        # (method, route, status) -> child; grows only with the app's fixed route table
+        self._children: dict[tuple[str, str, int], _HistogramChild] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status_holder = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            path = getattr(scope.get("route"), "path", None)
+            if path is None:
+                # Mounts (e.g. /static) set root_path instead of route; anything else is a 404
+                path = f"{scope['root_path']}/*" if scope.get("root_path") else "<unmatched>"
+            key = (scope["method"], path, status_holder[0])
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = HTTP_REQUEST_DURATION.labels(*key)
+            child.observe(time.perf_counter() - start)
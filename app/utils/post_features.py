@@ -0,0 +1,52 @@
+"""Cheap text features for published posts, stored on PostHistory so analytics can aggregate in SQL."""
+import re
+from typing import Any
+
+_HASHTAG_RE = re.compile(r"#\w+")
+_NUMBER_RE = re.compile(r"\d")
+# Common emoji blocks (symbols, pictographs, dingbats, flags); good enough for hook classification
+_EMOJI_RE = re.compile(
+    "[\U0001F300-\U0001FAFF\U00002600-\U000027BF\U0001F1E6-\U0001F1FF\U00002B00-\U00002BFF]"
+)
+_STORY_OPEN_RE = re.compile(
+    r"^(i|i'm|i've|we|my|our|when|last|yesterday|today|years? ago|\d+ years? ago)\b",
+    re.IGNORECASE,
+)
+
+# Hook lines = first N non-empty lines (matches the "strong 2-line hook" rule in the prompt)
+HOOK_LINES = 2
+
+HOOK_STYLES = ("question", "stat", "story", "emoji", "statement")
+
+
+def classify_hook(hook: str) -> str:
+    """Return hook style: question | stat | story | emoji | statement (first match wins)."""
+    if "?" in hook:
+        return "question"
+    if _NUMBER_RE.search(hook):
+        return "stat"
+    if _STORY_OPEN_RE.match(hook.strip()):
+        return "story"
+    if _EMOJI_RE.search(hook):
+        return "emoji"
+    return "statement"
+
+
+def extract_post_features(text: str | None) -> dict[str, Any]:
+    """
+    Compute PostHistory feature columns from the published text.
+    Returns kwargs for PostHistory: word_count, line_count, hashtag_count,
+    hook_has_question, hook_has_number, hook_has_emoji, hook_style.
+    """
+    text = text or ""
+    lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
+    hook = "\n".join(lines[:HOOK_LINES])
+    return {
+        "word_count": len(text.split()),
+        "line_count": len(lines),
+        "hashtag_count": len(_HASHTAG_RE.findall(text)),
+        "hook_has_question": "?" in hook,
+        "hook_has_number": bool(_NUMBER_RE.search(hook)),
+        "hook_has_emoji": bool(_EMOJI_RE.search(hook)),
+        "hook_style": classify_hook(hook),
+    }
@@ -0,0 +1,231 @@
+"""Sampling profiler: collapsed stacks (flamegraph.pl / speedscope format) from sys._current_frames().
+
+Two uses:
+- on-demand: `sample(seconds)` polls thread stacks from a helper thread and returns collapsed stacks
+- slow requests: a continuous sampler keeps a rolling window of event-loop stacks; when a request
+  exceeds the threshold, ProfilingMiddleware cuts the window to the request's time span and saves it
+
+Profiles are written to a ring buffer under <storage>/profiles (oldest deleted first).
+"""
+import asyncio
+import os
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from pathlib import Path
+from types import FrameType
+
+from app.config import settings
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+MAX_STACK_DEPTH = 128
+# Top frames meaning "thread is blocked waiting", excluded in cpu mode
+_IDLE_FRAMES = frozenset({
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("socket.py", "accept"),
+    ("socket.py", "readinto"),
+})
+
+_PROJECT_ROOT = str(Path(__file__).resolve().parent.parent.parent) + os.sep
+_STDLIB = sysconfig.get_paths()["stdlib"] + os.sep
+_label_cache: dict[object, str] = {}
+
+
+def _frame_label(code) -> str:
+    """'func (path:firstline)'; path relative to the project, site-packages or stdlib. Cached per code object."""
+    label = _label_cache.get(code)
+    if label is None:
+        path = code.co_filename
+        if path.startswith(_PROJECT_ROOT):
+            path = path[len(_PROJECT_ROOT):]
+        elif "site-packages" + os.sep in path:
+            path = path.split("site-packages" + os.sep, 1)[1]
+        elif path.startswith(_STDLIB):
+            path = path[len(_STDLIB):]
+        label = f"{code.co_name} ({path}:{code.co_firstlineno})".replace(";", ":")
+        _label_cache[code] = label
+    return label
+
+
+def collapse_frame(frame: FrameType | None) -> str:
+    """Root-first, ';'-joined stack of a frame."""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join(labels)
+
+
+def is_idle_frame(frame: FrameType) -> bool:
+    """Top frame is a blocking wait (select, lock, queue) rather than running code."""
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in _IDLE_FRAMES
+
+
+def format_collapsed(stacks: Counter) -> str:
+    """One 'stack count' line per distinct stack, heaviest first."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def sample(
+    seconds: float,
+    interval: float = 0.005,
+    thread_ids: set[int] | None = None,
+    mode: str = "wall",
+) -> tuple[Counter, int]:
+    """
+    Sample thread stacks for `seconds` (blocking: call from a worker thread). thread_ids=None samples all
+    threads except the sampler, with the thread name as root frame. mode="cpu" skips samples whose top frame
+    is an idle wait (select/lock/queue), an approximation of on-CPU time. Returns (stacks, samples taken).
+    """
+    me = threading.get_ident()
+    names = {t.ident: t.name for t in threading.enumerate()}
+    stacks: Counter = Counter()
+    taken = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        taken += 1
+        for tid, frame in sys._current_frames().items():
+            if tid == me or (thread_ids is not None and tid not in thread_ids):
+                continue
+            if mode == "cpu" and is_idle_frame(frame):
+                continue
+            stack = collapse_frame(frame)
+            if thread_ids is None or len(thread_ids) > 1:
+                stack = f"{names.get(tid, tid)};{stack}"
+            stacks[stack] += 1
+        time.sleep(interval)
+    return stacks, taken
+
+
+class ContinuousSampler:
+    """
+    Samples one thread (the event loop) at a fixed interval into a rolling window of
+    (monotonic time, collapsed stack). Idle samples are stored as None to keep memory flat.
+    """
+
+    def __init__(self, thread_id: int, interval: float, window_seconds: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self._samples: deque[tuple[float, str | None]] = deque(maxlen=max(1, int(window_seconds / interval)))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = None if is_idle_frame(frame) else collapse_frame(frame)
+            self._samples.append((time.monotonic(), stack))
+
+    def window(self, start: float, end: float) -> Counter:
+        """Collapsed non-idle stacks sampled between two time.monotonic() values."""
+        stacks: Counter = Counter()
+        for ts, stack in list(self._samples):
+            if start <= ts <= end and stack is not None:
+                stacks[stack] += 1
+        return stacks
+
+
+def profiles_dir() -> Path:
+    d = settings.storage_dir / "profiles"
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+
+def save_profile(label: str, stacks: Counter, header: dict[str, object] | None = None) -> Path:
+    """Write collapsed stacks to the ring buffer (blocking). Header lines are '# key: value' comments."""
+    d = profiles_dir()
+    ts = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in label)[:60]
+    path = d / f"{ts}-{safe}.collapsed"
+    lines = [f"# {k}: {v}\n" for k, v in (header or {}).items()]
+    path.write_text("".join(lines) + format_collapsed(stacks), encoding="utf-8")
+    existing = sorted(d.glob("*.collapsed"))
+    for old in existing[: max(0, len(existing) - settings.profile_ring_size)]:
+        old.unlink(missing_ok=True)
+    return path
+
+
+def list_profiles() -> list[dict[str, object]]:
+    """Ring buffer contents, newest first."""
+    out = []
+    for p in sorted(profiles_dir().glob("*.collapsed"), reverse=True):
+        st = p.stat()
+        out.append({"name": p.name, "bytes": st.st_size, "created_at": datetime.fromtimestamp(st.st_mtime, timezone.utc).isoformat()})
+    return out
+
+
+_sampler: ContinuousSampler | None = None
+
+
+def start_continuous_sampler(loop_thread_id: int) -> None:
+    """Begin sampling the event loop thread for slow-request capture (no-op unless profiling is enabled)."""
+    global _sampler
+    if not settings.profiling_enabled or settings.profile_slow_request_ms <= 0 or _sampler is not None:
+        return
+    window = max(settings.profile_slow_request_ms / 1000 * 4, 30.0)
+    _sampler = ContinuousSampler(loop_thread_id, settings.profile_sample_interval_ms / 1000, window)
+    _sampler.start()
+    logger.info("profiler_sampler_started", interval_ms=settings.profile_sample_interval_ms, window_s=window)
+
+
+def stop_continuous_sampler() -> None:
+    global _sampler
+    if _sampler is not None:
+        _sampler.stop()
+        _sampler = None
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware: when a request takes longer than profile_slow_request_ms, save the event-loop
+    stacks sampled during it. The loop is shared, so the profile shows everything that held the loop in
+    that span, which is what a stall investigation needs.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.threshold = settings.profile_slow_request_ms / 1000
+
+    async def __call__(self, scope, receive, send):
+        sampler = _sampler
+        # /admin/profile is slow by design
+        if scope["type"] != "http" or sampler is None or scope["path"].startswith("/admin/"):
+            await self.app(scope, receive, send)
+            return
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            elapsed = time.monotonic() - start
+            if elapsed >= self.threshold:
+                stacks = sampler.window(start, start + elapsed)
+                route = getattr(scope.get("route"), "path", None) or scope.get("path", "")
+                header = {
+                    "request": f"{scope['method']} {route}",
+                    "duration_ms": round(elapsed * 1000, 1),
+                    "interval_ms": settings.profile_sample_interval_ms,
+                    "samples": sum(stacks.values()),
+                }
+                try:
+                    path = await asyncio.to_thread(save_profile, f"slow-{scope['method']}-{route}", stacks, header)
+                    logger.warning("slow_request_profiled", route=route, duration_ms=header["duration_ms"], profile=path.name)
+                except OSError as e:
+                    logger.warning("slow_request_profile_failed", error=str(e))
+
@@ -0,0 +1,417 @@
+"""Lightweight OpenTelemetry-compatible tracing: W3C trace context, ratio sampling, OTLP/JSON export.
+
+Spans nest through a contextvar (so asyncio tasks, asyncio.to_thread and SQLAlchemy's greenlet
+bridge all see the right parent). The sampling decision is made once per trace at the root span;
+unsampled traces get a shared no-op span, so the cost on the hot path is a contextvar lookup.
+Finished spans go to a background thread that batches them to a JSON-lines file or an OTLP/HTTP
+collector (e.g. http://localhost:4318/v1/traces).
+"""
+import json
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Iterator
+
+import structlog
+
+from app.config import settings
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+SERVICE_NAME = "linkedin-ai-agent"
+
+# OTLP span kinds
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+_STATUS_OK = 1
+_STATUS_ERROR = 2
+
+
+class Span:
+    """A timed operation. Use via start_span(); attributes are plain str/int/float/bool values."""
+
+    __slots__ = ("trace_id", "span_id", "parent_span_id", "name", "kind", "start_ns", "end_ns", "attributes", "status", "status_message")
+    sampled = True
+
+    def __init__(self, name: str, trace_id: str, parent_span_id: str | None, kind: int):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_span_id = parent_span_id
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes: dict[str, Any] = {}
+        self.status = 0
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, exc: BaseException) -> None:
+        self.status = _STATUS_ERROR
+        self.status_message = f"{type(exc).__name__}: {exc}"[:300]
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_otlp(self) -> dict[str, Any]:
+        out = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attr(k, v) for k, v in self.attributes.items()],
+            "status": {"code": self.status, "message": self.status_message} if self.status else {},
+        }
+        if self.parent_span_id:
+            out["parentSpanId"] = self.parent_span_id
+        return out
+
+
+class _NonRecordingSpan:
+    """Stand-in for unsampled traces: carries the trace id for log correlation, records nothing."""
+
+    __slots__ = ("trace_id", "span_id")
+    sampled = False
+
+    def __init__(self, trace_id: str, span_id: str):
+        self.trace_id = trace_id
+        self.span_id = span_id
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_error(self, exc: BaseException) -> None:
+        pass
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-00"
+
+
+def _otlp_attr(key: str, value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        v = {"boolValue": value}
+    elif isinstance(value, int):
+        v = {"intValue": str(value)}
+    elif isinstance(value, float):
+        v = {"doubleValue": value}
+    else:
+        v = {"stringValue": str(value)}
+    return {"key": key, "value": v}
+
+
+_current: ContextVar["Span | _NonRecordingSpan | None"] = ContextVar("current_span", default=None)
+
+
+def current_span() -> "Span | _NonRecordingSpan | None":
+    return _current.get()
+
+
+def current_traceparent() -> str | None:
+    """W3C traceparent header for outbound calls, or None outside a trace."""
+    span = _current.get()
+    return span.traceparent() if span is not None else None
+
+
+def parse_traceparent(header: str | None) -> tuple[str, str, bool] | None:
+    """(trace_id, parent_span_id, sampled) from a W3C traceparent header, or None if invalid."""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        flags = int(parts[3], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+def _should_sample(trace_id: str) -> bool:
+    """TraceIdRatioBased: deterministic on the low 64 bits of the trace id."""
+    ratio = settings.trace_sample_ratio
+    if ratio >= 1.0:
+        return True
+    if ratio <= 0.0:
+        return False
+    return int(trace_id[16:], 16) < int(ratio * (1 << 64))
+
+
+def tracing_enabled() -> bool:
+    return settings.tracing_exporter.lower() in ("file", "otlp")
+
+
+@contextmanager
+def start_span(
+    name: str,
+    kind: int = KIND_INTERNAL,
+    attributes: dict[str, Any] | None = None,
+    traceparent: str | None = None,
+) -> Iterator["Span | _NonRecordingSpan"]:
+    """
+    Open a span as a child of the current one (or a new root, continuing `traceparent` if given).
+    Exceptions mark the span as errored and propagate.
+    """
+    parent = _current.get()
+    if parent is None:
+        remote = parse_traceparent(traceparent)
+        if remote:
+            trace_id, parent_id, remote_sampled = remote
+            sampled = remote_sampled or _should_sample(trace_id)
+        else:
+            trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+            sampled = _should_sample(trace_id)
+        if not sampled or not tracing_enabled():
+            span = _NonRecordingSpan(trace_id, parent_id or f"{random.getrandbits(64):016x}")
+        else:
+            span = Span(name, trace_id, parent_id, kind)
+        tokens = structlog.contextvars.bind_contextvars(trace_id=trace_id)
+    elif not parent.sampled:
+        # Whole trace is unsampled: nothing to record
+        yield parent
+        return
+    else:
+        span = Span(name, parent.trace_id, parent.span_id, kind)
+        tokens = None
+    if attributes and span.sampled:
+        span.attributes.update(attributes)
+    token = _current.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.set_error(e)
+        raise
+    finally:
+        _current.reset(token)
+        if tokens is not None:
+            structlog.contextvars.reset_contextvars(**tokens)
+        if span.sampled:
+            span.end_ns = time.time_ns()
+            _get_processor().submit(span)
+
+
+# ----- SQLAlchemy statement spans -----
+def instrument_engine(engine) -> None:
+    """Attach before/after cursor hooks so each SQL statement becomes a client span under the current span."""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+    db_system = sync_engine.dialect.name
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        parent = _current.get()
+        if parent is None or not parent.sampled:
+            return
+        span = Span("db.query", parent.trace_id, parent.span_id, KIND_CLIENT)
+        span.attributes["db.system"] = db_system
+        span.attributes["db.statement"] = statement[:500]
+        if executemany:
+            span.attributes["db.executemany"] = True
+        context._trace_span = span
+
+    def _finish(context, exc: BaseException | None = None) -> None:
+        span = getattr(context, "_trace_span", None)
+        if span is None:
+            return
+        context._trace_span = None
+        if exc is not None:
+            span.set_error(exc)
+        span.end_ns = time.time_ns()
+        _get_processor().submit(span)
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        _finish(context)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        if exception_context.execution_context is not None:
+            _finish(exception_context.execution_context, exception_context.original_exception)
+
+
+# ----- HTTP server spans -----
+class TracingMiddleware:
+    """Pure ASGI middleware: root server span per HTTP request, continuing an inbound traceparent."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        traceparent = None
+        for k, v in scope.get("headers") or ():
+            if k == b"traceparent":
+                traceparent = v.decode("latin-1")
+                break
+        status_holder = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+            await send(message)
+
+        with start_span(f"HTTP {scope['method']}", KIND_SERVER, traceparent=traceparent) as span:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                if span.sampled:
+                    route = getattr(scope.get("route"), "path", None)
+                    if route:
+                        span.name = f"{scope['method']} {route}"
+                        span.set_attribute("http.route", route)
+                    span.set_attribute("http.request.method", scope["method"])
+                    span.set_attribute("url.path", scope.get("path", ""))
+                    span.set_attribute("http.response.status_code", status_holder[0])
+                    if status_holder[0] >= 500:
+                        span.status = _STATUS_ERROR
+
+
+# ----- Export -----
+class _FileExporter:
+    """Append OTLP/JSON ExportTraceServiceRequest documents, one per line (works offline)."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    def export(self, payload: dict[str, Any]) -> None:
+        line = json.dumps(payload, separators=(",", ":")) + "\n"
+        with self._lock, self.path.open("a", encoding="utf-8") as f:
+            f.write(line)
+
+
+class _OTLPHttpExporter:
+    """POST OTLP/JSON to a collector's /v1/traces endpoint."""
+
+    def __init__(self, endpoint: str):
+        import httpx
+
+        self.url = endpoint.rstrip("/") + ("" if endpoint.rstrip("/").endswith("/v1/traces") else "/v1/traces")
+        self.client = httpx.Client(timeout=5.0)
+
+    def export(self, payload: dict[str, Any]) -> None:
+        self.client.post(self.url, json=payload).raise_for_status()
+
+
+_STOP = object()
+
+
+class _BatchProcessor:
+    """Queue finished spans; a daemon thread exports them in batches. Drops spans if the queue is full."""
+
+    MAX_QUEUE = 10_000
+    MAX_BATCH = 512
+
+    def __init__(self, exporter, interval: float):
+        self.exporter = exporter
+        self.interval = interval
+        self.queue: queue.Queue = queue.Queue(maxsize=self.MAX_QUEUE)
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, span: Span) -> None:
+        try:
+            self.queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.MAX_BATCH:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._export(batch)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Export everything queued so far, then stop the thread."""
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _export(self, batch: list[Span]) -> None:
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    _otlp_attr("service.name", SERVICE_NAME),
+                    _otlp_attr("process.pid", os.getpid()),
+                ]},
+                "scopeSpans": [{"scope": {"name": "app.utils.tracing"}, "spans": [s.to_otlp() for s in batch]}],
+            }]
+        }
+        try:
+            self.exporter.export(payload)
+        except Exception as e:
+            logger.warning("trace_export_failed", spans=len(batch), error=str(e))
+
+
+class _NoopProcessor:
+    def submit(self, span: Span) -> None:
+        pass
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        pass
+
+
+_processor: "_BatchProcessor | _NoopProcessor | None" = None
+_processor_lock = threading.Lock()
+
+
+def _get_processor() -> "_BatchProcessor | _NoopProcessor":
+    global _processor
+    if _processor is None:
+        with _processor_lock:
+            if _processor is None:
+                exporter_name = settings.tracing_exporter.lower()
+                if exporter_name == "file":
+                    path = Path(settings.trace_file_path) if settings.trace_file_path else settings.storage_dir / "traces" / "spans.jsonl"
+                    _processor = _BatchProcessor(_FileExporter(path), settings.trace_export_interval_seconds)
+                elif exporter_name == "otlp":
+                    _processor = _BatchProcessor(_OTLPHttpExporter(settings.trace_otlp_endpoint), settings.trace_export_interval_seconds)
+                else:
+                    _processor = _NoopProcessor()
+    return _processor
+
+
+def shutdown_tracing() -> None:
+    """Flush queued spans and stop the exporter (call at app shutdown)."""
+    global _processor
+    with _processor_lock:
+        processor, _processor = _processor, None
+    if processor is not None:
+        processor.shutdown()
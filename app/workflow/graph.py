@@ -1,4 +1,7 @@
 """Compiled LangGraph: Performance -> Input -> Strategy -> Post -> END. Image is optional (Generate image button)."""
+import functools
+import time
+
 from langgraph.graph import START, END
 from langgraph.graph import StateGraph
 
@@ -7,16 +10,35 @@ from app.agents.performance_agent import performance_agent
 from app.agents.input_handler_agent import input_handler_agent
 from app.agents.strategy_agent import strategy_agent
 from app.agents.post_generator import post_generator_agent
+from app.utils.metrics import GRAPH_NODE_DURATION
+from app.utils.tracing import start_span
+
+
+def instrument_node(name: str, fn):
+    """Wrap an async node in a span and record its duration in graph_node_duration_seconds{node=name}."""
+    child = GRAPH_NODE_DURATION.labels(name)
+    span_name = f"graph.node {name}"
+
+    @functools.wraps(fn)
+    async def wrapper(state: WorkflowState) -> dict:
+        start = time.perf_counter()
+        try:
+            with start_span(span_name):
+                return await fn(state)
+        finally:
+            child.observe(time.perf_counter() - start)
+
+    return wrapper
 
 
 def create_post_graph():
     """Build and compile the post-generation graph (text only; image via optional button)."""
     builder = StateGraph(WorkflowState)
 
-    builder.add_node("performance", performance_agent)
-    builder.add_node("input_handler", input_handler_agent)
-    builder.add_node("strategy_agent", strategy_agent)
-    builder.add_node("post_generator", post_generator_agent)
+    builder.add_node("performance", instrument_node("performance", performance_agent))
+    builder.add_node("input_handler", instrument_node("input_handler", input_handler_agent))
+    builder.add_node("strategy_agent", instrument_node("strategy_agent", strategy_agent))
+    builder.add_node("post_generator", instrument_node("post_generator", post_generator_agent))
 
     builder.add_edge(START, "performance")
     builder.add_edge("performance", "input_handler")
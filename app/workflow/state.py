@@ -9,6 +9,10 @@ class WorkflowState(TypedDict, total=False):
     user_input: str | None
     session: Any  # AsyncSession
     regenerate_draft_id: int | None
+    use_semantic_cache: bool  # look up similar earlier prompts before calling Gemini
+    brand: Any  # app.services.brand.Brand the post and image are written for
+    variants: int  # alternative posts to generate in one model call (default 1)
+    account_id: int | None  # account the post is for (per-account strategy learning)
 
     # Performance Intelligence Agent
     performance_insights: dict[str, Any]
@@ -20,7 +24,10 @@ class WorkflowState(TypedDict, total=False):
     strategy: dict[str, str]
 
     # Post Generation Agent
+    avoid_hooks: list[str]  # hooks of near-duplicate attempts to steer away from (dedup retry)
     post: dict[str, str]  # hook, body, cta, hashtags, suggested_visual
+    posts: list[dict[str, str]]  # all variants when variants > 1 (post is the first)
+    similar_draft: dict[str, Any] | None  # semantic cache hit: {draft_id, similarity}
 
     # Image Generation Agent
     image_path: str | None
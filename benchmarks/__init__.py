@@ -0,0 +1 @@
+"""Offline benchmarks: local stand-ins for Gemini, LinkedIn and the database. Entry point: python -m benchmarks.run"""
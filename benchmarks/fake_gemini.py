@@ -0,0 +1,187 @@
+"""Local stand-in for the Gemini REST API (generateContent, streamGenerateContent, Imagen predict, image models).
+
+Point the app at it with GEMINI_BASE_URL=http://127.0.0.1:<port> and any GEMINI_API_KEY.
+Each text response is a distinct post (so near-duplicate retries don't skew timings), limited to the fields of the
+request's response schema if it has one (candidateCount distinct posts per call). malformed_rate cuts responses
+off or wraps them in markdown fences.
+Context caches (cachedContents) are accepted when the system instruction has at least min_cache_tokens tokens
+(estimated at 4 characters each, as are countTokens answers); calls that reference one report its tokens as
+cachedContentTokenCount.
+model_latency_ms / model_error_rate override the latency and error rate of individual models (fallback tests).
+"""
+import asyncio
+import base64
+import itertools
+import json
+import random
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# 1x1 PNG
+PNG_1PX = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+
+_WORDS = (
+    "edit pipeline render client brief storyboard color grade deadline founder studio launch camera "
+    "motion sound budget revision feedback review export delivery audience retention hook script b-roll "
+    "timeline proxy archive workflow handoff producer director brand story campaign reel cut frame"
+).split()
+
+
+def _post_json(n: int) -> dict[str, str]:
+    rng = random.Random(n)
+    body = "\n\n".join(" ".join(rng.choice(_WORDS) for _ in range(rng.randint(12, 24))) + "." for _ in range(3))
+    return {
+        "hook": f"Post {n}: what {rng.randint(2, 9)} {rng.choice(_WORDS)} lessons taught us?",
+        "body": body,
+        "cta": "What would you add?",
+        "hashtags": "#ContentCreation #FounderLife #ReeloomStudios",
+        "suggested_visual": "Clean desk with an editing timeline on screen, soft daylight.",
+    }
+
+
+def _candidate(texts: list[str], cached_tokens: int = 0, output_chars: int | None = None) -> dict:
+    """output_chars: characters generated so far (stream chunks report cumulative usage, like the real API)."""
+    prompt_tokens = 600 + cached_tokens
+    output_tokens = (sum(len(t) for t in texts) if output_chars is None else output_chars) // 4
+    usage = {"promptTokenCount": prompt_tokens, "candidatesTokenCount": output_tokens, "totalTokenCount": prompt_tokens + output_tokens}
+    if cached_tokens:
+        usage["cachedContentTokenCount"] = cached_tokens
+    return {
+        "candidates": [
+            {"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP", "index": i}
+            for i, text in enumerate(texts)
+        ],
+        "usageMetadata": usage,
+        "modelVersion": "fake-gemini",
+    }
+
+
+def _instruction_tokens(content: dict | None) -> int:
+    return sum(len(p.get("text") or "") for p in (content or {}).get("parts") or []) // 4
+
+
+def _schema_fields(body: dict) -> list[str] | None:
+    config = body.get("generationConfig") or {}
+    schema = config.get("responseSchema") or config.get("responseJsonSchema") or {}
+    return list(schema.get("properties") or {}) or None
+
+
+def create_app(
+    latency_ms: float = 300.0,
+    jitter_ms: float = 50.0,
+    stream_chunks: int = 8,
+    error_rate: float = 0.0,
+    malformed_rate: float = 0.0,
+    min_cache_tokens: int = 1024,
+    model_latency_ms: dict[str, float] | None = None,
+    model_error_rate: dict[str, float] | None = None,
+) -> FastAPI:
+    """
+    latency_ms (+- jitter_ms) is time to full response; streaming spreads it over stream_chunks chunks.
+    error_rate injects 503s; malformed_rate truncates text responses (or fences them in markdown).
+    """
+    model_latency_ms = model_latency_ms or {}
+    model_error_rate = model_error_rate or {}
+    app = FastAPI(title="fake-gemini")
+    counter = itertools.count(1)
+    app.state.calls = {"text": 0, "stream": 0, "image": 0, "errors": 0, "malformed": 0, "cached": 0, "by_model": {}}
+    caches: dict[str, int] = {}  # cache name -> cached token count
+    cache_ids = itertools.count(1)
+
+    async def delay(fraction: float = 1.0, model: str = "") -> None:
+        base = model_latency_ms.get(model, latency_ms)
+        await asyncio.sleep(max(0.0, base + random.uniform(-jitter_ms, jitter_ms)) / 1000 * fraction)
+
+    def maybe_error(model: str = "") -> JSONResponse | None:
+        rate = model_error_rate.get(model, error_rate)
+        if rate and random.random() < rate:
+            app.state.calls["errors"] += 1
+            return JSONResponse({"error": {"code": 503, "message": "overloaded", "status": "UNAVAILABLE"}}, status_code=503)
+        return None
+
+    @app.post("/{version}/cachedContents")
+    async def create_cache(version: str, request: Request):
+        body = await request.json()
+        tokens = _instruction_tokens(body.get("systemInstruction"))
+        if tokens < min_cache_tokens:
+            return JSONResponse(
+                {"error": {"code": 400, "message": f"Cached content is too small. total_token_count={tokens}, min_total_token_count={min_cache_tokens}", "status": "INVALID_ARGUMENT"}},
+                status_code=400,
+            )
+        name = f"cachedContents/fake-{next(cache_ids)}"
+        caches[name] = tokens
+        return {"name": name, "model": body.get("model"), "usageMetadata": {"totalTokenCount": tokens}}
+
+    @app.patch("/{version}/cachedContents/{cache_id}")
+    async def update_cache(version: str, cache_id: str):
+        name = f"cachedContents/{cache_id}"
+        if name not in caches:
+            return JSONResponse({"error": {"code": 404, "message": "cache not found", "status": "NOT_FOUND"}}, status_code=404)
+        return {"name": name}
+
+    @app.delete("/{version}/cachedContents/{cache_id}")
+    async def delete_cache(version: str, cache_id: str):
+        caches.pop(f"cachedContents/{cache_id}", None)
+        return {}
+
+    @app.post("/{version}/models/{model_action:path}")
+    async def model_call(version: str, model_action: str, request: Request):
+        model, _, action = model_action.rpartition(":")
+        if action == "countTokens":
+            body = await request.json()
+            return {"totalTokens": sum(_instruction_tokens(c) for c in body.get("contents") or [])}
+        by_model = app.state.calls["by_model"]
+        by_model[model] = by_model.get(model, 0) + 1
+        err = maybe_error(model)
+        if err is not None:
+            await delay(0.2, model)
+            return err
+        if action == "predict":
+            app.state.calls["image"] += 1
+            await delay(model=model)
+            return {"predictions": [{"bytesBase64Encoded": base64.b64encode(PNG_1PX).decode(), "mimeType": "image/png"}]}
+        body = await request.json()
+        if "image" in model:  # Gemini image models: generateContent with an inline PNG part
+            app.state.calls["image"] += 1
+            await delay(model=model)
+            image = {"inlineData": {"mimeType": "image/png", "data": base64.b64encode(PNG_1PX).decode()}}
+            return {"candidates": [{"content": {"role": "model", "parts": [image]}, "finishReason": "STOP", "index": 0}]}
+        cache = body.get("cachedContent")
+        if cache is not None and cache not in caches:
+            return JSONResponse({"error": {"code": 403, "message": "CachedContent not found (or permission denied)", "status": "PERMISSION_DENIED"}}, status_code=403)
+        cached_tokens = caches.get(cache, 0)
+        if cached_tokens:
+            app.state.calls["cached"] += 1
+        fields = _schema_fields(body)
+        texts = []
+        for _ in range((body.get("generationConfig") or {}).get("candidateCount") or 1):
+            post = _post_json(next(counter))
+            text = json.dumps({k: v for k, v in post.items() if k in fields} if fields else post)
+            if malformed_rate and random.random() < malformed_rate:
+                app.state.calls["malformed"] += 1
+                text = random.choice((text[: int(len(text) * 0.7)], f"```json\n{text}\n```"))
+            texts.append(text)
+        if action == "streamGenerateContent":
+            app.state.calls["stream"] += 1
+            size = max(1, max(len(t) for t in texts) // max(1, stream_chunks))
+            steps = range(0, max(len(t) for t in texts), size)
+
+            async def events():
+                for start in steps:
+                    await delay(1 / len(steps), model)
+                    sent = sum(len(t[: start + size]) for t in texts)
+                    yield f"data: {json.dumps(_candidate([t[start:start + size] for t in texts], cached_tokens, sent))}\r\n\r\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+        app.state.calls["text"] += 1
+        await delay(model=model)
+        return _candidate(texts, cached_tokens)
+
+    @app.get("/_stats")
+    async def stats():
+        return app.state.calls
+
+    return app
@@ -0,0 +1,102 @@
+"""Local stand-in for the LinkedIn OAuth, userinfo, assets (image upload) and UGC Posts APIs, with 429 injection.
+
+Point the app at it with LINKEDIN_API_BASE=http://127.0.0.1:<port> and
+LINKEDIN_OAUTH_BASE=http://127.0.0.1:<port>/oauth/v2.
+"""
+import asyncio
+import itertools
+import random
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+
+def create_app(latency_ms: float = 120.0, jitter_ms: float = 30.0, rate_429: float = 0.0, retry_after: int = 1) -> FastAPI:
+    """rate_429 is the fraction of UGC post calls answered with 429 Too Many Requests."""
+    app = FastAPI(title="fake-linkedin")
+    post_ids = itertools.count(1)
+    asset_ids = itertools.count(1)
+    app.state.calls = {"token": 0, "userinfo": 0, "ugc_posts": 0, "throttled": 0, "assets_registered": 0, "uploads": 0, "upload_bytes": 0}
+    uploaded: set[str] = set()
+
+    async def delay() -> None:
+        await asyncio.sleep(max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000)
+
+    @app.post("/oauth/v2/accessToken")
+    async def access_token(request: Request):
+        app.state.calls["token"] += 1
+        await delay()
+        form = await request.form()
+        grant = form.get("grant_type")
+        return {
+            "access_token": f"fake-access-{random.getrandbits(48):012x}",
+            "expires_in": 5184000,
+            "refresh_token": f"fake-refresh-{random.getrandbits(48):012x}" if grant == "authorization_code" else form.get("refresh_token"),
+            "refresh_token_expires_in": 31536000,
+            "scope": "openid,profile,email,w_member_social",
+        }
+
+    @app.get("/v2/userinfo")
+    async def userinfo(request: Request):
+        app.state.calls["userinfo"] += 1
+        await delay()
+        if not request.headers.get("authorization", "").startswith("Bearer "):
+            return JSONResponse({"message": "Empty oauth2 access token"}, status_code=401)
+        return {"sub": "fakeMember123", "name": "Bench User", "email": "bench@example.com"}
+
+    @app.post("/v2/assets")
+    async def register_upload(request: Request, action: str = ""):
+        if action != "registerUpload":
+            return JSONResponse({"message": "unsupported action", "status": 400}, status_code=400)
+        app.state.calls["assets_registered"] += 1
+        await delay()
+        body = await request.json()
+        if not (body.get("registerUploadRequest") or {}).get("owner"):
+            return JSONResponse({"message": "owner required", "status": 422}, status_code=422)
+        n = next(asset_ids)
+        return {"value": {
+            "asset": f"urn:li:digitalmediaAsset:fake{n}",
+            "uploadMechanism": {"com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest": {
+                "uploadUrl": f"{str(request.base_url).rstrip('/')}/_upload/fake{n}",
+                "headers": {"media-type-family": "STILLIMAGE"},
+            }},
+        }}
+
+    @app.put("/_upload/{asset_id}")
+    async def upload(asset_id: str, request: Request):
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+        await delay()
+        if not size:
+            return JSONResponse({"message": "empty upload", "status": 400}, status_code=400)
+        app.state.calls["uploads"] += 1
+        app.state.calls["upload_bytes"] += size
+        uploaded.add(f"urn:li:digitalmediaAsset:{asset_id}")
+        return Response(status_code=201)
+
+    @app.post("/v2/ugcPosts")
+    async def ugc_posts(request: Request):
+        app.state.calls["ugc_posts"] += 1
+        await delay()
+        if rate_429 and random.random() < rate_429:
+            app.state.calls["throttled"] += 1
+            return JSONResponse(
+                {"message": "Resource level throttle limit reached", "status": 429},
+                status_code=429,
+                headers={"Retry-After": str(retry_after)},
+            )
+        body = await request.json()
+        if not body.get("author"):
+            return JSONResponse({"message": "author required", "status": 422}, status_code=422)
+        share = body.get("specificContent", {}).get("com.linkedin.ugc.ShareContent", {})
+        if share.get("shareMediaCategory") == "IMAGE":
+            if not all(m.get("media") in uploaded for m in share.get("media") or [{}]):
+                return JSONResponse({"message": "media asset not uploaded", "status": 422}, status_code=422)
+        return Response(status_code=201, headers={"X-RestLi-Id": f"urn:li:share:{next(post_ids)}"})
+
+    @app.get("/_stats")
+    async def stats():
+        return app.state.calls
+
+    return app
@@ -0,0 +1,109 @@
+"""Local stand-in for an S3-compatible object store (MinIO-style, path-style requests): objects in memory.
+
+Point the app at it with STORAGE_BACKEND=s3, S3_ENDPOINT_URL=http://127.0.0.1:<port>, S3_BUCKET=<any name>
+and S3_ACCESS_KEY_ID=<access_key>. Requests must carry a SigV4 Authorization header (or presigned query) for
+that access key; signatures themselves are not recomputed.
+"""
+import asyncio
+import random
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape
+
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+
+_NS = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+
+def _error(status: int, code: str) -> Response:
+    body = f'<?xml version="1.0" encoding="UTF-8"?><Error><Code>{code}</Code></Error>'
+    return Response(body, status_code=status, media_type="application/xml")
+
+
+def create_app(latency_ms: float = 20.0, jitter_ms: float = 5.0, access_key: str = "fake-access-key") -> FastAPI:
+    app = FastAPI(title="fake-s3")
+    # bucket -> key -> (body, content type, last modified)
+    buckets: dict[str, dict[str, tuple[bytes, str, datetime]]] = {}
+    app.state.calls = {"put": 0, "get": 0, "head": 0, "delete": 0, "list": 0, "denied": 0, "put_bytes": 0, "get_bytes": 0}
+
+    async def delay() -> None:
+        await asyncio.sleep(max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000)
+
+    def authorized(request: Request) -> bool:
+        auth = request.headers.get("authorization", "")
+        credential = request.query_params.get("X-Amz-Credential", "")
+        if auth.startswith("AWS4-HMAC-SHA256 ") and f"Credential={access_key}/" in auth and "Signature=" in auth:
+            return bool(request.headers.get("x-amz-date"))
+        if credential.startswith(f"{access_key}/") and request.query_params.get("X-Amz-Signature"):
+            return bool(request.query_params.get("X-Amz-Date"))
+        app.state.calls["denied"] += 1
+        return False
+
+    @app.get("/_stats")
+    async def stats():
+        return {**app.state.calls, "objects": sum(len(b) for b in buckets.values())}
+
+    @app.get("/{bucket}")
+    async def list_objects(bucket: str, request: Request):
+        if not authorized(request):
+            return _error(403, "AccessDenied")
+        app.state.calls["list"] += 1
+        await delay()
+        prefix = request.query_params.get("prefix", "")
+        after = request.query_params.get("continuation-token", "")
+        max_keys = int(request.query_params.get("max-keys", "1000"))
+        keys = sorted(k for k in buckets.get(bucket, {}) if k.startswith(prefix) and k > after)
+        page, truncated = keys[:max_keys], len(keys) > max_keys
+        parts = [f'<?xml version="1.0" encoding="UTF-8"?><ListBucketResult xmlns="{_NS}">']
+        parts.append(f"<Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix><KeyCount>{len(page)}</KeyCount>")
+        for k in page:
+            body, _, modified = buckets[bucket][k]
+            parts.append(
+                f"<Contents><Key>{escape(k)}</Key><LastModified>{modified.strftime('%Y-%m-%dT%H:%M:%S.000Z')}</LastModified>"
+                f"<Size>{len(body)}</Size></Contents>"
+            )
+        parts.append(f"<IsTruncated>{'true' if truncated else 'false'}</IsTruncated>")
+        if truncated:
+            parts.append(f"<NextContinuationToken>{escape(page[-1])}</NextContinuationToken>")
+        parts.append("</ListBucketResult>")
+        return Response("".join(parts), media_type="application/xml")
+
+    @app.put("/{bucket}/{key:path}")
+    async def put_object(bucket: str, key: str, request: Request):
+        if not authorized(request):
+            return _error(403, "AccessDenied")
+        body = b"".join([chunk async for chunk in request.stream()])
+        await delay()
+        app.state.calls["put"] += 1
+        app.state.calls["put_bytes"] += len(body)
+        ctype = request.headers.get("content-type", "application/octet-stream")
+        buckets.setdefault(bucket, {})[key] = (body, ctype, datetime.now(timezone.utc))
+        return Response(status_code=200, headers={"ETag": f'"{len(body):x}"'})
+
+    @app.api_route("/{bucket}/{key:path}", methods=["GET", "HEAD"])
+    async def get_object(bucket: str, key: str, request: Request):
+        if not authorized(request):
+            return _error(403, "AccessDenied")
+        head = request.method == "HEAD"
+        app.state.calls["head" if head else "get"] += 1
+        await delay()
+        obj = buckets.get(bucket, {}).get(key)
+        if obj is None:
+            return Response(status_code=404) if head else _error(404, "NoSuchKey")
+        body, ctype, modified = obj
+        headers = {"Content-Length": str(len(body)), "Last-Modified": modified.strftime("%a, %d %b %Y %H:%M:%S GMT")}
+        if head:
+            return Response(status_code=200, headers=headers, media_type=ctype)
+        app.state.calls["get_bytes"] += len(body)
+        return Response(body, headers=headers, media_type=ctype)
+
+    @app.delete("/{bucket}/{key:path}")
+    async def delete_object(bucket: str, key: str, request: Request):
+        if not authorized(request):
+            return _error(403, "AccessDenied")
+        app.state.calls["delete"] += 1
+        await delay()
+        buckets.get(bucket, {}).pop(key, None)
+        return Response(status_code=204)
+
+    return app
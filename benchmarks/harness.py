@@ -0,0 +1,269 @@
+"""Benchmark plumbing: stand-in servers in their own processes, the app under test in a uvicorn subprocess,
+a disposable database, and synthetic seed data."""
+import asyncio
+import importlib
+import multiprocessing
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+import uvicorn
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _serve_stand_in(module: str, kwargs: dict, port: int) -> None:
+    app = importlib.import_module(module).create_app(**kwargs)
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", access_log=False, lifespan="off")
+
+
+class StandInServer:
+    """
+    Run a stand-in (benchmarks.fake_gemini / fake_linkedin / fake_s3) in its own process, so its
+    latency is not distorted by the load generator holding the GIL. `stats()` returns its call counters.
+    """
+
+    def __init__(self, module: str, **kwargs):
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        ctx = multiprocessing.get_context("spawn")
+        self.proc = ctx.Process(target=_serve_stand_in, args=(module, kwargs, self.port), daemon=True)
+
+    def __enter__(self) -> "StandInServer":
+        self.proc.start()
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                httpx.get(f"{self.url}/_stats", timeout=1)
+                return self
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        raise RuntimeError(f"stand-in on port {self.port} did not start")
+
+    def stats(self) -> dict:
+        return httpx.get(f"{self.url}/_stats", timeout=5).json()
+
+    def __exit__(self, *exc) -> None:
+        self.proc.terminate()
+        self.proc.join(timeout=5)
+
+
+class AppProcess:
+    """The app under test: `uvicorn app.main:app` in a subprocess with the given environment."""
+
+    def __init__(self, env: dict[str, str], log_path: Path, workers: int = 1):
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.env = {**os.environ, **env}
+        self.log_path = log_path
+        self.workers = workers
+        self.proc: subprocess.Popen | None = None
+
+    def __enter__(self) -> "AppProcess":
+        cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(self.port),
+               "--log-level", "warning", "--no-access-log", "--workers", str(self.workers)]
+        self._log = self.log_path.open("w")
+        self.proc = subprocess.Popen(cmd, cwd=PROJECT_ROOT, env=self.env, stdout=self._log, stderr=subprocess.STDOUT)
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"app exited with {self.proc.returncode}; see {self.log_path}")
+            try:
+                if httpx.get(f"{self.url}/health", timeout=1).status_code == 200:
+                    return self
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f"app did not become healthy; see {self.log_path}")
+
+    def __exit__(self, *exc) -> None:
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+        self._log.close()
+
+
+class DisposableDatabase:
+    """
+    A throwaway database for one benchmark run, in order of preference:
+    - a new database on the server at `postgres_url` (dropped afterwards)
+    - a temporary local Postgres cluster when initdb/pg_ctl are on PATH
+    - a SQLite file (needs aiosqlite)
+    `url` is the SQLAlchemy async URL for DATABASE_URL.
+    """
+
+    def __init__(self, workdir: Path, postgres_url: str | None = None):
+        self.workdir = workdir
+        self.postgres_url = postgres_url
+        self.kind = ""
+        self.url = ""
+        self._admin_dsn = ""
+        self._dbname = f"bench_{os.getpid()}"
+        self._pgdata: Path | None = None
+
+    def __enter__(self) -> "DisposableDatabase":
+        if self.postgres_url:
+            self._admin_dsn = self.postgres_url.replace("postgresql+asyncpg://", "postgresql://")
+            self._create_pg_database()
+        elif shutil.which("initdb") and shutil.which("pg_ctl"):
+            self._start_cluster()
+            self._create_pg_database()
+        else:
+            self.kind = "sqlite"
+            self.url = f"sqlite+aiosqlite:///{self.workdir / 'bench.db'}"
+        return self
+
+    def _start_cluster(self) -> None:
+        self._pgdata = self.workdir / "pgdata"
+        port = free_port()
+        subprocess.run(["initdb", "-D", str(self._pgdata), "-U", "bench", "--auth=trust", "-E", "UTF8"],
+                       check=True, capture_output=True)
+        subprocess.run(["pg_ctl", "-D", str(self._pgdata), "-l", str(self.workdir / "postgres.log"), "-w",
+                        "-o", f"-p {port} -k {self.workdir} -c fsync=off -c max_connections=200", "start"],
+                       check=True, capture_output=True)
+        self._admin_dsn = f"postgresql://bench@127.0.0.1:{port}/postgres"
+
+    def _create_pg_database(self) -> None:
+        import asyncpg
+
+        async def create() -> None:
+            conn = await asyncpg.connect(self._admin_dsn)
+            try:
+                await conn.execute(f'DROP DATABASE IF EXISTS "{self._dbname}"')
+                await conn.execute(f'CREATE DATABASE "{self._dbname}"')
+            finally:
+                await conn.close()
+
+        asyncio.run(create())
+        self.kind = "postgres"
+        base, _, _ = self._admin_dsn.rpartition("/")
+        self.url = f"{base.replace('postgresql://', 'postgresql+asyncpg://', 1)}/{self._dbname}"
+
+    def __exit__(self, *exc) -> None:
+        if self.kind != "postgres":
+            return
+        import asyncpg
+
+        async def drop() -> None:
+            conn = await asyncpg.connect(self._admin_dsn)
+            try:
+                await conn.execute(f'DROP DATABASE IF EXISTS "{self._dbname}" WITH (FORCE)')
+            finally:
+                await conn.close()
+
+        try:
+            asyncio.run(drop())
+        finally:
+            if self._pgdata is not None:
+                subprocess.run(["pg_ctl", "-D", str(self._pgdata), "-m", "fast", "-w", "stop"], capture_output=True)
+
+
+# ----- Seed data -----
+_HOOKS = (
+    "Why do {n} out of 10 video projects miss their deadline?",
+    "{n} lessons from shipping our first brand film",
+    "Last week a client asked us to cut a 3-minute reel to {n} seconds.",
+    "Most studios get editing feedback wrong.",
+    "🎬 We rebuilt our post-production pipeline in {n} days.",
+)
+_SENTENCES = (
+    "Clear briefs save more time than fast editors.",
+    "We now lock the story before anyone opens the timeline.",
+    "Every revision round gets one owner and one deadline.",
+    "Proxies made remote review painless for the whole team.",
+    "The best hook is usually the line the client wanted to cut.",
+    "Sound design is the cheapest quality upgrade you can make.",
+)
+
+
+def synthetic_post(rng: random.Random) -> str:
+    hook = rng.choice(_HOOKS).format(n=rng.randint(2, 9))
+    paras = ["\n".join(rng.sample(_SENTENCES, rng.randint(1, 3))) for _ in range(rng.randint(2, 5))]
+    tags = " ".join(rng.sample(["#ContentCreation", "#FounderLife", "#VideoProduction", "#ReeloomStudios", "#Marketing"], rng.randint(1, 5)))
+    return f"{hook}\n\n" + "\n\n".join(paras) + f"\n\nWhat would you add?\n\n{tags}"
+
+
+async def seed(
+    url: str,
+    history_rows: int,
+    drafts: int,
+    seed_value: int = 7,
+    batch: int = 5000,
+    image_dir: Path | None = None,
+    images: int = 0,
+    image_bytes: int = 250_000,
+    first_image: int = 0,
+) -> None:
+    """
+    Create tables; insert one account with a token, `drafts` drafts and `history_rows` published posts.
+    With image_dir, `images` drafts starting at index first_image get an image file of image_bytes (PNG header + noise).
+    """
+    from sqlalchemy import insert
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app.models.db_models import Base, InsightsSnapshot, LinkedInAccount, PostDraft, PostHistory
+    from app.services.provenance import canonical_json, content_hash
+    from app.utils.post_features import extract_post_features
+
+    rng = random.Random(seed_value)
+    now = datetime.now(timezone.utc)
+    engine = create_async_engine(url)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(LinkedInAccount.__table__), [{
+                "account_type": "personal", "display_name": "Bench", "linkedin_urn": "urn:li:person:fakeMember123",
+                "access_token": "fake-access-seed", "is_active": True, "created_at": now, "updated_at": now,
+            }])
+            insights = canonical_json({"best_days": ["Tuesday"], "best_hours": [9]})
+            await conn.execute(insert(InsightsSnapshot.__table__), [{
+                "content_hash": content_hash(insights), "payload": insights, "created_at": now,
+            }])
+            draft_rows = []
+            for i in range(drafts):
+                hook, _, rest = synthetic_post(rng).partition("\n\n")
+                image_path = None
+                if image_dir is not None and first_image <= i < first_image + images:
+                    image_dir.mkdir(parents=True, exist_ok=True)
+                    image_path = f"bench_{i}.png"
+                    (image_dir / image_path).write_bytes(b"\x89PNG\r\n\x1a\n" + rng.randbytes(image_bytes - 8))
+                draft_rows.append({
+                    "hook": hook, "body": rest, "cta": "What would you add?", "hashtags": "#Bench", "image_path": image_path,
+                    "insights_id": 1, "created_at": now, "updated_at": now,
+                })
+            if draft_rows:
+                await conn.execute(insert(PostDraft.__table__), draft_rows)
+        done = 0
+        while done < history_rows:
+            n = min(batch, history_rows - done)
+            rows = []
+            for _ in range(n):
+                text = synthetic_post(rng)
+                published = now - timedelta(minutes=rng.randint(60, 60 * 24 * 720))
+                impressions = rng.randint(200, 20000)
+                rows.append({
+                    "account_id": 1, "content_text": text, "linkedin_post_id": f"urn:li:share:seed{done + len(rows)}",
+                    "impressions": impressions, "engagement_rate": round(rng.uniform(0.005, 0.09), 4),
+                    "published_at": published, "created_at": published, **extract_post_features(text),
+                })
+            async with engine.begin() as conn:
+                await conn.execute(insert(PostHistory.__table__), rows)
+            done += n
+    finally:
+        await engine.dispose()
@@ -0,0 +1,411 @@
+"""
+Load test: ramp closed-loop virtual users through a realistic request mix, find the saturation point
+and name the bottleneck from the app's /metrics (DB pool wait and query time, thread-pool backlog,
+event-loop lag and CPU, upstream latency/throttling). Stand-ins run in their own processes.
+
+Mix (weights via --mix): dashboard load (/accounts, /analytics, /post-history/drafts, then /storage/*
+images), generate, edit (PATCH draft), publish. Each user waits --think-ms (exponential) between actions.
+
+Run:  python -m benchmarks.load [--users 1,2,4,8,16,32,64] [--stage-seconds 20] [--rows 10000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+
+from benchmarks.harness import AppProcess, DisposableDatabase, StandInServer, seed
+from benchmarks.run import RESULTS_DIR, percentile
+
+TOPICS = (
+    "how we cut our video turnaround time in half",
+    "what clients get wrong about brand films",
+    "lessons from our first year as a studio",
+    "why sound design matters more than resolution",
+    "how we price video projects",
+    "remote editing workflow that actually works",
+)
+DEFAULT_MIX = "dashboard=55,edit=20,generate=15,publish=10"
+INTERACTIVE_SKIP = ("POST /generate", "POST /publish")  # slow by design (upstream calls); excluded from the SLO
+
+
+# ----- /metrics parsing -----
+_SAMPLE_RE = re.compile(r"^([a-zA-Z_:][\w:]*)(?:\{(.*)\})?\s+(\S+)$")
+_LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+Snapshot = dict[tuple[str, tuple[tuple[str, str], ...]], float]
+
+
+def parse_metrics(text: str) -> Snapshot:
+    out: Snapshot = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        m = _SAMPLE_RE.match(line)
+        if m:
+            labels = tuple(sorted(_LABEL_RE.findall(m.group(2) or "")))
+            out[(m.group(1), labels)] = float(m.group(3))
+    return out
+
+
+def _sum(snap: Snapshot, name: str, **match: str) -> float:
+    return sum(v for (n, labels), v in snap.items() if n == name and all((k, val) in labels for k, val in match.items()))
+
+
+def hist_delta(before: Snapshot, after: Snapshot, name: str, **match: str) -> tuple[dict[float, float], float, float]:
+    """(cumulative bucket counts by upper bound, sum, count) of a histogram between two snapshots."""
+    buckets: dict[float, float] = defaultdict(float)
+    for snap, sign in ((after, 1), (before, -1)):
+        for (n, labels), v in snap.items():
+            if n != f"{name}_bucket":
+                continue
+            d = dict(labels)
+            if any(d.get(k) != val for k, val in match.items()):
+                continue
+            le = float("inf") if d["le"] == "+Inf" else float(d["le"])
+            buckets[le] += sign * v
+    total = _sum(after, f"{name}_count", **match) - _sum(before, f"{name}_count", **match)
+    s = _sum(after, f"{name}_sum", **match) - _sum(before, f"{name}_sum", **match)
+    return dict(sorted(buckets.items())), s, total
+
+
+def hist_quantile(buckets: dict[float, float], q: float) -> float:
+    """Prometheus-style histogram_quantile with linear interpolation inside the bucket."""
+    if not buckets:
+        return 0.0
+    total = max(buckets.values())
+    if total <= 0:
+        return 0.0
+    rank = q * total
+    prev_le, prev_count = 0.0, 0.0
+    for le, count in buckets.items():
+        if count >= rank:
+            if le == float("inf"):
+                return prev_le
+            return prev_le + (le - prev_le) * ((rank - prev_count) / max(count - prev_count, 1e-12))
+        prev_le, prev_count = le, count
+    return prev_le
+
+
+def _proc_cpu_seconds(pid: int) -> float | None:
+    """utime + stime of a process (Linux /proc); None elsewhere."""
+    try:
+        fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+# ----- Virtual users -----
+class Recorder:
+    """Latencies and errors per request kind, only counted inside the measurement window."""
+
+    def __init__(self):
+        self.window = (0.0, 0.0)
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.actions = 0
+
+    async def call(self, kind: str, coro) -> httpx.Response | None:
+        t0 = time.monotonic()
+        resp = None
+        try:
+            resp = await coro
+            failed = resp.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        t1 = time.monotonic()
+        if self.window[0] <= t0 and t1 <= self.window[1]:
+            self.latencies[kind].append(t1 - t0)
+            if failed:
+                self.errors[kind] += 1
+        return resp
+
+
+async def dashboard(client: httpx.AsyncClient, rng: random.Random, rec: Recorder, ctx: dict) -> None:
+    await asyncio.gather(
+        rec.call("GET /accounts", client.get("/accounts")),
+        rec.call("GET /analytics", client.get("/analytics")),
+        rec.call("GET /post-history/drafts", client.get("/post-history/drafts")),
+    )
+    for draft_id in rng.sample(range(1, ctx["images"] + 1), min(3, ctx["images"])):
+        await rec.call("GET /storage/*", client.get(f"/storage/{draft_id}"))
+
+
+async def generate(client: httpx.AsyncClient, rng: random.Random, rec: Recorder, ctx: dict) -> None:
+    await rec.call("POST /generate", client.post("/generate", json={"user_input": rng.choice(TOPICS)}))
+
+
+async def edit(client: httpx.AsyncClient, rng: random.Random, rec: Recorder, ctx: dict) -> None:
+    draft_id = rng.randint(1, ctx["drafts"])
+    await rec.call("PATCH /post-history/drafts/*", client.patch(
+        f"/post-history/drafts/{draft_id}", json={"cta": f"Tell us what you think ({rng.randint(1, 10**6)})"}
+    ))
+
+
+async def publish(client: httpx.AsyncClient, rng: random.Random, rec: Recorder, ctx: dict) -> None:
+    when = (datetime.now(timezone.utc) - timedelta(minutes=1)).isoformat()
+    await rec.call("POST /publish", client.post(
+        "/publish", json={"draft_id": rng.randint(1, ctx["drafts"]), "account_id": 1, "schedule_override": when}
+    ))
+
+
+ACTIONS = {"dashboard": dashboard, "generate": generate, "edit": edit, "publish": publish}
+
+
+async def virtual_user(client, uid: int, stop_at: float, rec: Recorder, mix: dict[str, float], think: float, ctx: dict) -> None:
+    rng = random.Random(uid * 7919 + int(stop_at))
+    names, weights = list(mix), list(mix.values())
+    await asyncio.sleep(rng.uniform(0, think))  # spread arrivals
+    while time.monotonic() < stop_at:
+        await ACTIONS[rng.choices(names, weights)[0]](client, rng, rec, ctx)
+        rec.actions += 1
+        await asyncio.sleep(rng.expovariate(1 / think) if think > 0 else 0)
+
+
+# ----- Stages -----
+async def run_stage(client, app_url: str, app_pid: int, users: int, args, mix, ctx) -> dict:
+    rec = Recorder()
+    start = time.monotonic()
+    warm = min(3.0, args.stage_seconds / 5)
+    rec.window = (start + warm, start + args.stage_seconds)
+    tasks = [asyncio.create_task(virtual_user(client, u, rec.window[1], rec, mix, args.think_ms / 1000, ctx)) for u in range(users)]
+
+    await asyncio.sleep(warm)
+    before = parse_metrics((await client.get(f"{app_url}/metrics")).text)
+    cpu0, own0, t0 = _proc_cpu_seconds(app_pid), time.process_time(), time.monotonic()
+    queue_samples: list[float] = []
+    while time.monotonic() < rec.window[1]:
+        await asyncio.sleep(1.0)
+        snap = parse_metrics((await client.get(f"{app_url}/metrics")).text)
+        queue_samples.append(_sum(snap, "threadpool_queue_depth"))
+    after = parse_metrics((await client.get(f"{app_url}/metrics")).text)
+    cpu1, own1, wall = _proc_cpu_seconds(app_pid), time.process_time(), time.monotonic() - t0
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    requests = sum(len(v) for v in rec.latencies.values())
+    errors = sum(rec.errors.values())
+    interactive = sorted(x for k, v in rec.latencies.items() if k not in INTERACTIVE_SKIP for x in v)
+    per_kind = {
+        k: {"n": len(v), "errors": rec.errors.get(k, 0), "p50_ms": round(percentile(sorted(v), 50) * 1000, 1),
+            "p95_ms": round(percentile(sorted(v), 95) * 1000, 1)}
+        for k, v in sorted(rec.latencies.items())
+    }
+    db_buckets, db_sum, db_count = hist_delta(before, after, "db_pool_checkout_wait_seconds")
+    query_buckets, _, _ = hist_delta(before, after, "db_query_duration_seconds")
+    lag_buckets, _, _ = hist_delta(before, after, "event_loop_lag_seconds")
+    gem_buckets, _, gem_count = hist_delta(before, after, "gemini_request_duration_seconds")
+    li_buckets, _, li_count = hist_delta(before, after, "linkedin_request_duration_seconds")
+    li_429 = _sum(after, "linkedin_responses_total", status="429") - _sum(before, "linkedin_responses_total", status="429")
+    gem_errors = _sum(after, "gemini_errors_total") - _sum(before, "gemini_errors_total")
+    measured = max(1e-9, rec.window[1] - rec.window[0])
+    return {
+        "users": users,
+        "requests": requests,
+        "errors": errors,
+        "error_rate": round(errors / requests, 4) if requests else 0.0,
+        "throughput_rps": round(requests / measured, 2),
+        "actions_per_s": round(rec.actions / args.stage_seconds, 2),
+        "interactive_p95_ms": round(percentile(interactive, 95) * 1000, 1),
+        "per_request": per_kind,
+        "signals": {
+            "db_pool_wait_mean_ms": round(db_sum / db_count * 1000, 2) if db_count else 0.0,
+            "db_pool_wait_p95_ms": round(hist_quantile(db_buckets, 0.95) * 1000, 2),
+            "db_query_p95_ms": round(hist_quantile(query_buckets, 0.95) * 1000, 2),
+            "loop_lag_p95_ms": round(hist_quantile(lag_buckets, 0.95) * 1000, 2),
+            "threadpool_queue_mean": round(sum(queue_samples) / len(queue_samples), 2) if queue_samples else 0.0,
+            "threadpool_queue_max": max(queue_samples, default=0.0),
+            "threadpool_workers": _sum(after, "threadpool_max_workers"),
+            "gemini_p95_ms": round(hist_quantile(gem_buckets, 0.95) * 1000, 1),
+            "gemini_error_rate": round(gem_errors / gem_count, 4) if gem_count else 0.0,
+            "linkedin_p95_ms": round(hist_quantile(li_buckets, 0.95) * 1000, 1),
+            "linkedin_429_rate": round(li_429 / li_count, 4) if li_count else 0.0,
+            "app_cpu_pct": round((cpu1 - cpu0) / wall * 100, 1) if cpu0 is not None and cpu1 is not None else None,
+            "loadgen_cpu_pct": round((own1 - own0) / wall * 100, 1),
+        },
+    }
+
+
+def is_saturated(stage: dict, prev: dict | None, args) -> list[str]:
+    """Reasons this stage is past capacity (empty = healthy)."""
+    reasons = []
+    if stage["error_rate"] > args.max_error_rate:
+        reasons.append(f"error rate {stage['error_rate']:.1%} > {args.max_error_rate:.0%}")
+    if stage["interactive_p95_ms"] > args.slo_p95_ms:
+        reasons.append(f"interactive p95 {stage['interactive_p95_ms']:.0f} ms > SLO {args.slo_p95_ms:.0f} ms")
+    if prev and prev["throughput_rps"] > 0 and stage["users"] >= prev["users"] * 1.5:
+        gain = stage["throughput_rps"] / prev["throughput_rps"] - 1
+        if gain < 0.10:
+            reasons.append(f"throughput +{gain:.0%} for {stage['users'] / prev['users']:.1f}x users (knee)")
+    return reasons
+
+
+def diagnose(stage: dict, args) -> list[tuple[float, str, str]]:
+    """Candidate bottlenecks as (severity, name, evidence), most severe first. Severity >= 1 means over threshold."""
+    s = stage["signals"]
+    out = []
+    mean_latency_ms = max(1.0, stage["interactive_p95_ms"] / 2)
+    out.append((max(s["db_pool_wait_p95_ms"] / 50, s["db_pool_wait_mean_ms"] / (0.2 * mean_latency_ms)), "DB connection pool",
+                f"checkout wait mean {s['db_pool_wait_mean_ms']} ms, p95 {s['db_pool_wait_p95_ms']} ms "
+                "(raise pool_size/max_overflow or cut queries per request)"))
+    out.append((s["db_query_p95_ms"] / 50, "DB query time",
+                f"statement p95 {s['db_query_p95_ms']} ms (slow queries or write-lock contention; check indexes, batch writes)"))
+    workers = s["threadpool_workers"] or 1
+    out.append((max(s["threadpool_queue_mean"] / 1.0, s["threadpool_queue_max"] / workers), "thread pool (asyncio.to_thread)",
+                f"queue mean {s['threadpool_queue_mean']}, max {s['threadpool_queue_max']:.0f} with {workers:.0f} workers "
+                "(raise THREAD_POOL_WORKERS or move blocking SDK calls to async clients)"))
+    cpu = s["app_cpu_pct"]
+    cpu_note = f", app CPU {cpu:.0f}% of one core" if cpu is not None else ""
+    out.append((max(s["loop_lag_p95_ms"] / 50, (cpu or 0) / 90), "event loop / CPU",
+                f"loop lag p95 {s['loop_lag_p95_ms']} ms{cpu_note} (add uvicorn workers, move CPU work off the loop)"))
+    # Stand-ins answer in latency +- latency/5; anything above that (minus loop lag) is spent in the app's client
+    for name, observed, latency, rate, rate_name, rate_limit in (
+        ("Gemini", s["gemini_p95_ms"], args.gemini_latency_ms, s["gemini_error_rate"], "error rate", 0.02),
+        ("LinkedIn", s["linkedin_p95_ms"], args.linkedin_latency_ms, s["linkedin_429_rate"], "429 rate", 0.05),
+    ):
+        overhead = max(0.0, observed - latency * 1.2 - s["loop_lag_p95_ms"])
+        out.append((overhead / max(50.0, 0.5 * latency), f"{name} client overhead",
+                    f"p95 {observed} ms vs <= {latency * 1.2:.0f} ms from the stand-in: ~{overhead:.0f} ms per call in "
+                    "connection/client setup or waiting for the loop (reuse a pooled client)"))
+        out.append((rate / rate_limit, f"upstream {name}", f"{rate_name} {rate:.1%} (backoff/retry budget, request quota)"))
+    return sorted(out, reverse=True)
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ACTIONS:
+            raise SystemExit(f"unknown action {name!r} in --mix; choose from {', '.join(ACTIONS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+async def ramp(app_url: str, app_pid: int, args, ctx: dict) -> list[dict]:
+    mix = parse_mix(args.mix)
+    stages: list[dict] = []
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=app_url, timeout=120, limits=limits) as client:
+        await client.post("/generate", json={"user_input": "warm-up run", "skip_cache": True})
+        saturated_in_a_row = 0
+        for users in [int(u) for u in args.users.split(",")]:
+            print(f"  stage: {users} users for {args.stage_seconds:.0f}s...", flush=True)
+            stage = await run_stage(client, app_url, app_pid, users, args, mix, ctx)
+            stage["saturated"] = is_saturated(stage, stages[-1] if stages else None, args)
+            stages.append(stage)
+            saturated_in_a_row = saturated_in_a_row + 1 if stage["saturated"] else 0
+            if saturated_in_a_row >= 2:
+                break
+    return stages
+
+
+def report(stages: list[dict], args) -> dict:
+    print(f"\n{'users':>5} {'rps':>8} {'act/s':>6} {'err':>6} {'p95 ms':>8} {'dbwait':>7} {'dbq95':>6} {'lag95':>6} {'tpq':>5} {'cpu%':>5}  status")
+    for st in stages:
+        s = st["signals"]
+        status = "SATURATED: " + "; ".join(st["saturated"]) if st["saturated"] else "ok"
+        cpu = f"{s['app_cpu_pct']:.0f}" if s["app_cpu_pct"] is not None else "-"
+        print(f"{st['users']:>5} {st['throughput_rps']:>8.1f} {st['actions_per_s']:>6.1f} {st['error_rate']:>6.1%} "
+              f"{st['interactive_p95_ms']:>8.0f} {s['db_pool_wait_p95_ms']:>7.1f} {s['db_query_p95_ms']:>6.1f} {s['loop_lag_p95_ms']:>6.1f} "
+              f"{s['threadpool_queue_mean']:>5.1f} {cpu:>5}  {status}")
+
+    healthy = [st for st in stages if not st["saturated"]]
+    first_bad = next((st for st in stages if st["saturated"]), None)
+    capacity = healthy[-1] if healthy and (first_bad is None or healthy[-1]["users"] < first_bad["users"]) else None
+    focus = first_bad or stages[-1]
+    candidates = diagnose(focus, args)
+    severity, name, evidence = candidates[0]
+    bottleneck = name if severity >= 1 else None
+
+    print("\nCapacity report")
+    if capacity:
+        print(f"  capacity: {capacity['users']} concurrent users ({capacity['throughput_rps']:.1f} req/s, "
+              f"{capacity['actions_per_s']:.1f} user actions/s, interactive p95 {capacity['interactive_p95_ms']:.0f} ms)")
+    else:
+        print("  capacity: below the first stage; start with fewer users")
+    if first_bad is None:
+        print(f"  no saturation up to {stages[-1]['users']} users; extend --users")
+    else:
+        print(f"  saturates at {first_bad['users']} users: {'; '.join(first_bad['saturated'])}")
+    if bottleneck:
+        print(f"  bottleneck: {bottleneck} - {evidence}")
+    else:
+        print("  bottleneck: no server-side signal over threshold (check the load generator and DB host)")
+    for sev, other, ev in candidates[1:]:
+        if sev >= 1:
+            print(f"  also over threshold: {other} - {ev}")
+    loadgen = focus["signals"]["loadgen_cpu_pct"]
+    if loadgen > 80:
+        print(f"  warning: load generator at {loadgen:.0f}% CPU; results may be a lower bound")
+    return {
+        "capacity_users": capacity["users"] if capacity else 0,
+        "capacity_rps": capacity["throughput_rps"] if capacity else 0.0,
+        "saturated_at_users": first_bad["users"] if first_bad else None,
+        "bottleneck": bottleneck,
+        "evidence": evidence if bottleneck else None,
+        "candidates": [{"name": n, "severity": round(sv, 2), "evidence": ev} for sv, n, ev in candidates],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", default="1,2,4,8,16,32,64", help="Concurrent users per ramp stage")
+    parser.add_argument("--stage-seconds", type=float, default=20.0)
+    parser.add_argument("--think-ms", type=float, default=500.0, help="Mean think time between a user's actions")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Action weights, e.g. dashboard=55,edit=20,generate=15,publish=10")
+    parser.add_argument("--slo-p95-ms", type=float, default=1000.0, help="p95 bound for interactive requests")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--rows", type=int, default=10000, help="Seeded post_history rows")
+    parser.add_argument("--drafts", type=int, default=500)
+    parser.add_argument("--images", type=int, default=50, help="Drafts with an image file")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes (metrics are per worker)")
+    parser.add_argument("--gemini-latency-ms", type=float, default=1500.0)
+    parser.add_argument("--linkedin-latency-ms", type=float, default=150.0)
+    parser.add_argument("--linkedin-429-rate", type=float, default=0.02)
+    parser.add_argument("--postgres-url", help="Server to create a throwaway database on (default: local initdb, else SQLite)")
+    parser.add_argument("--env", action="append", default=[], help="Extra app setting, e.g. --env THREAD_POOL_WORKERS=64")
+    parser.add_argument("--out", type=Path, help="Report file (default: benchmarks/results/load-<timestamp>.json)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="load-") as tmp_dir:
+        tmp = Path(tmp_dir)
+        with DisposableDatabase(tmp, args.postgres_url) as db:
+            print(f"1. Seeding {db.kind}: {args.rows} history rows, {args.drafts} drafts, {args.images} images...", flush=True)
+            asyncio.run(seed(db.url, args.rows, drafts=args.drafts, image_dir=tmp / "storage", images=args.images))
+            gemini = StandInServer("benchmarks.fake_gemini", latency_ms=args.gemini_latency_ms, jitter_ms=args.gemini_latency_ms / 5)
+            linkedin = StandInServer("benchmarks.fake_linkedin", latency_ms=args.linkedin_latency_ms,
+                                     jitter_ms=args.linkedin_latency_ms / 5, rate_429=args.linkedin_429_rate)
+            with gemini as g, linkedin as li:
+                env = {
+                    "DATABASE_URL": db.url,
+                    "STORAGE_PATH": str(tmp / "storage"),
+                    "GEMINI_API_KEY": "fake-key",
+                    "GEMINI_BASE_URL": g.url,
+                    "LINKEDIN_API_BASE": li.url,
+                    "LINKEDIN_OAUTH_BASE": f"{li.url}/oauth/v2",
+                    "LOG_LEVEL": "WARNING",
+                    **dict(kv.split("=", 1) for kv in args.env),
+                }
+                print("2. Ramping load against the app...", flush=True)
+                with AppProcess(env, tmp / "app.log", workers=args.workers) as app_proc:
+                    stages = asyncio.run(ramp(app_proc.url, app_proc.proc.pid, args, {"drafts": args.drafts, "images": args.images}))
+            summary = report(stages, args)
+
+    out = args.out or RESULTS_DIR / f"load-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({"config": {k: str(v) for k, v in vars(args).items()}, "database": db.kind, "summary": summary, "stages": stages}, indent=2))
+    print(f"\nReport: {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
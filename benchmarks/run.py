@@ -0,0 +1,321 @@
+"""
+Offline benchmark: the app in a uvicorn subprocess against local Gemini/LinkedIn stand-ins and a
+disposable database seeded with synthetic post history. Reports throughput and p50/p95/p99 per
+scenario, writes JSON results and compares them with a baseline.
+
+Run:  python -m benchmarks.run --rows 1000 [--postgres-url postgresql://user@host/postgres]
+      python -m benchmarks.run --rows 100000 --baseline benchmarks/results/baseline.json
+      python -m benchmarks.run --rows 1000 --save-baseline
+Seed sizes used for tracking: 1k, 100k and 1M history rows.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import httpx
+
+from benchmarks.harness import PROJECT_ROOT, AppProcess, DisposableDatabase, StandInServer, seed
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+DEFAULT_BASELINE = RESULTS_DIR / "baseline.json"
+SCENARIOS = ("accounts", "analytics", "history", "drafts", "scheduled", "images", "image_ranges", "generate", "generate_variants", "publish", "scheduler_drain")
+# Lower is better for latencies, higher for throughput
+_COMPARED = (("p50_ms", 1), ("p95_ms", 1), ("p99_ms", 1), ("throughput_rps", -1))
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list (0 for empty)."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def summarize(latencies: list[float], errors: int, wall: float, statuses: Counter | None = None) -> dict:
+    lat = sorted(latencies)
+    return {
+        "requests": len(lat),
+        "errors": errors,
+        "throughput_rps": round(len(lat) / wall, 2) if wall > 0 else 0.0,
+        "p50_ms": round(percentile(lat, 50) * 1000, 2),
+        "p95_ms": round(percentile(lat, 95) * 1000, 2),
+        "p99_ms": round(percentile(lat, 99) * 1000, 2),
+        "max_ms": round((lat[-1] if lat else 0.0) * 1000, 2),
+        "statuses": dict(sorted((str(k), v) for k, v in (statuses or {}).items())),
+    }
+
+
+async def measure(
+    client: httpx.AsyncClient,
+    n: int,
+    concurrency: int,
+    request: Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]],
+) -> dict:
+    """Issue n requests from `concurrency` workers; non-2xx/3xx responses and transport errors count as errors."""
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    errors = 0
+    indexes = iter(range(n))
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in indexes:
+            t0 = time.perf_counter()
+            try:
+                resp = await request(client, i)
+                statuses[resp.status_code] += 1
+                if resp.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                statuses["transport_error"] += 1
+                errors += 1
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, n)))))
+    return summarize(latencies, errors, time.perf_counter() - start, statuses)
+
+
+async def scheduler_drain(client: httpx.AsyncClient, db_url: str, draft_ids: list[int], timeout: float) -> dict:
+    """
+    Schedule all drafts for the same instant, then time how long the APScheduler jobs take to publish them.
+    Latency per job = published_at - due time.
+    """
+    from sqlalchemy import func, select
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app.models.db_models import PostHistory
+
+    engine = create_async_engine(db_url)
+    try:
+        async with engine.connect() as conn:
+            max_id_before = (await conn.execute(select(func.max(PostHistory.id)))).scalar() or 0
+        due = datetime.now(timezone.utc) + timedelta(seconds=2 + 0.02 * len(draft_ids))
+        for draft_id in draft_ids:
+            await client.post("/publish", json={"draft_id": draft_id, "account_id": 1, "schedule_override": due.isoformat()})
+        deadline = time.monotonic() + timeout
+        pending = len(draft_ids)
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.25)
+            pending = len((await client.get("/post-history/scheduled")).json())
+            if pending == 0 and datetime.now(timezone.utc) >= due:
+                break
+        drained_at = datetime.now(timezone.utc)
+        async with engine.connect() as conn:
+            rows = (await conn.execute(select(PostHistory.published_at).where(PostHistory.id > max_id_before))).scalars().all()
+    finally:
+        await engine.dispose()
+    latencies = []
+    for published in rows:
+        if published.tzinfo is None:  # SQLite returns naive UTC
+            published = published.replace(tzinfo=timezone.utc)
+        latencies.append(max(0.0, (published - due).total_seconds()))
+    stats = summarize(latencies, errors=pending, wall=max(1e-9, (drained_at - due).total_seconds()))
+    stats["drain_seconds"] = round((drained_at - due).total_seconds(), 3)
+    stats["pending_after_timeout"] = pending
+    return stats
+
+
+async def run_scenarios(base_url: str, db_url: str, args: argparse.Namespace) -> dict[str, dict]:
+    selected = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    n, c = args.requests, args.concurrency
+    now_iso = lambda: (datetime.now(timezone.utc) - timedelta(minutes=1)).isoformat()  # noqa: E731
+    publish_ids = list(range(1, args.publish_requests + 1))
+    drain_ids = list(range(args.publish_requests + 1, args.publish_requests + args.drain_jobs + 1))
+    image_ids = [_first_image_draft(args) + 1 + k for k in range(args.images)]
+    image_url = lambda i: f"/storage/{image_ids[i % len(image_ids)]}"  # noqa: E731
+    first_kib = {"Range": "bytes=0-1023"}
+    get = lambda path: (lambda cl, i: cl.get(path))  # noqa: E731
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        # Warm-up (not measured): graph build, first queries, semantic cache
+        await client.post("/generate", json={"user_input": "warm-up run", "skip_cache": True})
+        for path in ("/accounts", "/analytics", "/post-history", "/post-history/drafts"):
+            await client.get(path)
+
+        plan: dict[str, Callable[[], Awaitable[dict]]] = {
+            "accounts": lambda: measure(client, n, c, get("/accounts")),
+            "analytics": lambda: measure(client, n, c, get("/analytics")),
+            "history": lambda: measure(client, n, c, get("/post-history")),
+            "drafts": lambda: measure(client, n, c, get("/post-history/drafts")),
+            "scheduled": lambda: measure(client, n, c, get("/post-history/scheduled")),
+            # Dashboard thumbnails: whole images, and partial fetches (resumed/probing clients)
+            "images": lambda: measure(client, n, c, lambda cl, i: cl.get(image_url(i))),
+            "image_ranges": lambda: measure(client, n, c, lambda cl, i: cl.get(image_url(i), headers=first_kib)),
+            "generate": lambda: measure(
+                client, args.generate_requests, c,
+                lambda cl, i: cl.post("/generate", json={"user_input": f"benchmark topic {i}: client feedback loops", "skip_cache": True}),
+            ),
+            # Choice in one round trip: --variants ranked sibling drafts per request
+            "generate_variants": lambda: measure(
+                client, args.generate_requests, c,
+                lambda cl, i: cl.post("/generate", json={"user_input": f"benchmark topic {i}: launch retros", "variants": args.variants}),
+            ),
+            "publish": lambda: measure(
+                client, len(publish_ids), c,
+                lambda cl, i: cl.post("/publish", json={"draft_id": publish_ids[i], "account_id": 1, "schedule_override": now_iso()}),
+            ),
+            "scheduler_drain": lambda: scheduler_drain(client, db_url, drain_ids, timeout=60 + args.drain_jobs),
+        }
+        results = {}
+        for name in selected:
+            if name not in plan:
+                raise SystemExit(f"unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+            print(f"  running {name}...", flush=True)
+            results[name] = await plan[name]()
+    return results
+
+
+def _first_image_draft(args: argparse.Namespace) -> int:
+    """Index of the first seeded draft with an image (after the drafts the publish/drain scenarios use)."""
+    return args.publish_requests + args.drain_jobs + 10
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Print a comparison table; return descriptions of regressions beyond tolerance."""
+    regressions = []
+    print(f"\n{'scenario':<16} {'metric':<15} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, stats in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        for metric, direction in _COMPARED:
+            old, new = base.get(metric), stats.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = change * direction > tolerance
+            flag = "  REGRESSION" if worse else ""
+            print(f"{name:<16} {metric:<15} {old:>10.2f} {new:>10.2f} {change:>+7.1%}{flag}")
+            if worse:
+                regressions.append(f"{name}.{metric} {change:+.1%}")
+    if baseline.get("meta", {}).get("rows") != current["meta"]["rows"]:
+        print(f"\nnote: baseline was seeded with {baseline.get('meta', {}).get('rows')} rows, this run with {current['meta']['rows']}")
+    return regressions
+
+
+def _model_latencies(specs: list[str]) -> dict[str, float]:
+    latencies = {}
+    for spec in specs:
+        model, _, ms = spec.partition("=")
+        latencies[model.strip()] = float(ms)
+    return latencies
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="Seeded post_history rows (1000 / 100000 / 1000000)")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per list/analytics scenario")
+    parser.add_argument("--generate-requests", type=int, default=40)
+    parser.add_argument("--variants", type=int, default=3, help="Drafts per request in generate_variants")
+    parser.add_argument("--publish-requests", type=int, default=40)
+    parser.add_argument("--drain-jobs", type=int, default=50, help="Scheduled posts due at once for scheduler_drain")
+    parser.add_argument("--images", type=int, default=20, help="Drafts with an image file for the image scenarios")
+    parser.add_argument("--image-kb", type=int, default=1024, help="Size of each seeded image")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--gemini-latency-ms", type=float, default=300.0)
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-malformed-rate", type=float, default=0.0, help="Fraction of Gemini text responses cut off or fenced")
+    parser.add_argument(
+        "--gemini-model-latency", action="append", default=[], metavar="MODEL=MS",
+        help="Latency of one Gemini model (repeatable), e.g. a slow primary to exercise hedging",
+    )
+    parser.add_argument("--linkedin-latency-ms", type=float, default=120.0)
+    parser.add_argument("--linkedin-429-rate", type=float, default=0.05)
+    parser.add_argument("--postgres-url", help="Server to create a throwaway database on (default: local initdb, else SQLite)")
+    parser.add_argument("--out", type=Path, help="Results file (default: benchmarks/results/<timestamp>-<rows>.json)")
+    parser.add_argument("--baseline", type=Path, help="Compare with this results file")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Also write results to {DEFAULT_BASELINE.relative_to(PROJECT_ROOT)}")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Relative change counted as a regression")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp_dir:
+        tmp = Path(tmp_dir)
+        with DisposableDatabase(tmp, args.postgres_url) as db:
+            print(f"1. Seeding {db.kind} with {args.rows} history rows...", flush=True)
+            t0 = time.perf_counter()
+            first_image = _first_image_draft(args)
+            asyncio.run(seed(
+                db.url, args.rows, drafts=first_image + args.images,
+                image_dir=tmp / "storage", images=args.images, image_bytes=args.image_kb * 1024, first_image=first_image,
+            ))
+            seed_seconds = time.perf_counter() - t0
+            print(f"  seeded in {seed_seconds:.1f}s")
+
+            gemini = StandInServer("benchmarks.fake_gemini", latency_ms=args.gemini_latency_ms, error_rate=args.gemini_error_rate,
+                                    malformed_rate=args.gemini_malformed_rate,
+                                    model_latency_ms=_model_latencies(args.gemini_model_latency))
+            linkedin = StandInServer("benchmarks.fake_linkedin", latency_ms=args.linkedin_latency_ms, rate_429=args.linkedin_429_rate)
+            with gemini as g, linkedin as li:
+                env = {
+                    "DATABASE_URL": db.url,
+                    "STORAGE_PATH": str(tmp / "storage"),
+                    "GEMINI_API_KEY": "fake-key",
+                    "GEMINI_BASE_URL": g.url,
+                    "LINKEDIN_API_BASE": li.url,
+                    "LINKEDIN_OAUTH_BASE": f"{li.url}/oauth/v2",
+                    "LOG_LEVEL": "WARNING",
+                }
+                print("2. Starting app against local stand-ins...", flush=True)
+                with AppProcess(env, tmp / "app.log") as app_proc:
+                    scenarios = asyncio.run(run_scenarios(app_proc.url, db.url, args))
+                stand_ins = {"gemini_calls": g.stats(), "linkedin_calls": li.stats()}
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "rows": args.rows,
+            "database": db.kind,
+            "concurrency": args.concurrency,
+            "images": args.images,
+            "image_kb": args.image_kb,
+            "seed_seconds": round(seed_seconds, 2),
+            "gemini_latency_ms": args.gemini_latency_ms,
+            "linkedin_latency_ms": args.linkedin_latency_ms,
+            "linkedin_429_rate": args.linkedin_429_rate,
+            "python": platform.python_version(),
+            **stand_ins,
+        },
+        "scenarios": scenarios,
+    }
+    print(f"\n{'scenario':<16} {'req':>5} {'err':>4} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, s in scenarios.items():
+        print(f"{name:<16} {s['requests']:>5} {s['errors']:>4} {s['throughput_rps']:>8.1f} {s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} {s['p99_ms']:>9.1f}")
+
+    out = args.out or RESULTS_DIR / f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}-{args.rows}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2))
+    print(f"\nResults: {out}")
+    if args.save_baseline:
+        DEFAULT_BASELINE.write_text(json.dumps(results, indent=2))
+        print(f"Baseline: {DEFAULT_BASELINE}")
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+        if regressions:
+            print(f"\nRegressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+        print("\nNo regressions beyond tolerance.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
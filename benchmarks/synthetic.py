@@ -0,0 +1,468 @@
+"""
+Deterministic synthetic data for scale testing analytics and scheduling: many LinkedInAccounts with
+PostHistory, PostDraft and ScheduledPost rows, plus the StrategyDecision/InsightsSnapshot rows drafts and
+generated posts point to. Posting times, engagement, text length, hashtag usage and strategy follow
+realistic shapes (weekday/hour peaks, lognormal reach, a word-count sweet spot, better and worse strategy
+options), so analytics and the strategy bandit have real signal to find. Postgres is loaded with COPY;
+SQLite falls back to batched inserts.
+
+The same --seed, --now and --batch always produce the same rows, whatever the number of worker processes:
+every batch has its own random stream, so changing one table's size leaves the others identical.
+
+Run:  python -m benchmarks.synthetic --database-url postgresql+asyncpg://user@host/db --history 1000000
+      python -m benchmarks.synthetic --accounts 200 --history 5000000 --drafts 200000 --scheduled 100000 --truncate
+"""
+import argparse
+import asyncio
+import math
+import multiprocessing
+import os
+import random
+import time
+from bisect import bisect
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate, product
+from typing import Any, Awaitable, Callable
+
+from app.services.provenance import canonical_json, content_hash
+from app.services.strategy_bandit import HOOK_STYLE_STRUCTURE, STRATEGY_OPTIONS
+from app.utils.post_features import extract_post_features
+
+DEFAULT_NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+TABLES = (
+    "linkedin_accounts", "insights_snapshots", "strategy_decisions", "post_drafts", "post_history", "scheduled_posts",
+)
+
+# Share of posts made on each weekday (Mon..Sun) and the engagement multiplier for posting then
+WEEKDAY_POST_WEIGHTS = (0.16, 0.2, 0.2, 0.18, 0.14, 0.06, 0.06)
+WEEKDAY_ENGAGEMENT = (0.95, 1.15, 1.2, 1.1, 0.85, 0.6, 0.55)
+# Hour of day (UTC): posting clusters around the commute, lunch and end of day; mornings engage best
+HOUR_POST_WEIGHTS = (0.2, 0.1, 0.1, 0.1, 0.2, 0.5, 1.5, 3.5, 6, 6.5, 4.5, 3, 4, 3, 2.5, 2.5, 3, 3.5, 2.5, 1.5, 1, 0.8, 0.5, 0.3)
+HOUR_ENGAGEMENT = (0.5, 0.45, 0.4, 0.4, 0.45, 0.6, 0.8, 1.05, 1.25, 1.3, 1.15, 1.0, 1.1, 1.0, 0.95, 0.9, 0.95, 1.05, 1.0, 0.9, 0.8, 0.7, 0.6, 0.55)
+HOOK_STYLE_WEIGHTS = {"question": 0.25, "stat": 0.25, "story": 0.2, "emoji": 0.1, "statement": 0.2}
+HOOK_STYLE_ENGAGEMENT = {"question": 1.15, "stat": 1.2, "story": 1.1, "emoji": 0.9, "statement": 0.85}
+# Hashtag count 0..8; 3-5 is the common (and best performing) range
+HASHTAG_COUNT_WEIGHTS = (0.06, 0.07, 0.12, 0.22, 0.22, 0.16, 0.08, 0.04, 0.03)
+# Published posts that came from a generated draft (with a strategy); the rest were written by hand
+STRATEGY_SHARE = 0.6
+# Engagement multiplier per strategy option; hook_structure follows the hook itself (HOOK_STYLE_ENGAGEMENT)
+STRATEGY_ENGAGEMENT = {
+    "post_type": {"founder_pov": 1.05, "story": 1.15, "data_driven": 1.1, "how_to": 0.95},
+    "tone": {"conversational": 1.1, "bold": 1.0, "reflective": 0.9},
+    "cta_type": {"question": 1.15, "opinion": 1.0, "resource": 0.9},
+}
+INSIGHTS_SNAPSHOTS = 24
+
+_HOOKS = {
+    "question": ("Why do most {topic} projects slip past the deadline?", "What would you change about your {topic} process?",
+                 "Is {topic} overrated for small studios?"),
+    "stat": ("{n} lessons from {n2} years of {topic}", "We cut our {topic} turnaround by {n}0%.",
+             "{n} out of 10 clients ask for the same {topic} fix."),
+    "story": ("Last week a client asked us to redo the {topic} overnight.", "I almost quit {topic} in my first year.",
+              "We lost our biggest {topic} client. Here is what happened."),
+    "emoji": ("🎬 Behind the scenes of our {topic} day", "🚀 Shipping {topic} faster without burning out",
+              "✨ A small {topic} habit that changed everything"),
+    "statement": ("Most studios get {topic} feedback wrong.", "Good {topic} starts before the camera rolls.",
+                  "Clients don't buy {topic}, they buy outcomes."),
+}
+_TOPICS = ("editing", "color grading", "sound design", "storyboarding", "client onboarding", "brand film",
+           "post-production", "motion graphics", "scripting", "delivery", "revision", "pitching")
+_SENTENCES = (
+    "Clear briefs save more time than fast editors.", "We now lock the story before anyone opens the timeline.",
+    "Every revision round gets one owner and one deadline.", "Proxies made remote review painless for the whole team.",
+    "The best hook is usually the line the client wanted to cut.", "Sound design is the cheapest quality upgrade you can make.",
+    "Templates are a starting point, not a strategy.", "Short feedback loops beat long approval chains.",
+    "A shared shot list ends most arguments before they start.", "Budget conversations get easier with three clear options.",
+    "Our best work came from the projects with the tightest constraints.", "Nobody remembers the transition; everyone remembers the story.",
+    "We stopped promising same-day turnarounds and our quality went up.", "The first five seconds decide whether anyone stays.",
+)
+_CTAS = ("What would you add?", "How does your team handle this?", "Agree or disagree?", "Save this for your next project.",
+         "Follow for more behind-the-scenes notes.")
+_WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+_TIME_RANGES = ("07:00-09:00", "08:00-10:00", "12:00-14:00", "16:00-18:00", "18:00-20:00")
+_HASHTAGS = ("#ContentCreation", "#FounderLife", "#VideoProduction", "#ReeloomStudios", "#Marketing", "#Storytelling",
+             "#PostProduction", "#CreativeAgency", "#Filmmaking", "#SmallBusiness", "#Branding", "#VideoEditing")
+
+
+@dataclass(frozen=True)
+class Spec:
+    accounts: int = 20
+    history: int = 100_000
+    drafts: int = 10_000
+    scheduled: int = 5_000
+    seed: int = 7
+    now: datetime = DEFAULT_NOW
+    days: int = 730  # history spans this many days before `now`
+    batch: int = 20_000
+
+
+class _Picker:
+    """Weighted choice via a precomputed cumulative table (much faster than rng.choices per row)."""
+
+    def __init__(self, items, weights):
+        self.items = tuple(items)
+        self.cum = list(accumulate(weights))
+
+    def __call__(self, rng: random.Random):
+        return self.items[bisect(self.cum, rng.random() * self.cum[-1])]
+
+
+_weekday = _Picker(range(7), WEEKDAY_POST_WEIGHTS)
+_hour = _Picker(range(24), HOUR_POST_WEIGHTS)
+_hook_style = _Picker(HOOK_STYLE_WEIGHTS, HOOK_STYLE_WEIGHTS.values())
+_hashtag_count = _Picker(range(len(HASHTAG_COUNT_WEIGHTS)), HASHTAG_COUNT_WEIGHTS)
+
+
+def _stream(spec: Spec, table: str) -> random.Random:
+    return random.Random(f"{spec.seed}:{table}")
+
+
+def _post_parts(rng: random.Random) -> tuple[str, str, str, str]:
+    """(hook, body, cta, hashtags); body length is lognormal around ~150 words."""
+    style = _hook_style(rng)
+    hooks = _HOOKS[style]
+    hook = hooks[int(rng.random() * len(hooks))].format(
+        topic=_TOPICS[int(rng.random() * len(_TOPICS))], n=2 + int(rng.random() * 8), n2=2 + int(rng.random() * 14)
+    )
+    sentences = rng.choices(_SENTENCES, k=max(2, min(60, int(rng.lognormvariate(math.log(14), 0.6)))))
+    paras, i = [], 0
+    while i < len(sentences):
+        k = 1 + int(rng.random() * 3)
+        paras.append(" ".join(sentences[i:i + k]))
+        i += k
+    hashtags = " ".join(rng.sample(_HASHTAGS, _hashtag_count(rng)))
+    return hook, "\n\n".join(paras), _CTAS[int(rng.random() * len(_CTAS))], hashtags
+
+
+def _slot(rng: random.Random, start: datetime, days: int) -> datetime:
+    """A time in [start, start + days) with realistic weekday/hour posting weights."""
+    day = start + timedelta(days=int(rng.random() * days))
+    # Move to the nearest following day with the sampled weekday (keeps the span, reshapes the distribution)
+    day += timedelta(days=(_weekday(rng) - day.weekday()) % 7)
+    if day >= start + timedelta(days=days):
+        day -= timedelta(days=7)
+    return day.replace(hour=_hour(rng), minute=int(rng.random() * 60), second=int(rng.random() * 60), microsecond=0)
+
+
+def _length_factor(word_count: int) -> float:
+    """Engagement peaks for ~120-250 word posts and falls off for very short or very long ones."""
+    return math.exp(-((math.log(max(word_count, 1)) - math.log(180)) ** 2) / 0.8) * 0.5 + 0.6
+
+
+def _hashtag_factor(count: int) -> float:
+    return (0.85, 0.9, 0.97, 1.05, 1.05, 1.0, 0.92, 0.85, 0.8)[min(count, 8)]
+
+
+def account_rows(spec: Spec) -> list[dict[str, Any]]:
+    rng = _stream(spec, "accounts")
+    rows = []
+    for i in range(1, spec.accounts + 1):
+        company = rng.random() < 0.3
+        created = spec.now - timedelta(days=spec.days + rng.randrange(30, 400))
+        rows.append({
+            "id": i,
+            "account_type": "company" if company else "personal",
+            "display_name": f"{'Studio' if company else 'Member'} {i:05d}",
+            "linkedin_urn": f"urn:li:{'organization' if company else 'person'}:synthetic{i:07d}",
+            "access_token": f"synthetic-access-{rng.getrandbits(64):016x}",
+            "refresh_token": f"synthetic-refresh-{rng.getrandbits(64):016x}",
+            "token_expires_at": spec.now + timedelta(days=rng.randrange(1, 60)),
+            "is_active": rng.random() < 0.95,
+            "created_at": created,
+            "updated_at": created,
+        })
+    return rows
+
+
+# strategy_decisions: every combination of options, ids in this order
+_STRATEGIES = [dict(zip(STRATEGY_OPTIONS, combo)) for combo in product(*STRATEGY_OPTIONS.values())]
+_STRATEGY_IDS = {tuple(s.values()): i for i, s in enumerate(_STRATEGIES, 1)}
+
+
+def _provenance_rows(payloads: list[dict[str, Any]], created: datetime) -> list[dict[str, Any]]:
+    rows = []
+    for i, payload in enumerate(payloads, 1):
+        text = canonical_json(payload)
+        rows.append({"id": i, "content_hash": content_hash(text), "payload": text, "created_at": created})
+    return rows
+
+
+def strategy_rows(spec: Spec) -> list[dict[str, Any]]:
+    return _provenance_rows(_STRATEGIES, spec.now - timedelta(days=spec.days))
+
+
+def insights_rows(spec: Spec) -> list[dict[str, Any]]:
+    """Distinct performance insights (as the performance agent reports them) that generations ran with."""
+    rng = _stream(spec, "insights")
+    payloads, seen = [], set()
+    while len(payloads) < INSIGHTS_SNAPSHOTS:
+        payload = {
+            "best_days": sorted(rng.sample(_WEEKDAYS[:5], 3), key=_WEEKDAYS.index),
+            "best_time_ranges": sorted(rng.sample(_TIME_RANGES, 2)),
+            "ideal_length": f"{rng.randrange(120, 200, 10)}-{rng.randrange(200, 280, 10)} words",
+            "top_topics": rng.sample(_TOPICS, 3),
+            "hook_style_pattern": rng.choice(("question", "stat", "story", "statement")),
+        }
+        key = canonical_json(payload)
+        if key not in seen:
+            seen.add(key)
+            payloads.append(payload)
+    return _provenance_rows(payloads, spec.now - timedelta(days=spec.days))
+
+
+@lru_cache(maxsize=4)
+def _account_profiles(spec: Spec) -> tuple[list[tuple[float, float]], _Picker]:
+    """Per-account (audience size, base engagement rate) and a picker weighting accounts by posting cadence."""
+    rng = _stream(spec, "profiles")
+    profiles, cadence = [], []
+    for _ in range(spec.accounts):
+        profiles.append((rng.lognormvariate(math.log(2500), 1.0), rng.lognormvariate(math.log(0.025), 0.4)))
+        cadence.append(rng.lognormvariate(0, 0.8))
+    return profiles, _Picker(range(1, spec.accounts + 1), cadence)
+
+
+def _id_range(spec: Spec, total: int, index: int) -> range:
+    return range(index * spec.batch + 1, min(total, (index + 1) * spec.batch) + 1)
+
+
+def history_batch(spec: Spec, index: int) -> list[dict[str, Any]]:
+    """
+    Batch `index` of post_history (ids index*batch+1...), with feature columns filled from the text. A
+    STRATEGY_SHARE of posts carry the strategy they were generated with; its hook structure matches the hook.
+    """
+    rng = _stream(spec, f"history:{index}")
+    strategy_rng = _stream(spec, f"history-strategy:{index}")  # own stream: the other columns stay as they were
+    profiles, pick_account = _account_profiles(spec)
+    start = spec.now - timedelta(days=spec.days)
+    rows = []
+    for row_id in _id_range(spec, spec.history, index):
+        account_id = pick_account(rng)
+        audience, base_rate = profiles[account_id - 1]
+        hook, body, cta, hashtags = _post_parts(rng)
+        text = f"{hook}\n\n{body}\n\n{cta}" + (f"\n\n{hashtags}" if hashtags else "")
+        features = extract_post_features(text)
+        published = _slot(rng, start, spec.days)
+        timing = WEEKDAY_ENGAGEMENT[published.weekday()] * HOUR_ENGAGEMENT[published.hour]
+        quality = (HOOK_STYLE_ENGAGEMENT[features["hook_style"]] * _length_factor(features["word_count"])
+                   * _hashtag_factor(features["hashtag_count"]))
+        strategy_id = None
+        if strategy_rng.random() < STRATEGY_SHARE:
+            strategy = {dim: options[int(strategy_rng.random() * len(options))] for dim, options in STRATEGY_OPTIONS.items()}
+            strategy["hook_structure"] = HOOK_STYLE_STRUCTURE.get(features["hook_style"], strategy["hook_structure"])
+            quality *= math.prod(factors[strategy[dim]] for dim, factors in STRATEGY_ENGAGEMENT.items())
+            strategy_id = _STRATEGY_IDS[tuple(strategy.values())]
+        impressions = int(audience * rng.uniform(0.1, 0.4) * timing * quality ** 2 * rng.lognormvariate(0, 0.5)) + 20
+        rate = min(0.3, max(0.001, base_rate * timing * quality * rng.lognormvariate(0, 0.35)))
+        rows.append({
+            "id": row_id,
+            "account_id": account_id,
+            "content_text": text,
+            "linkedin_post_id": f"urn:li:share:synthetic{row_id}",
+            "impressions": impressions,
+            "engagement_rate": round(rate, 5),
+            "published_at": published,
+            "created_at": published,
+            "strategy_id": strategy_id,
+            **features,
+        })
+    return rows
+
+
+def draft_batch(spec: Spec, index: int) -> list[dict[str, Any]]:
+    """Drafts from the last 90 days; most record the insights and strategy they were generated with."""
+    rng = _stream(spec, f"drafts:{index}")
+    provenance_rng = _stream(spec, f"drafts-provenance:{index}")
+    rows = []
+    for i in _id_range(spec, spec.drafts, index):
+        hook, body, cta, hashtags = _post_parts(rng)
+        created = spec.now - timedelta(seconds=int(rng.random() * 90 * 86400))
+        generated = provenance_rng.random() < 0.9
+        rows.append({
+            "id": i, "hook": hook, "body": body, "cta": cta, "hashtags": hashtags,
+            "suggested_visual": "Editing timeline on a monitor, soft daylight." if rng.random() < 0.6 else None,
+            "insights_id": 1 + int(provenance_rng.random() * INSIGHTS_SNAPSHOTS) if generated else None,
+            "strategy_id": 1 + int(provenance_rng.random() * len(_STRATEGIES)) if generated else None,
+            "created_at": created, "updated_at": created,
+        })
+    return rows
+
+
+def scheduled_batch(spec: Spec, index: int) -> list[dict[str, Any]]:
+    """Mostly past jobs (published, some failed) plus a pending backlog over the next 30 days."""
+    rng = _stream(spec, f"scheduled:{index}")
+    rows = []
+    for i in _id_range(spec, spec.scheduled, index):
+        if rng.random() < 0.2:
+            at, status = _slot(rng, spec.now, 30), "pending"
+        else:
+            at = _slot(rng, spec.now - timedelta(days=90), 90)
+            status = "failed" if rng.random() < 0.04 else "published"
+        rows.append({
+            "id": i,
+            "draft_id": rng.randint(1, spec.drafts),
+            "account_id": rng.randint(1, spec.accounts),
+            "scheduled_at": at,
+            "status": status,
+            "created_at": at - timedelta(hours=rng.randint(1, 24 * 14)),
+        })
+    return rows
+
+
+def _account_batch(spec: Spec, index: int) -> list[dict[str, Any]]:
+    return account_rows(spec)
+
+
+def _insights_batch(spec: Spec, index: int) -> list[dict[str, Any]]:
+    return insights_rows(spec)
+
+
+def _strategy_batch(spec: Spec, index: int) -> list[dict[str, Any]]:
+    return strategy_rows(spec)
+
+
+# ----- Loading -----
+Writer = Callable[[str, list[dict[str, Any]]], Awaitable[None]]
+
+
+async def _load_table(
+    table: str, make_batch: Callable[[Spec, int], list[dict[str, Any]]], spec: Spec, batches: int,
+    write: Writer, pool: ProcessPoolExecutor, depth: int,
+) -> int:
+    """Generate up to `depth` batches ahead in worker processes and write them in order."""
+    loop = asyncio.get_running_loop()
+    ahead = deque()
+    total = 0
+    for index in range(batches):
+        ahead.append(loop.run_in_executor(pool, make_batch, spec, index))
+        if len(ahead) > depth:
+            rows = await ahead.popleft()
+            await write(table, rows)
+            total += len(rows)
+    while ahead:
+        rows = await ahead.popleft()
+        await write(table, rows)
+        total += len(rows)
+    return total
+
+
+async def _reset_sequences_pg(conn) -> None:
+    for table in TABLES:
+        await conn.execute(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)"
+        )
+
+
+async def load(
+    url: str, spec: Spec, truncate: bool = False, workers: int | None = None, report: Callable[[str], None] = print,
+) -> dict[str, float]:
+    """
+    Create missing tables and load `spec` into the database at `url` (SQLAlchemy async URL), generating
+    rows in `workers` processes (default: CPU count). Ids start at 1, so the target tables must be empty
+    (or pass truncate=True). Returns rows/second per table.
+    """
+    from sqlalchemy import insert, text
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app.models.db_models import Base
+
+    if spec.scheduled and (not spec.drafts or not spec.accounts):
+        raise ValueError("scheduled posts need at least one draft and one account")
+    if spec.history and not spec.accounts:
+        raise ValueError("post history needs at least one account")
+    postgres = url.startswith("postgresql")
+    engine = create_async_engine(url)
+    rates: dict[str, float] = {}
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            if truncate:
+                if postgres:
+                    await conn.execute(text(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE"))
+                else:
+                    for table in reversed(TABLES):
+                        await conn.execute(text(f"DELETE FROM {table}"))
+
+        if postgres:
+            import asyncpg
+
+            dsn = url.replace("postgresql+asyncpg://", "postgresql://", 1)
+            pg = await asyncpg.connect(dsn)
+
+            async def write(table: str, rows: list[dict[str, Any]]) -> None:
+                columns = list(rows[0])
+                await pg.copy_records_to_table(table, records=[tuple(r.values()) for r in rows], columns=columns)
+        else:
+            pg = None
+            tables = Base.metadata.tables
+
+            async def write(table: str, rows: list[dict[str, Any]]) -> None:
+                async with engine.begin() as conn:
+                    await conn.execute(insert(tables[table]), rows)
+
+        workers = workers or os.cpu_count() or 1
+        pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            plan = (
+                ("linkedin_accounts", _account_batch, 1 if spec.accounts else 0),
+                ("insights_snapshots", _insights_batch, 1),
+                ("strategy_decisions", _strategy_batch, 1),
+                ("post_drafts", draft_batch, -(-spec.drafts // spec.batch)),
+                ("post_history", history_batch, -(-spec.history // spec.batch)),
+                ("scheduled_posts", scheduled_batch, -(-spec.scheduled // spec.batch)),
+            )
+            for table, make_batch, batches in plan:
+                t0 = time.perf_counter()
+                n = await _load_table(table, make_batch, spec, batches, write, pool, workers)
+                elapsed = time.perf_counter() - t0
+                rates[table] = round(n / elapsed, 1) if elapsed and n else 0.0
+                report(f"  {table:<18} {n:>10} rows in {elapsed:6.1f}s ({rates[table]:,.0f} rows/s)")
+            if pg is not None:
+                await _reset_sequences_pg(pg)
+                await pg.execute(f"ANALYZE {', '.join(TABLES)}")
+        finally:
+            pool.shutdown(cancel_futures=True)
+            if pg is not None:
+                await pg.close()
+    finally:
+        await engine.dispose()
+    return rates
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="SQLAlchemy async URL (default: DATABASE_URL from settings)")
+    parser.add_argument("--accounts", type=int, default=Spec.accounts)
+    parser.add_argument("--history", type=int, default=Spec.history, help="post_history rows")
+    parser.add_argument("--drafts", type=int, default=Spec.drafts)
+    parser.add_argument("--scheduled", type=int, default=Spec.scheduled)
+    parser.add_argument("--seed", type=int, default=Spec.seed)
+    parser.add_argument("--now", type=datetime.fromisoformat, default=DEFAULT_NOW,
+                        help="Reference time; history ends and the pending backlog starts here (ISO 8601)")
+    parser.add_argument("--days", type=int, default=Spec.days, help="Days of history before --now")
+    parser.add_argument("--batch", type=int, default=Spec.batch, help="Rows per COPY/insert batch")
+    parser.add_argument("--workers", type=int, help="Generator processes (default: CPU count)")
+    parser.add_argument("--truncate", action="store_true", help="Empty the loaded tables first")
+    args = parser.parse_args()
+
+    url = args.database_url
+    if not url:
+        from app.config import settings
+
+        url = settings.database_url
+    if not url:
+        parser.error("set --database-url or DATABASE_URL")
+    now = args.now if args.now.tzinfo else args.now.replace(tzinfo=timezone.utc)
+    spec = Spec(args.accounts, args.history, args.drafts, args.scheduled, args.seed, now, args.days, args.batch)
+    print(f"Loading seed={spec.seed} now={now.isoformat()} into {url.split('@')[-1]}", flush=True)
+    t0 = time.perf_counter()
+    asyncio.run(load(url, spec, truncate=args.truncate, workers=args.workers))
+    print(f"Done in {time.perf_counter() - t0:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,296 @@
+"""
+Event-loop blocking check: drive every route in-process and fail if any request stalls the loop past a budget
+(or answers with a server error). Not driven: the admin profiler (off unless PROFILING_ENABLED) and the
+LinkedIn OAuth callback (needs a real authorization code).
+Gemini is replaced by local stubs (run in worker threads like the real calls) that return posts of realistic
+length (~400 words, so dedup and the semantic cache do real work); the LinkedIn API is answered by a local
+transport under the real service code. The DB is DATABASE_URL, or a throwaway SQLite file when DATABASE_URL
+is unset (needs aiosqlite).
+Run: python check_event_loop.py [--budget-ms 100]
+"""
+import argparse
+import asyncio
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# 1x1 PNG written by the image stub
+_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082"
+)
+
+# Post bodies are drawn from these, seeded by the prompt: ~400 words, different per topic
+_SENTENCES = (
+    "Last spring our average turnaround from final shoot day to delivered cut was eleven working days.",
+    "Clients never complained out loud, but the follow-up emails told us everything we needed to know.",
+    "We assumed the bottleneck was editing time, so we hired another editor and nothing really changed.",
+    "When we finally mapped every handoff on a whiteboard, the edit itself was less than a third of the calendar.",
+    "Most of the waiting happened between people, not inside anyone's actual work.",
+    "Footage sat on a card in a drawer for a day because nobody owned the offload after a long shoot.",
+    "Proxies were generated overnight, which meant the editor started a full day later than necessary.",
+    "Feedback arrived as screenshots, voice notes and long email threads that contradicted each other.",
+    "Our producers spent hours translating vague comments into timecoded notes the editor could act on.",
+    "Colour and sound were booked only after picture lock, and their calendars were rarely free that week.",
+    "So we changed three things, and none of them involved buying new software or faster machines.",
+    "First, the camera assistant now offloads and verifies every card before leaving the set.",
+    "Proxies render on the same machine during the drive back, so the edit can begin the next morning.",
+    "Second, every client review happens in one shared link with comments pinned to exact frames.",
+    "We ask for one consolidated round of notes per stakeholder group, with a named person who signs off.",
+    "That single rule removed more back-and-forth than anything else we tried this year.",
+    "Third, colour and sound are booked on the day we start the edit, not the day we finish it.",
+    "They pick up reels while picture is still moving, and the final conform takes hours instead of days.",
+    "We also stopped sending rough cuts that were not ready, because half-finished work invites redesigns.",
+    "Instead, editors share a short written plan with the structure and the music direction first.",
+    "Clients react to the plan in minutes, and the first real cut lands much closer to what they wanted.",
+    "None of this was glamorous, and some of the team worried it would feel bureaucratic.",
+    "In practice it felt lighter, because fewer people were waiting on answers they could not get.",
+    "Our editors told us the biggest change was being able to finish a thought before the next interruption.",
+    "The producers got their evenings back, which matters more to retention than any bonus we could offer.",
+    "Average turnaround is now five and a half working days, and the spread between projects is much smaller.",
+    "Revision rounds dropped from three and a bit to just under two per project on average.",
+    "The most surprising result was that clients started booking the next project before the current one shipped.",
+    "Speed turned out to be a trust signal, not just a convenience for people with tight launch dates.",
+    "If you run a small production team, look at the gaps between tasks before you look at the tasks.",
+    "Write down who owns each handoff, because unowned steps are where whole days quietly disappear.",
+    "Book your specialists early, even if it feels premature, since rescheduling costs less than waiting.",
+    "Put every note in one place, tied to a frame, with one person accountable for the final word.",
+    "And share a plan before a cut, because agreeing on intent is faster than arguing about pixels.",
+    "We are still experimenting with remote review sessions for larger campaigns with many stakeholders.",
+    "Early signs are good, but live sessions need a firm agenda or they turn into open-ended brainstorms.",
+    "Next quarter we want to measure how much time the pre-edit plan saves on longer documentary work.",
+    "Documentaries are harder because the story is found in the edit, so the plan has to stay looser.",
+    "We will share what we learn, including the parts that do not work as well as we hoped.",
+    "Process changes rarely make for exciting posts, but they are where most of our gains came from this year.",
+)
+
+
+def _stub_body(topic: str) -> str:
+    rng = random.Random(topic)
+    return " ".join(rng.sample(_SENTENCES, 30))
+
+
+def _configure_env(budget_ms: float, tmp: Path) -> bool:
+    """Settings are read at import, so set them before importing app. False if no usable DB."""
+    os.environ["LOOP_MONITOR_ENABLED"] = "true"
+    os.environ["LOOP_MONITOR_INTERVAL_MS"] = "20"
+    os.environ["LOOP_STALL_THRESHOLD_MS"] = str(int(budget_ms))
+    os.environ["WARMUP_ON_STARTUP"] = "false"  # cold paths (graph build, numpy) must not block either
+    os.environ["STORAGE_PATH"] = str(tmp / "storage")
+    if not os.environ.get("DATABASE_URL"):
+        try:
+            import aiosqlite  # noqa: F401
+        except ImportError:
+            return False
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tmp / 'check_event_loop.db'}"
+    return True
+
+
+def _stub_gemini() -> None:
+    import app.routes.history as history_routes
+    from app.services import gemini_service
+
+    def fake_post(topic: str) -> dict[str, str]:
+        return {
+            "hook": f"What nobody tells you about this: {topic.splitlines()[0][:80]}?",
+            "body": _stub_body(topic),
+            "cta": "What would you add?",
+            "hashtags": "#video #production #workflow",
+            "suggested_visual": "Editing timeline on a monitor",
+        }
+
+    def fake_text(user_context, *args, **kwargs):
+        time.sleep(0.05)  # runs in a worker thread, like the real call
+        return fake_post(user_context)
+
+    def fake_variants(user_context, analytics_summary, strategy, brand=None, n=1):
+        time.sleep(0.05)
+        return [fake_post(f"{user_context} ({i})") for i in range(n)]
+
+    def fake_image(hook, body, suggested_visual, output_path, brand=None):
+        time.sleep(0.05)
+        out = Path(output_path)
+        out.write_bytes(_PNG)
+        return out, None
+
+    gemini_service.generate_post_text = fake_text
+    gemini_service.generate_post_variants = fake_variants
+    gemini_service.generate_image = fake_image
+    history_routes.generate_image = fake_image
+
+
+def _stub_linkedin() -> None:
+    """Answer the LinkedIn API (asset register, image upload, UGC post) locally; the service code runs as is."""
+    import httpx
+
+    from app.services import linkedin_service
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await request.aread()  # consume the streamed image upload
+        await asyncio.sleep(0.02)
+        if "registerUpload" in str(request.url):
+            mechanism = {"uploadUrl": "https://upload.check/image", "headers": {}}
+            return httpx.Response(200, json={"value": {
+                "asset": "urn:li:digitalmediaAsset:check",
+                "uploadMechanism": {"com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest": mechanism},
+            }})
+        if request.method == "PUT":
+            return httpx.Response(201)
+        return httpx.Response(201, headers={"X-RestLi-Id": "urn:li:share:check"})
+
+    def client() -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        c = linkedin_service._clients.get(loop)
+        if c is None or c.is_closed:
+            c = linkedin_service._clients[loop] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return c
+
+    linkedin_service._client = client
+
+
+class _GCTimer:
+    """Wall time spent in garbage collection (any thread: a collection holds the GIL, so it stalls the loop too)."""
+
+    def __init__(self) -> None:
+        self.total_ms = 0.0
+        self._start = 0.0
+
+    def __call__(self, phase: str, info: dict) -> None:
+        if phase == "start":
+            self._start = time.perf_counter()
+        else:
+            self.total_ms += (time.perf_counter() - self._start) * 1000
+
+
+async def _drive(budget_ms: float) -> list[tuple[str, int, list[dict], float]]:
+    """Request each route once. Returns (request, status, stalls during it, ms spent in GC during it)."""
+    import httpx
+
+    from app.main import app
+    from app.models import db_models
+    from app.utils.loop_monitor import get_loop_monitor
+
+    results = []
+    settle = 0.02 + budget_ms / 1000 * 2  # let the heartbeat report a stall before moving on
+    gc_timer = _GCTimer()
+    gc.callbacks.append(gc_timer)
+
+    async with app.router.lifespan_context(app):
+        monitor = get_loop_monitor()
+        async with db_models.init_db()() as session:
+            account = db_models.LinkedInAccount(
+                account_type="personal", display_name="Check", linkedin_urn="urn:li:person:check",
+                access_token="check", token_expires_at=datetime.now(timezone.utc) + timedelta(days=30),
+            )
+            session.add(account)
+            await session.commit()
+            account_id = account.id
+        await asyncio.sleep(settle)
+        monitor.stalls.clear()  # startup (create_tables, index rebuild) is not a route
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)  # a 500 is reported, not raised
+        async with httpx.AsyncClient(transport=transport, base_url="http://check", timeout=60) as client:
+
+            async def call(method: str, url: str, **kwargs) -> httpx.Response:
+                before, gc_before = len(monitor.stalls), gc_timer.total_ms
+                resp = await client.request(method, url, **kwargs)
+                await asyncio.sleep(settle)
+                stalls = list(monitor.stalls)[before:]
+                results.append((f"{method} {url}", resp.status_code, stalls, gc_timer.total_ms - gc_before))
+                return resp
+
+            for url in ("/health", "/", "/metrics", "/analytics", "/analytics/usage", "/analytics/strategy",
+                        "/accounts", "/accounts/auth/redirect-uri", "/accounts/auth/linkedin",
+                        f"/accounts/{account_id}/brand", f"/accounts/{account_id}/budget",
+                        "/post-history", "/post-history/drafts", "/post-history/scheduled"):
+                await call("GET", url)
+            await call("PUT", f"/accounts/{account_id}/brand", json={"brand_name": "Check Studio"})
+            await call("PUT", f"/accounts/{account_id}/budget", json={"llm_daily_budget_usd": 5})
+            gen = await call("POST", "/generate", json={
+                "user_input": "How we cut our video turnaround time in half", "account_id": account_id,
+            })
+            draft_id = gen.json().get("draft_id") if gen.status_code == 200 else None
+            if draft_id:
+                await call("POST", "/generate", json={"user_input": "how we cut video turnaround time in half"})
+                await call("GET", f"/post-history/drafts/{draft_id}")
+                await call("PATCH", f"/post-history/drafts/{draft_id}", json={"cta": "Tell me below."})
+                await call("POST", f"/post-history/drafts/{draft_id}/generate-image")
+                await call("GET", f"/storage/{draft_id}")
+                await call("POST", "/regenerate", json={"regenerate_draft_id": draft_id})
+                await call("POST", "/generate/regenerate", json={"regenerate_draft_id": draft_id})
+                now = datetime.now(timezone.utc)
+                pub = await call("POST", "/publish", json={
+                    "draft_id": draft_id, "account_ids": [account_id], "schedule_override": now.isoformat(),
+                })
+                await call("POST", "/publish", json={
+                    "draft_id": draft_id, "account_id": account_id,
+                    "schedule_override": (now + timedelta(days=1)).isoformat(),
+                })
+                history_ids = [r["history_id"] for r in pub.json().get("results", [])] if pub.status_code == 200 else []
+                await call("POST", "/post-history/metrics", json=[
+                    {"history_id": i, "impressions": 1200, "engagements": 54} for i in history_ids
+                ])
+                await call("GET", f"/accounts/{account_id}/budget")
+            await call("POST", "/generate", json={"user_input": "Three lessons from our first documentary", "variants": 3})
+            await call("GET", "/post-history/drafts?collapse_duplicates=true")
+            # Semantic-cache hit on a draft deleted since: generates a new post
+            prompt = {"user_input": "Why our studio stopped offering unlimited revisions"}
+            first = await call("POST", "/generate", json=prompt)
+            if first.status_code == 200:
+                async with db_models.init_db()() as session:
+                    await session.delete(await session.get(db_models.PostDraft, first.json()["draft_id"]))
+                    await session.commit()
+                await call("POST", "/generate", json=prompt)
+    gc.callbacks.remove(gc_timer)
+    if db_models._engine is not None:
+        await db_models._engine.dispose()
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="Max time any request may hold the event loop")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if not _configure_env(args.budget_ms, Path(tmp)):
+            print("  SKIP DATABASE_URL not set and aiosqlite not installed.")
+            return 0
+        sys.path.insert(0, str(Path(__file__).resolve().parent))
+        _stub_gemini()
+        _stub_linkedin()
+        print(f"1. Drive routes with the loop monitor on (budget {args.budget_ms:.0f} ms)...")
+        results = asyncio.run(_drive(args.budget_ms))
+
+    failed = False
+    for request, status, stalls, gc_ms in results:
+        if status >= 500:
+            failed = True
+            print(f"  FAIL {request} -> {status}")
+            continue
+        if not stalls:
+            print(f"  OK   {request} -> {status}")
+            continue
+        worst = max(stalls, key=lambda s: s["lag_ms"])
+        if worst["lag_ms"] - gc_ms <= args.budget_ms:
+            # A full collection over the imported app (~100+ ms) lands on whichever request triggers it;
+            # the route itself stayed within budget
+            print(f"  GC   {request} -> {status}: loop blocked {worst['lag_ms']:.0f} ms, {gc_ms:.0f} ms of it in GC")
+            continue
+        failed = True
+        print(f"  FAIL {request} -> {status}: loop blocked {worst['lag_ms']:.0f} ms in {worst['task']}")
+        for frame in worst["stack"].split(";")[-8:]:
+            print(f"         {frame}")
+    if failed:
+        print("\nEvent loop check FAILED.")
+        return 1
+    print("\nEvent loop check done.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
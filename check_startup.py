@@ -0,0 +1,104 @@
+"""
+Startup import benchmark: fail if importing app.main pulls in heavy deps or takes too long relative to importing
+the framework it needs anyway (FastAPI, SQLAlchemy, ...), measured the same way on the same machine.
+Run: python check_startup.py [--max-ratio 1.6] [--budget-ms N] [--runs 5]
+"""
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+
+# Must load lazily (first use or background warmup), never on `import app.main`
+LAZY_MODULES = ("langgraph", "langchain_core", "langchain_google_genai", "google.genai", "PIL", "numpy")
+# What app.main cannot avoid importing; the yardstick for its import time (machine speed cancels out)
+REFERENCE_MODULES = (
+    "fastapi", "fastapi.staticfiles", "sqlalchemy.ext.asyncio", "pydantic_settings",
+    "apscheduler.schedulers.background", "httpx", "structlog",
+)
+
+
+def measure(modules: tuple[str, ...]) -> tuple[int, dict[str, int]]:
+    """
+    Import `modules` with -X importtime in a fresh process. Returns (their total import time in us,
+    cumulative us per module).
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + ", ".join(modules)],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else f"import {modules[0]} failed")
+    cumulative: dict[str, int] = {}
+    total = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            cum = int(parts[1])
+        except ValueError:
+            continue  # header line
+        name = parts[2].strip()
+        cumulative[name] = cum
+        if name in modules and not parts[2].startswith("  "):  # imported by the statement itself, not nested
+            total += cum
+    return total, cumulative
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--max-ratio", type=float, default=1.6, help="Max import time of app.main as a multiple of the framework imports"
+    )
+    parser.add_argument("--budget-ms", type=float, help="Also cap app.main's import time in absolute terms (off by default)")
+    parser.add_argument("--runs", type=int, default=5, help="Take the best of N runs to reduce noise")
+    args = parser.parse_args()
+
+    print(f"1. Import app.main and the framework with -X importtime (best of {args.runs}, interleaved)...")
+    best_total, best_modules, best_reference = None, {}, None
+    for _ in range(max(1, args.runs)):
+        try:
+            total, modules = measure(("app.main",))
+            reference, _ = measure(REFERENCE_MODULES)
+        except RuntimeError as e:
+            print(f"  FAIL import: {e}")
+            return 1
+        if best_total is None or total < best_total:
+            best_total, best_modules = total, modules
+        best_reference = reference if best_reference is None else min(best_reference, reference)
+    ms, reference_ms = best_total / 1000, best_reference / 1000
+    ratio = ms / reference_ms if reference_ms else 0.0
+    slow = ratio > args.max_ratio or (args.budget_ms is not None and ms > args.budget_ms)
+    budget = f", budget {args.budget_ms:.0f} ms" if args.budget_ms is not None else ""
+    print(
+        f"  {'FAIL' if slow else 'OK  '} app.main cumulative import: {ms:.0f} ms = {ratio:.2f}x the framework's "
+        f"{reference_ms:.0f} ms (max {args.max_ratio:.2f}x{budget})"
+    )
+
+    print("\n2. Heavy dependencies must stay lazy...")
+    eager = sorted(m for m in best_modules if any(m == lazy or m.startswith(lazy + ".") for lazy in LAZY_MODULES))
+    top_level = sorted({m for m in eager if not any(m.startswith(o + ".") for o in eager)})
+    if top_level:
+        for m in top_level:
+            print(f"  FAIL {m} imported at startup ({best_modules[m] / 1000:.0f} ms)")
+    else:
+        print(f"  OK  none of {', '.join(LAZY_MODULES)} imported")
+
+    print("\n3. Slowest top-level imports:")
+    app_level = {m: us for m, us in best_modules.items() if "." not in m and m != "app"}
+    for name, us in sorted(app_level.items(), key=lambda kv: kv[1], reverse=True)[:8]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    if slow or top_level:
+        print("\nStartup check FAILED.")
+        return 1
+    print("\nStartup check done.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -170,9 +170,11 @@ document.getElementById('btnPublish').addEventListener('click', async () => {
       method: 'POST',
       body: JSON.stringify({ draft_id: draftId, account_id: parseInt(accountId, 10) }),
     });
-    status.textContent = data.status === 'published'
-      ? 'Published. LinkedIn ID: ' + (data.linkedin_post_id || '—')
-      : 'Scheduled for ' + (data.scheduled_at || 'later');
+    status.textContent = data.status === 'scheduled'
+      ? 'Scheduled for ' + (data.scheduled_at || 'later')
+      : data.status === 'failed'
+        ? 'Publish failed. Check the account connection and try again.'
+        : 'Published. LinkedIn ID: ' + (data.linkedin_post_id || '—');
     loadDrafts();
     loadScheduled();
     loadPostHistory();